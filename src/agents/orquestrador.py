@@ -12,7 +12,7 @@ from src.core.knowledge import create_receitas_knowledge, create_fotografia_know
 from src.agents.chef import create_chef_agent
 from src.agents.fotografo import create_fotografo_agent
 from src.agents.diagramador import create_diagramador_agent
-from src.service.receitas_service import atualizar_status, obter_receita
+from src.service.receitas_service import atualizar_status, obter_receita, salvar_conteudo_receita
 from src.models.receitas import ReceitaTable
 from src.models.produtos import ProdutoClienteTable
 from src.tools.image_generator import set_reference_image
@@ -180,11 +180,12 @@ Retorne APENAS o JSON, sem markdown ou explicações."""
             return {"ingredientes": [], "modo_preparo": []}
 
     def _salvar_receita(self, session: Session, receita: ReceitaTable, resultado: dict):
-        receita.json_ingredientes = json.dumps(resultado.get("ingredientes", []), ensure_ascii=False)
-        receita.json_modo_preparo = json.dumps(resultado.get("modo_preparo", []), ensure_ascii=False)
-        session.add(receita)
-        session.commit()
-        session.refresh(receita)
+        salvar_conteudo_receita(
+            session,
+            receita,
+            resultado.get("ingredientes", []),
+            resultado.get("modo_preparo", []),
+        )
 
     def _gerar_imagens(
         self,
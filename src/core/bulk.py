@@ -0,0 +1,50 @@
+"""
+Inserção em lote: INSERTs de várias linhas por lote, todos na transação da
+sessão (quem chama faz o commit), devolvendo os ids gerados na ordem da entrada.
+"""
+from typing import Any
+
+from sqlalchemy import insert, text
+from sqlmodel import Session
+
+BULK_MAX_ITENS = 10_000
+BULK_LOTE = 500
+
+
+def inserir_em_lotes(
+    session: Session,
+    model: Any,
+    chave: Any,
+    linhas: list[dict],
+    lote: int = BULK_LOTE,
+) -> list[int]:
+    """
+    Bancos com RETURNING (SQLite, MariaDB) devolvem os ids direto. No MySQL,
+    lastrowid é o id da primeira linha do INSERT e os demais são calculados;
+    outros bancos sem RETURNING inserem linha a linha. Eventos do ORM
+    (before_insert) não rodam aqui.
+    """
+    ids: list[int] = []
+    dialect = session.get_bind().dialect
+    if dialect.insert_returning:
+        for inicio in range(0, len(linhas), lote):
+            result = session.execute(
+                insert(model).returning(chave, sort_by_parameter_order=True),
+                linhas[inicio:inicio + lote],
+            )
+            ids.extend(result.scalars().all())
+    elif dialect.name == "mysql":
+        # Um INSERT ... VALUES de várias linhas, sem ids explícitos nem IGNORE,
+        # é um "simple insert": o InnoDB reserva os valores de uma vez e eles
+        # são consecutivos em qualquer innodb_autoinc_lock_mode (lacunas só
+        # aparecem em "bulk"/"mixed-mode inserts"), separados pelo
+        # auto_increment_increment da sessão (replicação multi-primário usa > 1).
+        passo = session.execute(text("SELECT @@auto_increment_increment")).scalar_one()
+        for inicio in range(0, len(linhas), lote):
+            bloco = linhas[inicio:inicio + lote]
+            result = session.execute(insert(model).values(bloco))
+            ids.extend(range(result.lastrowid, result.lastrowid + len(bloco) * passo, passo))
+    else:
+        for linha in linhas:
+            ids.append(session.execute(insert(model).values(linha)).lastrowid)
+    return ids
@@ -1,19 +1,69 @@
-from typing import Generator
+import logging
+from typing import AsyncGenerator, Generator
 
-from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import JSON, inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .settings import Settings
 
+logger = logging.getLogger(__name__)
+
 _engine = None
+_async_engine: AsyncEngine | None = None
+
+# Driver assíncrono equivalente a cada driver síncrono da URL
+_DRIVERS_ASYNC = {
+    "mysql": "mysql+aiomysql",
+    "mysql+mysqlconnector": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url: str) -> str:
+    esquema, sep, resto = url.partition("://")
+    return f"{_DRIVERS_ASYNC.get(esquema, esquema)}{sep}{resto}"
+
+
+def _pool_kwargs(settings: Settings, url: str) -> dict:
+    # SQLite não usa pool de conexões de rede; os parâmetros só valem para o MySQL
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
 
 
 def init_engine(settings: Settings):
     global _engine
     if _engine is None:
-        _engine = create_engine(settings.mysql_url, echo=False)
+        _engine = create_engine(
+            settings.mysql_url, echo=False, **_pool_kwargs(settings, settings.mysql_url)
+        )
     return _engine
 
 
+def init_async_engine(settings: Settings) -> AsyncEngine:
+    """Engine assíncrono (aiomysql / aiosqlite) usado pelas rotas async."""
+    global _async_engine
+    if _async_engine is None:
+        url = settings.mysql_async_url or async_url(settings.mysql_url)
+        _async_engine = create_async_engine(url, echo=False, **_pool_kwargs(settings, url))
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    """Fecha as conexões do pool; o engine continua utilizável depois."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
 def get_session() -> Generator[Session, None, None]:
     if _engine is None:
         raise RuntimeError("Database engine not initialized.")
@@ -21,8 +71,130 @@ def get_session() -> Generator[Session, None, None]:
         yield session
 
 
+def new_session() -> Session:
+    """Sessão própria para tarefas que vivem além da requisição (jobs em background)."""
+    if _engine is None:
+        raise RuntimeError("Database engine not initialized.")
+    return Session(_engine)
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    if _async_engine is None:
+        raise RuntimeError("Async database engine not initialized.")
+    async with new_async_session() as session:
+        yield session
+
+
+def new_async_session() -> AsyncSession:
+    """
+    Sessão assíncrona própria (jobs em background). Sem expirar no commit:
+    recarregar atributos de forma implícita não é possível fora de um await.
+    """
+    if _async_engine is None:
+        raise RuntimeError("Async database engine not initialized.")
+    return AsyncSession(_async_engine, expire_on_commit=False)
+
+
 def create_db_and_tables():
     if _engine is None:
         raise RuntimeError("Database engine not initialized.")
-    from src.models import produtos, ingredientes, receitas, imagens, tasks, vectors  # noqa: F401
+    from src.models import produtos, ingredientes, receitas, imagens, tasks, vectors, jobs  # noqa: F401
+    tabelas = set(inspect(_engine).get_table_names())
+    receitas_legadas = "receitas" in tabelas and "receita_ingredientes" not in tabelas
     SQLModel.metadata.create_all(_engine)
+    _migrar_nome_chave_ingredientes()
+    _criar_indices_faltantes()
+    if receitas_legadas:
+        _migrar_receitas_json()
+
+
+def _criar_indices_faltantes():
+    """create_all não cria índices novos em tabelas que já existiam."""
+    from src.models.ingredientes import IngredienteTable
+    from src.models.produtos import ProdutoClienteTable
+
+    for tabela in (IngredienteTable.__table__, ProdutoClienteTable.__table__):
+        for indice in tabela.indexes:
+            indice.create(_engine, checkfirst=True)
+
+
+def _migrar_nome_chave_ingredientes():
+    """
+    Bancos criados antes da coluna ingredientes.nome_chave: adiciona a coluna,
+    preenche a chave normalizada e cria o índice único. Nomes duplicados
+    recebem a chave com o id como sufixo ("maca #2"): o registro mais antigo
+    continua sendo o encontrado pelo nome e nenhum fica sem chave (uma chave
+    nula seria recalculada no próximo UPDATE e violaria o índice).
+    Também corrige linhas deixadas sem chave por versões anteriores desta migração.
+    """
+    colunas = {c["name"] for c in inspect(_engine).get_columns("ingredientes")}
+
+    from src.models.ingredientes import chave_nome
+
+    with _engine.begin() as conn:
+        coluna_nova = "nome_chave" not in colunas
+        if coluna_nova:
+            conn.execute(text("ALTER TABLE ingredientes ADD COLUMN nome_chave VARCHAR(255)"))
+        pendentes = conn.execute(text(
+            "SELECT id_ingrediente, nome_singular FROM ingredientes "
+            "WHERE nome_chave IS NULL ORDER BY id_ingrediente"
+        )).all()
+        if pendentes:
+            usadas = set(conn.execute(text(
+                "SELECT nome_chave FROM ingredientes WHERE nome_chave IS NOT NULL"
+            )).scalars())
+            chaves = []
+            for ingrediente_id, nome in pendentes:
+                chave = chave_nome(nome)
+                if chave in usadas:
+                    chave = f"{chave} #{ingrediente_id}"
+                    logger.warning(
+                        "Ingrediente %s duplicado (%s), nome_chave=%r", ingrediente_id, nome, chave
+                    )
+                usadas.add(chave)
+                chaves.append({"id": ingrediente_id, "chave": chave})
+            conn.execute(
+                text("UPDATE ingredientes SET nome_chave = :chave WHERE id_ingrediente = :id"),
+                chaves,
+            )
+        if coluna_nova:
+            conn.execute(
+                text("CREATE UNIQUE INDEX ix_ingredientes_nome_chave ON ingredientes (nome_chave)")
+            )
+
+
+def _migrar_receitas_json():
+    """
+    Bancos criados com json_ingredientes/json_modo_preparo em TEXT: no MySQL as
+    colunas passam a JSON nativo; no SQLite (sem ALTER de tipo) o JSON continua
+    gravado como texto. Em ambos, textos que não são JSON válido viram NULL.
+    Receitas antigas ganham suas linhas em receita_ingredientes.
+    Roda uma vez, no startup em que a tabela receita_ingredientes é criada.
+    """
+    from src.models.receitas import ReceitaIngredienteTable, ReceitaTable
+    from src.service.receitas_service import indexar_ingredientes
+
+    colunas = {c["name"]: c["type"] for c in inspect(_engine).get_columns("receitas")}
+    with _engine.begin() as conn:
+        for coluna in ("json_ingredientes", "json_modo_preparo"):
+            if isinstance(colunas[coluna], JSON):
+                continue
+            conn.execute(text(
+                f"UPDATE receitas SET {coluna} = NULL "
+                f"WHERE {coluna} IS NOT NULL AND NOT JSON_VALID({coluna})"
+            ))
+            if _engine.dialect.name == "mysql":
+                conn.execute(text(f"ALTER TABLE receitas MODIFY {coluna} JSON NULL"))
+
+    with Session(_engine) as session:
+        indexadas = select(ReceitaIngredienteTable.id_receita)
+        pendentes = session.exec(
+            select(ReceitaTable.id_receita, ReceitaTable.json_ingredientes).where(
+                ReceitaTable.json_ingredientes.is_not(None),
+                ReceitaTable.id_receita.not_in(indexadas),
+            )
+        ).all()
+        for receita_id, ingredientes in pendentes:
+            if isinstance(ingredientes, list):
+                indexar_ingredientes(session, receita_id, ingredientes)
+        session.commit()
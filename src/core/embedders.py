@@ -0,0 +1,81 @@
+"""
+Embedders disponíveis para as bases RAG, selecionados por EMBEDDER_PROVIDER.
+O HashingEmbedder é determinístico e roda sem rede, para testes, benchmarks
+e ambientes isolados, com a mesma dimensão configurada para o Gemini.
+"""
+
+import math
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.embedder.google import GeminiEmbedder
+
+from src.core.settings import Settings
+from src.core.sparse import tokenizar
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """
+    Feature hashing de termos e trigramas de caracteres em um vetor denso
+    normalizado (L2). Textos com vocabulário parecido ficam próximos no
+    espaço de cosseno, o suficiente para exercitar ingestão e busca.
+    """
+
+    dimensions: Optional[int] = 1536
+    ngram: int = 3
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in tokenizar(text):
+            features.append(token)
+            padded = f"#{token}#"
+            features.extend(
+                padded[i : i + self.ngram] for i in range(len(padded) - self.ngram + 1)
+            )
+        return features
+
+    def get_embedding(self, text: str) -> List[float]:
+        dims = self.dimensions or 1536
+        vector = [0.0] * dims
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % dims] += 1.0 if (h >> 31) & 1 else -1.0
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm == 0:
+            return vector
+        return [v / norm for v in vector]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+def create_embedder(settings: Settings) -> Embedder:
+    if settings.embedder_provider == "gemini":
+        return GeminiEmbedder(
+            id=settings.gemini_model_embed,
+            api_key=settings.gemini_api_key,
+            dimensions=settings.embedder_dimensions,
+        )
+    if settings.embedder_provider == "hash":
+        return HashingEmbedder(dimensions=settings.embedder_dimensions)
+    if settings.embedder_provider == "sentence-transformers":
+        # Dependência opcional; a dimensão é a do modelo escolhido
+        from agno.knowledge.embedder.sentence_transformer import SentenceTransformerEmbedder
+
+        embedder = SentenceTransformerEmbedder(id=settings.local_embedder_model)
+        embedder.dimensions = embedder.sentence_transformer_client.get_sentence_embedding_dimension()
+        return embedder
+    raise ValueError(
+        f"embedder_provider inválido: {settings.embedder_provider} "
+        "(use gemini, hash ou sentence-transformers)"
+    )
@@ -0,0 +1,180 @@
+"""
+Cache persistente (SQLite) de respostas das APIs externas.
+Cada endpoint tem seu TTL; respostas vencidas são revalidadas com ETag /
+Last-Modified e resultados "não encontrado" ficam em cache por um TTL menor.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+from .settings import Settings
+
+# Parâmetros que não fazem parte da identidade da resposta (e não devem ir para o disco)
+_PARAMS_IGNORADOS = {"api_key"}
+
+
+@dataclass
+class CacheEntry:
+    status_code: int
+    content: bytes
+    headers: dict
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def to_response(self, url: str) -> httpx.Response:
+        return httpx.Response(
+            self.status_code,
+            content=self.content,
+            headers=self.headers,
+            request=httpx.Request("GET", url),
+        )
+
+
+class HTTPResponseCache:
+    def __init__(self, db_path: str, ttls: dict[str, int], negative_ttl: int):
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                headers TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(url: str, params: dict | None = None) -> str:
+        params = {k: v for k, v in (params or {}).items() if k not in _PARAMS_IGNORADOS}
+        raw = json.dumps([url, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, content, headers, expires_at FROM http_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if not row:
+            return None
+        return CacheEntry(row[0], row[1], json.loads(row[2]), row[3])
+
+    def _set(self, key: str, endpoint: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    endpoint,
+                    entry.status_code,
+                    entry.content,
+                    json.dumps(entry.headers),
+                    entry.expires_at,
+                ),
+            )
+            self._conn.commit()
+
+    def clear(self, endpoint: str | None = None) -> None:
+        with self._lock:
+            if endpoint:
+                self._conn.execute("DELETE FROM http_cache WHERE endpoint = ?", (endpoint,))
+            else:
+                self._conn.execute("DELETE FROM http_cache")
+            self._conn.commit()
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        url: str,
+        fetch: Callable[..., Awaitable[httpx.Response]],
+        params: dict | None = None,
+        vazio: Callable[[httpx.Response], bool] | None = None,
+    ) -> httpx.Response:
+        """
+        Serve do cache quando possível; senão chama `fetch(url, params=..., headers=...)`.
+        Endpoints sem TTL configurado não são cacheados. `vazio` identifica respostas
+        200 que significam "não encontrado" (ex.: {"meals": null} no TheMealDB).
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return await fetch(url, params=params)
+
+        key = self.make_key(url, params)
+        entry = await asyncio.to_thread(self._get, key)
+        if entry and entry.fresh:
+            return entry.to_response(url)
+
+        headers = {}
+        if entry:
+            if entry.headers.get("etag"):
+                headers["If-None-Match"] = entry.headers["etag"]
+            if entry.headers.get("last-modified"):
+                headers["If-Modified-Since"] = entry.headers["last-modified"]
+
+        try:
+            response = await fetch(url, params=params, headers=headers or None)
+        except httpx.HTTPError:
+            # Sem rede, uma resposta vencida é melhor que nenhuma
+            if entry:
+                return entry.to_response(url)
+            raise
+
+        if response.status_code == 304 and entry:
+            entry.expires_at = time.time() + ttl
+            await asyncio.to_thread(self._set, key, endpoint, entry)
+            return entry.to_response(url)
+
+        if response.status_code in (200, 404, 410):
+            negativo = response.status_code != 200 or bool(vazio and vazio(response))
+            validadores = {
+                k: v
+                for k, v in response.headers.items()
+                if k in ("etag", "last-modified", "content-type")
+            }
+            novo = CacheEntry(
+                status_code=response.status_code,
+                content=response.content,
+                headers=validadores,
+                expires_at=time.time() + (self.negative_ttl if negativo else ttl),
+            )
+            await asyncio.to_thread(self._set, key, endpoint, novo)
+        elif entry and response.status_code >= 500:
+            return entry.to_response(url)
+
+        return response
+
+
+_http_cache: HTTPResponseCache | None = None
+
+
+def get_http_cache(settings: Settings) -> HTTPResponseCache | None:
+    global _http_cache
+    if not settings.http_cache_enabled:
+        return None
+    if _http_cache is None:
+        _http_cache = HTTPResponseCache(
+            settings.http_cache_path,
+            ttls=settings.http_cache_ttls,
+            negative_ttl=settings.http_cache_negative_ttl,
+        )
+    return _http_cache
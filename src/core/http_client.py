@@ -0,0 +1,78 @@
+"""
+Cliente HTTP assíncrono compartilhado pelos serviços de APIs externas.
+Mantém conexões keep-alive (pool por origem) e HTTP/2, evitando DNS, TCP e
+TLS a cada chamada. É aberto e fechado pelo lifespan da aplicação; fora dele,
+cada event loop tem o seu, fechado quando o loop encerra.
+"""
+import asyncio
+import importlib.util
+
+import httpx
+
+from .settings import Settings
+
+# Um cliente por event loop, com a task que o fecha quando o loop encerra
+_http_clients: dict[asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Task]] = {}
+_settings: Settings | None = None
+
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    # HTTP/2 depende do pacote h2; sem ele o httpx usa HTTP/1.1 com keep-alive
+    http2 = settings.http2 and importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        timeout=settings.http_timeout,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+    )
+
+
+def init_http_client(settings: Settings) -> httpx.AsyncClient:
+    global _settings
+    _settings = settings
+    return get_http_client()
+
+
+async def _fechar_ao_encerrar(client: httpx.AsyncClient) -> None:
+    """
+    Espera até ser cancelada. asyncio.run, o pytest-asyncio e o uvicorn
+    cancelam as tasks pendentes antes de fechar o loop; é nesse ponto, com o
+    loop ainda ativo, que as conexões do cliente são encerradas.
+    """
+    try:
+        await asyncio.Future()
+    finally:
+        await client.aclose()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente compartilhado do event loop atual.
+    Fora do lifespan (scripts, testes) o cliente é criado sob demanda e
+    fechado quando o loop que o criou encerra.
+    """
+    loop = asyncio.get_running_loop()
+    atual = _http_clients.get(loop)
+    if atual and not atual[0].is_closed:
+        return atual[0]
+
+    for encerrado in [l for l in _http_clients if l.is_closed()]:
+        del _http_clients[encerrado]
+    if atual:
+        atual[1].cancel()
+    client = create_http_client(_settings or Settings())
+    _http_clients[loop] = (client, loop.create_task(_fechar_ao_encerrar(client)))
+    return client
+
+
+async def close_http_client() -> None:
+    """Fecha o cliente do loop atual; os de outros loops fecham com o próprio loop."""
+    atual = _http_clients.pop(asyncio.get_running_loop(), None)
+    if atual is None:
+        return
+    client, task = atual
+    task.cancel()
+    await client.aclose()
@@ -1,31 +1,373 @@
+import logging
+
 from agno.knowledge.knowledge import Knowledge
-from agno.knowledge.embedder.google import GeminiEmbedder
+from agno.vectordb.distance import Distance
 from agno.vectordb.qdrant import Qdrant
+from agno.vectordb.search import SearchType
+from qdrant_client.http import models
 
+from src.core.embedders import create_embedder
+from src.core.reranker import create_reranker
 from src.core.settings import Settings
+from src.core.sparse import BM25SparseEncoder
 
+logger = logging.getLogger(__name__)
 
-def create_knowledge_base(settings: Settings, collection_name: str = "receitas") -> Knowledge:
-    vector_db = Qdrant(
-        collection=collection_name,
-        url=settings.qdrant_url,
-        embedder=GeminiEmbedder(
-            id=settings.gemini_model_embed,
-            api_key=settings.gemini_api_key,
+# Campos de metadata usados em filtros (agno grava metadata em `meta_data`)
+PAYLOAD_INDEXES = {
+    "meta_data.tipo": models.PayloadSchemaType.KEYWORD,
+    "meta_data.source_file": models.PayloadSchemaType.KEYWORD,
+    "meta_data.page": models.PayloadSchemaType.INTEGER,
+}
+
+COLECOES = ("receitas", "fotografia")
+
+# Coleções do servidor já verificadas neste processo: nome -> tem vetores nomeados.
+# Montar um Knowledge (por request, nos agentes) não refaz a consulta.
+_vetores_nomeados: dict[str, bool] = {}
+
+
+class RAGQdrant(Qdrant):
+    """
+    Qdrant com índices de payload para filtros de metadata, quantização e
+    HNSW configuráveis e, opcionalmente, busca híbrida (densa + esparsa) usando
+    o encoder BM25 local, sem depender do fastembed. Na busca híbrida os
+    resultados são combinados por RRF. Com um reranker, cada busca traz
+    `rerank_candidates` candidatos e devolve só os `limit` melhores: vale para
+    as rotas de busca e para as buscas feitas pelos agentes.
+    """
+
+    def __init__(
+        self,
+        hybrid: bool = False,
+        quantization_config: models.QuantizationConfig | None = None,
+        hnsw_config: models.HnswConfigDiff | None = None,
+        on_disk: bool = False,
+        search_params: models.SearchParams | None = None,
+        rerank_candidates: int = 0,
+        **kwargs,
+    ):
+        super().__init__(search_type=SearchType.vector, **kwargs)
+        self.rerank_candidates = rerank_candidates
+        self.hybrid = hybrid
+        self.quantization_config = quantization_config
+        self.hnsw_config = hnsw_config
+        self.on_disk = on_disk
+        self.search_params = search_params
+        # A coleção existente só é conferida no primeiro uso, não ao montar o Knowledge
+        self._layout_pendente = hybrid
+        if hybrid:
+            self.search_type = SearchType.hybrid
+            self.use_named_vectors = True
+            self.sparse_encoder = BM25SparseEncoder()
+
+    def _collection_config(self) -> dict:
+        distance = {
+            Distance.l2: models.Distance.EUCLID,
+            Distance.max_inner_product: models.Distance.DOT,
+        }.get(self.distance, models.Distance.COSINE)
+
+        dense = models.VectorParams(
+            size=self.dimensions or 1536,
+            distance=distance,
+            on_disk=self.on_disk,
+        )
+        config = {
+            "collection_name": self.collection,
+            "vectors_config": dense,
+            "hnsw_config": self.hnsw_config,
+            "quantization_config": self.quantization_config,
+        }
+
+        if self.hybrid:
+            config["vectors_config"] = {self.dense_vector_name: dense}
+            config["sparse_vectors_config"] = {
+                self.sparse_vector_name: models.SparseVectorParams(modifier=models.Modifier.IDF)
+            }
+
+        return config
+
+    def apply_storage_config(self) -> None:
+        """
+        Aplica quantização, on_disk e HNSW a uma coleção já existente.
+        O Qdrant reconstrói os segmentos em background, sem reindexar os pontos.
+        O vetor denso é escolhido pelo formato real da coleção: uma coleção
+        híbrida continua com vetores nomeados mesmo com a busca híbrida desligada.
+        """
+        vectors = self.client.get_collection(self.collection).config.params.vectors
+        vector_name = self.dense_vector_name if isinstance(vectors, dict) else ""
+        self.client.update_collection(
+            collection_name=self.collection,
+            vectors_config={
+                vector_name: models.VectorParamsDiff(
+                    on_disk=self.on_disk,
+                    hnsw_config=self.hnsw_config,
+                )
+            },
+            quantization_config=self.quantization_config or models.Disabled.DISABLED,
+        )
+
+    @property
+    def is_local(self) -> bool:
+        return self.location is not None or self.path is not None
+
+    def create(self) -> None:
+        if not self.exists():
+            self.client.create_collection(**self._collection_config())
+            self.ensure_payload_indexes()
+            self._coletar_layout_novo()
+
+    async def async_create(self) -> None:
+        if not await self.async_exists():
+            await self.async_client.create_collection(**self._collection_config())
+            await self.async_ensure_payload_indexes()
+            self._coletar_layout_novo()
+
+    def _coletar_layout_novo(self) -> None:
+        # Coleção criada agora segue a configuração desta instância
+        self._layout_pendente = False
+        if not self.is_local:
+            _vetores_nomeados[self.collection] = self.hybrid
+
+    def ajustar_a_colecao_existente(self) -> None:
+        """
+        Coleções criadas antes da busca híbrida têm um único vetor sem nome:
+        inserir ou buscar com vetores nomeados falharia, e o Knowledge engole o
+        erro devolvendo []. Nesse caso a coleção segue só com busca densa até
+        ser recriada.
+        """
+        if not self.hybrid:
+            return
+        nomeados = None if self.is_local else _vetores_nomeados.get(self.collection)
+        if nomeados is None:
+            if not self.exists():
+                return
+            vectors = self.client.get_collection(self.collection).config.params.vectors
+            nomeados = isinstance(vectors, dict) and self.dense_vector_name in vectors
+            if not self.is_local:
+                _vetores_nomeados[self.collection] = nomeados
+            if not nomeados:
+                logger.warning(
+                    "Coleção %s não tem vetores nomeados; usando busca só densa. Apague a "
+                    "coleção e reingira o conteúdo para ativar a busca híbrida "
+                    "(python -m src.core.migrate_qdrant verifica o estado).",
+                    self.collection,
+                )
+        self._layout_pendente = False
+        if nomeados:
+            return
+        self.hybrid = False
+        self.search_type = SearchType.vector
+        self.use_named_vectors = False
+        self.sparse_encoder = None
+
+    def _preparar_layout(self) -> None:
+        if self._layout_pendente:
+            self.ajustar_a_colecao_existente()
+
+    def insert(self, content_hash, documents, filters=None, batch_size: int = 10) -> None:
+        self._preparar_layout()
+        return super().insert(content_hash, documents, filters, batch_size)
+
+    def upsert(self, content_hash, documents, filters=None) -> None:
+        self._preparar_layout()
+        return super().upsert(content_hash=content_hash, documents=documents, filters=filters)
+
+    # No modo local do qdrant-client os clientes sync e async não compartilham
+    # dados, então as operações async usadas pelo Knowledge vão para o sync
+    async def async_exists(self) -> bool:
+        if self.is_local:
+            return self.exists()
+        return await super().async_exists()
+
+    async def async_insert(self, content_hash, documents, filters=None) -> None:
+        if self.is_local:
+            return self.insert(content_hash=content_hash, documents=documents, filters=filters)
+        self._preparar_layout()
+        return await super().async_insert(content_hash, documents, filters)
+
+    async def async_upsert(self, content_hash, documents, filters=None) -> None:
+        if self.is_local:
+            return self.upsert(content_hash=content_hash, documents=documents, filters=filters)
+        self._preparar_layout()
+        return await super().async_upsert(content_hash, documents, filters)
+
+    def _limite_candidatos(self, limit: int) -> int:
+        return max(limit, self.rerank_candidates) if self.reranker else limit
+
+    def search(self, query, limit=5, filters=None):
+        self._preparar_layout()
+        return super().search(query, self._limite_candidatos(limit), filters)[:limit]
+
+    async def async_search(self, query, limit=5, filters=None):
+        if self.is_local:
+            return self.search(query=query, limit=limit, filters=filters)
+        self._preparar_layout()
+        resultados = await super().async_search(query, self._limite_candidatos(limit), filters)
+        return resultados[:limit]
+
+    def _hybrid_query(self, query: str, limit: int, formatted_filters) -> dict:
+        # O filtro vai em cada prefetch para ser resolvido pelo índice de payload
+        # antes da fusão, em vez de descartar candidatos depois
+        dense_embedding = self.embedder.get_embedding(query)
+        sparse_embedding = next(iter(self.sparse_encoder.embed([query]))).as_object()
+        return {
+            "collection_name": self.collection,
+            "prefetch": [
+                models.Prefetch(
+                    query=models.SparseVector(**sparse_embedding),
+                    using=self.sparse_vector_name,
+                    limit=limit,
+                    filter=formatted_filters,
+                ),
+                models.Prefetch(
+                    query=dense_embedding,
+                    using=self.dense_vector_name,
+                    limit=limit,
+                    filter=formatted_filters,
+                    params=self.search_params,
+                ),
+            ],
+            "query": models.FusionQuery(fusion=self.hybrid_fusion_strategy),
+            "with_payload": True,
+            "limit": limit,
+            "query_filter": formatted_filters,
+        }
+
+    def _vector_query(self, query: str, limit: int, formatted_filters) -> dict:
+        return {
+            "collection_name": self.collection,
+            "query": self.embedder.get_embedding(query),
+            "using": self.dense_vector_name if self.use_named_vectors else None,
+            "with_payload": True,
+            "limit": limit,
+            "query_filter": formatted_filters,
+            "search_params": self.search_params,
+        }
+
+    def _run_vector_search_sync(self, query: str, limit: int, formatted_filters):
+        return self.client.query_points(**self._vector_query(query, limit, formatted_filters)).points
+
+    async def _run_vector_search_async(self, query: str, limit: int, formatted_filters):
+        call = await self.async_client.query_points(
+            **self._vector_query(query, limit, formatted_filters)
+        )
+        return call.points
+
+    def _run_hybrid_search_sync(self, query: str, limit: int, formatted_filters):
+        return self.client.query_points(**self._hybrid_query(query, limit, formatted_filters)).points
+
+    async def _run_hybrid_search_async(self, query: str, limit: int, formatted_filters):
+        call = await self.async_client.query_points(
+            **self._hybrid_query(query, limit, formatted_filters)
+        )
+        return call.points
+
+    def ensure_payload_indexes(self) -> None:
+        """Cria os índices de payload (operação idempotente no Qdrant)."""
+        if self.is_local:
+            # O modo local não usa índices de payload
+            return
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            self.client.create_payload_index(
+                collection_name=self.collection,
+                field_name=field_name,
+                field_schema=schema,
+            )
+
+    async def async_ensure_payload_indexes(self) -> None:
+        if self.is_local:
+            return
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            await self.async_client.create_payload_index(
+                collection_name=self.collection,
+                field_name=field_name,
+                field_schema=schema,
+            )
+
+
+def _quantization_config(settings: Settings) -> models.QuantizationConfig | None:
+    if settings.rag_quantization == "none":
+        return None
+    if settings.rag_quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=settings.rag_quantization_always_ram,
+            )
+        )
+    if settings.rag_quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(
+                always_ram=settings.rag_quantization_always_ram,
+            )
+        )
+    raise ValueError(
+        f"rag_quantization inválido: {settings.rag_quantization} (use none, scalar ou binary)"
+    )
+
+
+def _search_params(settings: Settings) -> models.SearchParams:
+    quantization = None
+    if settings.rag_quantization != "none":
+        # Busca nos vetores quantizados e reordena os candidatos com os originais
+        quantization = models.QuantizationSearchParams(
+            rescore=True,
+            oversampling=settings.rag_search_oversampling,
+        )
+    return models.SearchParams(hnsw_ef=settings.rag_search_hnsw_ef, quantization=quantization)
+
+
+def create_vector_db(
+    settings: Settings, collection_name: str = "receitas", hybrid: bool = False
+) -> RAGQdrant:
+    return RAGQdrant(
+        hybrid=hybrid,
+        quantization_config=_quantization_config(settings),
+        hnsw_config=models.HnswConfigDiff(
+            m=settings.rag_hnsw_m,
+            ef_construct=settings.rag_hnsw_ef_construct,
         ),
+        on_disk=settings.rag_vectors_on_disk,
+        search_params=_search_params(settings),
+        reranker=create_reranker(settings),
+        rerank_candidates=settings.rag_rerank_candidates,
+        collection=collection_name,
+        url=None if settings.qdrant_location else settings.qdrant_url,
+        location=settings.qdrant_location or None,
+        embedder=create_embedder(settings),
     )
 
+
+def create_knowledge_base(
+    settings: Settings, collection_name: str = "receitas", hybrid: bool = False
+) -> Knowledge:
+    vector_db = create_vector_db(settings, collection_name, hybrid=hybrid)
+
     knowledge = Knowledge(
         name="Receitas Knowledge Base",
         description="Base de conhecimento para receitas, ingredientes e referências de fotografia",
         vector_db=vector_db,
     )
-
     return knowledge
 
 
+def preparar_colecoes(settings: Settings) -> None:
+    """
+    Roda uma vez no startup: confere o formato dos vetores das coleções que já
+    existem e garante os índices de payload (coleções novas já nascem com eles).
+    """
+    for collection_name in COLECOES:
+        hybrid = collection_name == "receitas" and settings.rag_hybrid_receitas
+        vector_db = create_vector_db(settings, collection_name, hybrid=hybrid)
+        if vector_db.exists():
+            vector_db.ajustar_a_colecao_existente()
+            vector_db.ensure_payload_indexes()
+
+
 def create_receitas_knowledge(settings: Settings) -> Knowledge:
-    return create_knowledge_base(settings, "receitas")
+    return create_knowledge_base(settings, "receitas", hybrid=settings.rag_hybrid_receitas)
 
 
 def create_fotografia_knowledge(settings: Settings) -> Knowledge:
@@ -0,0 +1,55 @@
+"""
+Aplica a configuração de armazenamento do Settings (quantização, vetores em
+disco e HNSW) às coleções RAG já existentes no Qdrant.
+
+Uso:
+    python -m src.core.migrate_qdrant [receitas] [fotografia]
+"""
+import logging
+import sys
+
+from src.core.knowledge import create_vector_db
+from src.core.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+COLECOES = ("receitas", "fotografia")
+
+
+def migrar_colecao(settings: Settings, collection_name: str) -> bool:
+    hybrid = collection_name == "receitas" and settings.rag_hybrid_receitas
+    vector_db = create_vector_db(settings, collection_name, hybrid=hybrid)
+
+    if not vector_db.exists():
+        logger.info(f"Coleção {collection_name} não existe, será criada no próximo startup")
+        return False
+
+    vectors = vector_db.client.get_collection(collection_name).config.params.vectors
+    if hybrid and not isinstance(vectors, dict):
+        # Vetores sem nome não podem virar vetores nomeados in-place
+        logger.warning(
+            f"Coleção {collection_name} não é híbrida; apague-a e reingira o conteúdo "
+            "para usar a busca híbrida"
+        )
+        return False
+
+    vector_db.apply_storage_config()
+    vector_db.ensure_payload_indexes()
+    logger.info(
+        f"Coleção {collection_name} atualizada: quantização={settings.rag_quantization}, "
+        f"on_disk={settings.rag_vectors_on_disk}, hnsw_m={settings.rag_hnsw_m}"
+    )
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    colecoes = argv or list(COLECOES)
+    settings = Settings()
+    for collection_name in colecoes:
+        migrar_colecao(settings, collection_name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -4,4 +4,6 @@ from .settings import Settings
 
 
 def get_qdrant_client(settings: Settings):
+    if settings.qdrant_location:
+        return QdrantClient(location=settings.qdrant_location)
     return QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
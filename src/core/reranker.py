@@ -0,0 +1,113 @@
+"""
+Rerankers locais para os resultados do RAG.
+O RAGQdrant busca mais candidatos do que o necessário e usa um destes
+rerankers para devolver apenas os mais relevantes.
+"""
+
+import logging
+import math
+from collections import Counter
+from typing import Any, List, Optional
+
+from agno.knowledge.document import Document
+from agno.knowledge.reranker.base import Reranker
+from pydantic import PrivateAttr
+
+from src.core.settings import Settings
+from src.core.sparse import tokenizar
+
+logger = logging.getLogger(__name__)
+
+
+class LexicalReranker(Reranker):
+    """
+    Reordena os candidatos por BM25 calculado sobre o próprio conjunto de
+    candidatos, fundido por RRF com a ordem original da busca vetorial.
+    Não depende de modelo nem de rede.
+    """
+
+    k1: float = 1.2
+    b: float = 0.75
+    rrf_k: int = 60
+
+    def _bm25_scores(self, query: str, documents: List[Document]) -> list[float]:
+        termos = set(tokenizar(query))
+        docs_tokens = [tokenizar(doc.content) for doc in documents]
+        n = len(docs_tokens)
+        avg_len = sum(len(t) for t in docs_tokens) / n or 1.0
+        df = Counter(termo for tokens in docs_tokens for termo in set(tokens) if termo in termos)
+
+        scores = []
+        for tokens in docs_tokens:
+            tf = Counter(tokens)
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / avg_len)
+            score = 0.0
+            for termo in termos:
+                if not tf[termo]:
+                    continue
+                idf = math.log(1 + (n - df[termo] + 0.5) / (df[termo] + 0.5))
+                score += idf * tf[termo] * (self.k1 + 1) / (tf[termo] + norm)
+            scores.append(score)
+        return scores
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return []
+
+        scores = self._bm25_scores(query, documents)
+        ordem_lexica = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        rank_lexico = {idx: pos for pos, idx in enumerate(ordem_lexica)}
+
+        for pos, doc in enumerate(documents):
+            doc.reranking_score = 1 / (self.rrf_k + pos + 1)
+            if scores[pos] > 0:
+                doc.reranking_score += 1 / (self.rrf_k + rank_lexico[pos] + 1)
+
+        return sorted(documents, key=lambda d: d.reranking_score, reverse=True)
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Reranker com cross-encoder local (sentence-transformers), carregado uma
+    única vez. Em caso de erro devolve os candidatos na ordem original.
+    """
+
+    model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    _encoder: Optional[Any] = PrivateAttr(default=None)
+
+    def _get_encoder(self):
+        if self._encoder is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                raise ImportError(
+                    "`sentence-transformers` não instalado. Use `pip install sentence-transformers` "
+                    "ou RAG_RERANKER=lexical"
+                )
+            self._encoder = CrossEncoder(self.model, device="cpu")
+        return self._encoder
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return []
+        try:
+            scores = self._get_encoder().predict([[query, doc.content] for doc in documents])
+        except Exception as e:
+            logger.error(f"Erro no reranking com cross-encoder: {e}")
+            return documents
+
+        for doc, score in zip(documents, scores):
+            doc.reranking_score = float(score)
+        return sorted(documents, key=lambda d: d.reranking_score, reverse=True)
+
+
+def create_reranker(settings: Settings) -> Optional[Reranker]:
+    if settings.rag_reranker == "none":
+        return None
+    if settings.rag_reranker == "lexical":
+        return LexicalReranker()
+    if settings.rag_reranker == "cross-encoder":
+        return CrossEncoderReranker(model=settings.rag_reranker_model)
+    raise ValueError(
+        f"rag_reranker inválido: {settings.rag_reranker} (use none, lexical ou cross-encoder)"
+    )
@@ -0,0 +1,61 @@
+"""
+Single-flight: chamadas idênticas em andamento ao mesmo tempo viram uma só.
+O primeiro chamador executa; os demais aguardam o mesmo resultado (ou exceção).
+"""
+import asyncio
+import weakref
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        # Tasks só valem no event loop em que foram criadas
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _calls(self) -> dict[Hashable, list]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._inflight:
+            self._inflight[loop] = {}
+        return self._inflight[loop]
+
+    def in_flight(self) -> int:
+        return len(self._calls())
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        calls = self._calls()
+        call = calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            call = calls[key] = [task, 0]
+            task.add_done_callback(lambda t: self._done(calls, key, t))
+        task = call[0]
+        call[1] += 1
+        try:
+            # shield: um chamador cancelado não cancela a chamada dos outros
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and call[1] == 1:
+                # Último interessado desistiu: não há por que terminar a chamada
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
+
+    @staticmethod
+    def _done(calls: dict, key: Hashable, task: asyncio.Task) -> None:
+        if key in calls and calls[key][0] is task:
+            del calls[key]
+        if not task.cancelled():
+            # Marca a exceção como lida mesmo que todos os chamadores tenham desistido
+            task.exception()
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
@@ -0,0 +1,79 @@
+"""
+Encoder esparso local (estilo BM25) para busca híbrida no Qdrant.
+Calcula apenas a parte de frequência de termos; o IDF é aplicado pelo
+próprio Qdrant através do modifier IDF do vetor esparso da coleção.
+"""
+
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    {
+        # português
+        "a", "ao", "aos", "as", "com", "como", "da", "das", "de", "do", "dos",
+        "e", "em", "na", "nas", "no", "nos", "o", "os", "ou", "para", "pela",
+        "pelo", "por", "que", "se", "sem", "um", "uma", "uns", "umas",
+        # inglês (receitas do TheMealDB)
+        "an", "and", "for", "in", "into", "of", "on", "or", "the", "to", "with",
+    }
+)
+
+
+def normalizar_texto(texto: str) -> str:
+    """Converte para minúsculas e remove acentos."""
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str) -> list[str]:
+    """Quebra o texto em termos normalizados, sem stopwords."""
+    return [
+        token
+        for token in _TOKEN_RE.findall(normalizar_texto(texto))
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+@dataclass
+class SparseEmbedding:
+    indices: list[int]
+    values: list[float]
+
+    def as_object(self) -> dict:
+        return {"indices": self.indices, "values": self.values}
+
+
+class BM25SparseEncoder:
+    """
+    Gera vetores esparsos com saturação de TF do BM25.
+    Os índices são o CRC32 de cada termo, então não há vocabulário a manter.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_len: float = 256.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_len = avg_len
+
+    def _encode(self, texto: str) -> SparseEmbedding:
+        tokens = tokenizar(texto)
+        if not tokens:
+            return SparseEmbedding(indices=[], values=[])
+
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_len)
+        pesos: dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            indice = zlib.crc32(token.encode("utf-8"))
+            pesos[indice] = pesos.get(indice, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+
+        indices = sorted(pesos)
+        return SparseEmbedding(indices=indices, values=[pesos[i] for i in indices])
+
+    def embed(self, texts: Iterable[str]) -> Iterator[SparseEmbedding]:
+        for texto in texts:
+            yield self._encode(texto)
@@ -1,7 +1,9 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from uuid import uuid4
@@ -18,9 +20,12 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("agno").setLevel(logging.WARNING)
 logging.getLogger("google_genai").setLevel(logging.ERROR)
+logger = logging.getLogger(__name__)
 
 from .core.settings import Settings
-from .core.db import init_engine, create_db_and_tables
+from .core.db import init_engine, init_async_engine, dispose_async_engine, create_db_and_tables
+from .core.http_client import init_http_client, close_http_client
+from .core.knowledge import preparar_colecoes
 from .core.qdrant_client import get_qdrant_client
 from .routes.produtos import router as produtos_router
 from .routes.ingredientes import router as ingredientes_router
@@ -29,18 +34,32 @@ from .routes.rag import router as rag_router
 from .routes.upload import router as upload_router
 from .routes.ingredientes_api import router as ingredientes_api_router
 from .routes.themealdb import router as themealdb_router
-from .routes.enriquecimento import router as enriquecimento_router
+from .routes.enriquecimento import router as enriquecimento_router, jobs as enriquecimento_jobs
+from .service.image_normalizer import close_image_normalizer
+from .service.rate_limiter import CircuitOpenError, UpstreamError
 
 
 settings = Settings()
 engine = init_engine(settings)
+async_engine = init_async_engine(settings)
 qdrant_client = get_qdrant_client(settings)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    init_http_client(settings)
+    try:
+        await asyncio.to_thread(preparar_colecoes, settings)
+    except Exception as e:
+        # Índices e verificação de formato são otimizações: o app sobe sem eles
+        logger.warning("Não foi possível preparar as coleções do Qdrant: %s", e)
+    if settings.enriquecimento_retomar_jobs:
+        await enriquecimento_jobs.retomar_interrompidos()
     yield
+    await close_http_client()
+    await dispose_async_engine()
+    close_image_normalizer()
 
 
 app = FastAPI(title="POC Receitas", version="0.1.0", lifespan=lifespan)
@@ -51,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],
 )
 
 frontend_path = Path(__file__).parent.parent / "frontend"
@@ -80,6 +100,19 @@ async def add_request_id(request: Request, call_next):
     return response
 
 
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    """
+    API externa fora do ar ou limitando: 503 em vez de uma resposta vazia.
+    Se ela recusou a requisição (4xx), não adianta repetir: 502.
+    """
+    headers = {}
+    if isinstance(exc, CircuitOpenError):
+        headers["Retry-After"] = str(int(exc.retry_in) + 1)
+    status_code = 503 if exc.transitorio else 502
+    return JSONResponse(status_code=status_code, content={"detail": str(exc)}, headers=headers)
+
+
 @app.get("/health")
 def health():
     return {
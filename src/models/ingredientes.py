@@ -1,17 +1,29 @@
 from typing import Optional
 
 from pydantic import BaseModel
-from sqlalchemy import Column, Text
+from sqlalchemy import Column, String, Text, event, inspect
 from sqlmodel import Field, SQLModel
 
+from src.core.sparse import normalizar_texto
+
+
+def chave_nome(nome: str) -> str:
+    """Chave de busca do nome: minúsculas, sem acentos e espaços extras."""
+    return " ".join(normalizar_texto(nome).split())
+
 
 class IngredienteTable(SQLModel, table=True):
     __tablename__ = "ingredientes"
 
     id_ingrediente: Optional[int] = Field(default=None, primary_key=True)
     nome_singular: str
+    nome_chave: Optional[str] = Field(
+        default=None,
+        sa_column=Column(String(255), unique=True, index=True),
+        description="nome_singular normalizado, preenchido automaticamente",
+    )
     nome_plural: Optional[str] = None
-    tipo_ingrediente: Optional[str] = None
+    tipo_ingrediente: Optional[str] = Field(default=None, index=True)
     imagem_ingrediente: Optional[str] = Field(default=None, sa_column=Column(Text))
     descricao: Optional[str] = Field(default=None, sa_column=Column(Text))
     
@@ -26,6 +38,18 @@ class IngredienteTable(SQLModel, table=True):
     fibras: Optional[float] = Field(default=None, description="g por 100g")
 
 
+@event.listens_for(IngredienteTable, "before_insert")
+def _preencher_nome_chave(mapper, connection, target: IngredienteTable) -> None:
+    target.nome_chave = chave_nome(target.nome_singular)
+
+
+@event.listens_for(IngredienteTable, "before_update")
+def _atualizar_nome_chave(mapper, connection, target: IngredienteTable) -> None:
+    # Só quando o nome muda: a chave de um duplicado renomeado na migração é mantida
+    if inspect(target).attrs.nome_singular.history.has_changes():
+        target.nome_chave = chave_nome(target.nome_singular)
+
+
 class IngredienteOut(BaseModel):
     id: int
     nome_singular: str
@@ -57,3 +81,8 @@ class IngredienteCreate(BaseModel):
     carboidratos: float | None = None
     gorduras: float | None = None
     fibras: float | None = None
+
+
+class IngredientesBulkOut(BaseModel):
+    total: int
+    ids: list[int]
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Any, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel
+from sqlmodel import Field, SQLModel, Column, Text
+
+
+class EnriquecimentoJobTable(SQLModel, table=True):
+    __tablename__ = "enriquecimento_jobs"
+
+    id: str = Field(default_factory=lambda: uuid4().hex, primary_key=True, max_length=32)
+    tipo: str  # enriquecer_todos, tudo
+    status: str = Field(default="pending")  # pending, running, done, paused, error, cancelled
+    etapa: int = Field(default=0, description="Etapas concluídas (job 'tudo')")
+    total: int = 0
+    processados: int = 0
+    erros: int = 0
+    processados_inicio: int = Field(default=0, description="processados no início da execução atual")
+    resultado: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))  # JSON
+    erro: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    started_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    finished_at: Optional[datetime] = None
+
+
+class EnriquecimentoJobItemTable(SQLModel, table=True):
+    """Checkpoint por ingrediente: ao retomar, itens "ok" são pulados e os com "erro" repetidos."""
+
+    __tablename__ = "enriquecimento_job_itens"
+
+    job_id: str = Field(foreign_key="enriquecimento_jobs.id", primary_key=True, max_length=32)
+    id_ingrediente: int = Field(primary_key=True)
+    status: str  # ok, erro
+    erro: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
+
+
+class EnriquecimentoJobOut(BaseModel):
+    id: str
+    tipo: str
+    status: str
+    etapa: int
+    total: int
+    processados: int
+    erros: int
+    percentual: float | None = None
+    itens_por_segundo: float | None = None
+    eta_segundos: float | None = None
+    resultado: dict[str, Any] | None = None
+    erro: str | None = None
+    ultimos_erros: list[dict] = []
+    created_at: datetime
+    started_at: datetime | None = None
+    updated_at: datetime
+    finished_at: datetime | None = None
@@ -8,8 +8,8 @@ class ProdutoClienteTable(SQLModel, table=True):
     __tablename__ = "produtos_cliente"
 
     id_produto: Optional[int] = Field(default=None, primary_key=True)
-    nome_produto: str
-    tipo_produto: Optional[str] = None
+    nome_produto: str = Field(index=True)
+    tipo_produto: Optional[str] = Field(default=None, index=True)
     marca: Optional[str] = None
     imagem_produto: Optional[str] = None
     descricao: Optional[str] = None
@@ -30,3 +30,8 @@ class ProdutoOut(BaseModel):
     marca: str | None = None
     imagem: str | None = None
     descricao: str | None = None
+
+
+class ProdutosBulkOut(BaseModel):
+    total: int
+    ids: list[int]
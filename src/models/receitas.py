@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Any, List, Optional
 
 from pydantic import BaseModel, HttpUrl
+from sqlalchemy import JSON
 from sqlmodel import Field, SQLModel, Column, Text
 
 
@@ -11,11 +12,11 @@ class ReceitaTable(SQLModel, table=True):
     id_receita: Optional[int] = Field(default=None, primary_key=True)
     id_produto: int = Field(foreign_key="produtos_cliente.id_produto")
     status: str = Field(default="pending")
-    json_ingredientes: Optional[str] = Field(
-        default=None, sa_column=Column(Text, nullable=True)
+    json_ingredientes: Optional[list] = Field(
+        default=None, sa_column=Column(JSON, nullable=True)
     )
-    json_modo_preparo: Optional[str] = Field(
-        default=None, sa_column=Column(Text, nullable=True)
+    json_modo_preparo: Optional[list] = Field(
+        default=None, sa_column=Column(JSON, nullable=True)
     )
     content_html: Optional[str] = Field(
         default=None, sa_column=Column(Text, nullable=True)
@@ -25,6 +26,26 @@ class ReceitaTable(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
 
+class ReceitaIngredienteTable(SQLModel, table=True):
+    """
+    Ingredientes de cada receita, um por linha: "receitas que usam X" vira
+    uma busca por índice (id_ingrediente ou nome_chave). id_ingrediente fica
+    nulo quando o nome não existia no cadastro ao salvar a receita; a busca
+    por id também casa pelo nome_chave do ingrediente.
+    """
+    __tablename__ = "receita_ingredientes"
+
+    id_receita: int = Field(foreign_key="receitas.id_receita", primary_key=True)
+    posicao: int = Field(primary_key=True)
+    id_ingrediente: Optional[int] = Field(
+        default=None, foreign_key="ingredientes.id_ingrediente", index=True
+    )
+    nome: str
+    nome_chave: str = Field(index=True)
+    quantidade: Optional[str] = None
+    unidade: Optional[str] = None
+
+
 class ReceitaCreate(BaseModel):
     id_produto: int
     descricao_cliente: Optional[str] = None
@@ -44,3 +65,10 @@ class ReceitaOut(BaseModel):
     imagens: List[ImagemPasso] = []
     content_html: str | None = None
     link_wp: HttpUrl | None = None
+
+
+class ReceitaResumoOut(BaseModel):
+    id: int
+    id_produto: int
+    status: str
+    created_at: datetime
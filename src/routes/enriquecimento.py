@@ -2,12 +2,14 @@
 Rotas para enriquecimento automático do banco de dados e RAG.
 """
 
-from fastapi import APIRouter, Depends, BackgroundTasks, Query
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Query
 from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.core.db import get_session
+from src.core.db import get_async_session
 from src.core.settings import Settings
+from src.models.jobs import EnriquecimentoJobOut
+from src.service.enriquecimento_jobs import EnriquecimentoJobs
 from src.service.enriquecimento_service import EnriquecimentoService
 
 
@@ -15,6 +17,7 @@ router = APIRouter(prefix="/enriquecimento", tags=["enriquecimento"])
 
 settings = Settings()
 enriquecimento_service = EnriquecimentoService(settings)
+jobs = EnriquecimentoJobs(enriquecimento_service)
 
 
 class EnriquecerIngredienteRequest(BaseModel):
@@ -34,7 +37,7 @@ class PopularRAGIngredienteRequest(BaseModel):
 @router.post("/ingrediente")
 async def enriquecer_ingrediente(
     request: EnriquecerIngredienteRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     """
     Enriquece um ingrediente específico com dados do USDA, Open Food Facts e TheMealDB.
@@ -63,7 +66,7 @@ async def enriquecer_ingrediente(
 
 @router.post("/importar-themealdb")
 async def importar_ingredientes_themealdb(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     """
     Importa todos os ingredientes do TheMealDB para o banco de dados local.
@@ -80,21 +83,17 @@ async def importar_ingredientes_themealdb(
 
 
 @router.post("/enriquecer-todos")
-async def enriquecer_todos_ingredientes(
-    background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
-):
+async def enriquecer_todos_ingredientes():
     """
     Enriquece todos os ingredientes do banco com dados das APIs externas.
-    Executa em background devido ao tempo de processamento.
+    Executa como job em background; acompanhe em /enriquecimento/jobs/{job_id}.
     """
-    async def _enriquecer():
-        return await enriquecimento_service.enriquecer_todos_ingredientes(session)
-
-    background_tasks.add_task(_enriquecer)
+    job_id = await jobs.criar("enriquecer_todos")
+    jobs.iniciar(job_id)
     return {
         "status": "processing",
-        "message": "Enriquecimento iniciado em background. Consulte os ingredientes para ver o progresso.",
+        "job_id": job_id,
+        "message": f"Enriquecimento iniciado em background. Acompanhe em /enriquecimento/jobs/{job_id}",
     }
 
 
@@ -136,7 +135,7 @@ async def popular_rag_receitas_por_ingrediente(request: PopularRAGIngredienteReq
 
 
 @router.post("/rag/ingredientes")
-async def popular_rag_ingredientes(session: Session = Depends(get_session)):
+async def popular_rag_ingredientes(session: AsyncSession = Depends(get_async_session)):
     """
     Adiciona todos os ingredientes do banco ao RAG com informações nutricionais.
     """
@@ -148,10 +147,7 @@ async def popular_rag_ingredientes(session: Session = Depends(get_session)):
 
 
 @router.post("/tudo")
-async def enriquecer_tudo(
-    background_tasks: BackgroundTasks,
-    session: Session = Depends(get_session),
-):
+async def enriquecer_tudo():
     """
     🚀 ENRIQUECIMENTO COMPLETO AUTOMÁTICO
     
@@ -161,40 +157,64 @@ async def enriquecer_tudo(
     3. Adiciona ingredientes ao RAG
     4. Popula RAG com receitas do TheMealDB
     
-    Este processo pode demorar vários minutos.
+    Este processo pode demorar vários minutos: roda como job em background,
+    com checkpoints, e é retomado de onde parou se a aplicação reiniciar.
     """
-    resultado = await enriquecimento_service.enriquecer_tudo_automatico(session)
+    job_id = await jobs.criar("tudo")
+    jobs.iniciar(job_id)
     return {
-        "status": "ok" if resultado["sucesso"] else "parcial",
-        "mensagem": "Enriquecimento completo executado!",
-        **resultado,
+        "status": "processing",
+        "job_id": job_id,
+        "mensagem": f"Enriquecimento completo iniciado. Acompanhe em /enriquecimento/jobs/{job_id}",
     }
 
 
+@router.get("/jobs", response_model=list[EnriquecimentoJobOut])
+async def listar_jobs(limite: int = Query(20, ge=1, le=100)):
+    """Lista os jobs de enriquecimento mais recentes."""
+    return await jobs.listar(limite)
+
+
+@router.get("/jobs/{job_id}", response_model=EnriquecimentoJobOut)
+async def obter_job(job_id: str):
+    """Progresso de um job: itens processados, erros, itens/s e ETA."""
+    job = await jobs.obter(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancelar")
+async def cancelar_job(job_id: str):
+    """Cancela um job; os itens já processados continuam gravados."""
+    if not await jobs.cancelar(job_id):
+        raise HTTPException(status_code=409, detail="Job não encontrado ou já finalizado")
+    return {"status": "cancelando", "job_id": job_id}
+
+
+@router.post("/jobs/{job_id}/retomar")
+async def retomar_job(job_id: str):
+    """Retoma um job cancelado ou com erro a partir do último checkpoint."""
+    if not await jobs.retomar(job_id):
+        raise HTTPException(status_code=409, detail="Job não encontrado ou já concluído")
+    return {"status": "processing", "job_id": job_id}
+
+
 @router.get("/status")
-async def status_enriquecimento(session: Session = Depends(get_session)):
+async def status_enriquecimento(session: AsyncSession = Depends(get_async_session)):
     """
     Retorna estatísticas do banco de dados e RAG.
     """
     from sqlmodel import func, select
     from src.models.ingredientes import IngredienteTable
 
-    total = session.exec(select(func.count(IngredienteTable.id_ingrediente))).one()
-    com_usda = session.exec(
-        select(func.count(IngredienteTable.id_ingrediente)).where(
-            IngredienteTable.usda_fdc_id.isnot(None)
-        )
-    ).one()
-    com_off = session.exec(
-        select(func.count(IngredienteTable.id_ingrediente)).where(
-            IngredienteTable.openfoodfacts_id.isnot(None)
-        )
-    ).one()
-    com_nutricao = session.exec(
-        select(func.count(IngredienteTable.id_ingrediente)).where(
-            IngredienteTable.calorias.isnot(None)
-        )
-    ).one()
+    def contar(*filtros):
+        return select(func.count(IngredienteTable.id_ingrediente)).where(*filtros)
+
+    total = (await session.exec(contar())).one()
+    com_usda = (await session.exec(contar(IngredienteTable.usda_fdc_id.isnot(None)))).one()
+    com_off = (await session.exec(contar(IngredienteTable.openfoodfacts_id.isnot(None)))).one()
+    com_nutricao = (await session.exec(contar(IngredienteTable.calorias.isnot(None)))).one()
 
     return {
         "ingredientes": {
@@ -1,15 +1,56 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from sqlmodel import Session, select
+from typing import Annotated, Literal
 
+from fastapi import APIRouter, Body, Depends, Query, Request, status, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from src.core.bulk import BULK_MAX_ITENS, inserir_em_lotes
 from src.core.db import get_session
+from src.core.listagem import (
+    cabecalhos_paginacao,
+    colunas_projetadas,
+    exportar_linhas,
+    pagina_keyset,
+)
 from src.models.ingredientes import (
     IngredienteCreate,
     IngredienteOut,
+    IngredientesBulkOut,
     IngredienteTable,
+    chave_nome,
 )
 
 router = APIRouter(prefix="/ingredientes", tags=["ingredientes"])
 
+# Campo de IngredienteOut -> coluna da tabela
+CAMPOS = {
+    "id": IngredienteTable.id_ingrediente,
+    "nome_singular": IngredienteTable.nome_singular,
+    "nome_plural": IngredienteTable.nome_plural,
+    "tipo": IngredienteTable.tipo_ingrediente,
+    "imagem": IngredienteTable.imagem_ingrediente,
+    "descricao": IngredienteTable.descricao,
+    "usda_fdc_id": IngredienteTable.usda_fdc_id,
+    "openfoodfacts_id": IngredienteTable.openfoodfacts_id,
+    "foodon_id": IngredienteTable.foodon_id,
+    "calorias": IngredienteTable.calorias,
+    "proteinas": IngredienteTable.proteinas,
+    "carboidratos": IngredienteTable.carboidratos,
+    "gorduras": IngredienteTable.gorduras,
+    "fibras": IngredienteTable.fibras,
+}
+
+
+def _filtros(tipo: str | None, prefixo: str | None) -> list:
+    filtros = []
+    if tipo:
+        filtros.append(IngredienteTable.tipo_ingrediente == tipo)
+    if prefixo:
+        # nome_chave é normalizado e indexado: "maç" encontra "Maçã"
+        filtros.append(IngredienteTable.nome_chave.startswith(chave_nome(prefixo), autoescape=True))
+    return filtros
+
 
 def _to_ingrediente_out(ingrediente: IngredienteTable) -> IngredienteOut:
     return IngredienteOut(
@@ -34,15 +75,98 @@ def _to_ingrediente_out(ingrediente: IngredienteTable) -> IngredienteOut:
 def criar_ingrediente(payload: IngredienteCreate, session: Session = Depends(get_session)):
     ingrediente = IngredienteTable(**payload.model_dump())
     session.add(ingrediente)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Ingrediente já cadastrado")
     session.refresh(ingrediente)
     return _to_ingrediente_out(ingrediente)
 
 
-@router.get("", response_model=list[IngredienteOut])
-def listar_ingredientes(session: Session = Depends(get_session)):
-    itens = session.exec(select(IngredienteTable)).all()
-    return [_to_ingrediente_out(i) for i in itens]
+@router.post("/bulk", response_model=IngredientesBulkOut, status_code=status.HTTP_201_CREATED)
+def criar_ingredientes_em_lote(
+    payload: Annotated[list[IngredienteCreate], Body(min_length=1, max_length=BULK_MAX_ITENS)],
+    session: Session = Depends(get_session),
+):
+    """
+    Cria vários ingredientes em uma transação, com INSERTs de várias linhas.
+    Tudo ou nada: um nome repetido (na lista ou no banco) devolve 409.
+    """
+    linhas = []
+    for item in payload:
+        linha = item.model_dump()
+        # INSERT em lote não dispara o before_insert que preenche a chave
+        linha["nome_chave"] = chave_nome(item.nome_singular)
+        linhas.append(linha)
+
+    try:
+        ids = inserir_em_lotes(
+            session, IngredienteTable, IngredienteTable.id_ingrediente, linhas
+        )
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Ingrediente já cadastrado")
+    return IngredientesBulkOut(total=len(ids), ids=ids)
+
+
+@router.get(
+    "",
+    response_model=None,
+    responses={200: {"model": list[IngredienteOut], "description": "Ingredientes (só os campos de `fields`, se informado)"}},
+)
+def listar_ingredientes(
+    request: Request,
+    after: int | None = Query(None, description="Cursor: id do último ingrediente da página anterior"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: str | None = Query(None, description="Campos separados por vírgula (ex.: id,nome_singular)"),
+    tipo: str | None = Query(None, description="Filtra por tipo_ingrediente"),
+    prefixo: str | None = Query(None, description="Filtra pelo início do nome (sem acentos/maiúsculas)"),
+    session: Session = Depends(get_session),
+):
+    """
+    Lista ingredientes em ordem de id, paginando por cursor: a próxima página
+    vem em X-Next-Cursor / Link (use ?after=<cursor>).
+    """
+    try:
+        colunas = colunas_projetadas(fields, CAMPOS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    itens, proximo = pagina_keyset(
+        session, IngredienteTable.id_ingrediente, colunas, _filtros(tipo, prefixo), after, limit
+    )
+    return JSONResponse(itens, headers=cabecalhos_paginacao(str(request.url), proximo))
+
+
+@router.get("/export")
+def exportar_ingredientes(
+    formato: Literal["ndjson", "csv"] = Query("ndjson"),
+    fields: str | None = Query(None, description="Campos separados por vírgula"),
+    tipo: str | None = Query(None),
+    prefixo: str | None = Query(None),
+    session: Session = Depends(get_session),
+):
+    """
+    Exporta a tabela inteira em streaming (NDJSON ou CSV), lendo do banco em
+    páginas keyset de 1000 linhas: a memória fica limitada a uma página.
+    """
+    try:
+        colunas = colunas_projetadas(fields, CAMPOS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    linhas = exportar_linhas(
+        session, IngredienteTable.id_ingrediente, colunas, _filtros(tipo, prefixo), formato
+    )
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    extensao = "csv" if formato == "csv" else "ndjson"
+    return StreamingResponse(
+        linhas,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="ingredientes.{extensao}"'},
+    )
 
 
 @router.get("/{ingrediente_id}", response_model=IngredienteOut)
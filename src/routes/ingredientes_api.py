@@ -5,6 +5,7 @@ Rotas para integração com APIs externas de ingredientes.
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+from src.core.http_cache import get_http_cache
 from src.core.settings import Settings
 from src.service.ingredientes_api import (
     IngredientesAPIService,
@@ -12,12 +13,19 @@ from src.service.ingredientes_api import (
     OpenFoodFactsProduct,
     TheMealDBIngredient,
 )
+from src.service.rate_limiter import get_rate_limiter
+from src.service.themealdb_mirror import get_themealdb_mirror
 
 
 router = APIRouter(prefix="/ingredientes-api", tags=["ingredientes-api"])
 
 settings = Settings()
-api_service = IngredientesAPIService(usda_api_key=settings.usda_api_key)
+api_service = IngredientesAPIService(
+    usda_api_key=settings.usda_api_key,
+    rate_limiter=get_rate_limiter(settings),
+    cache=get_http_cache(settings),
+    mirror=get_themealdb_mirror(settings),
+)
 
 
 class EnrichRequest(BaseModel):
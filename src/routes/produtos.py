@@ -1,11 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from typing import Annotated, Literal
 
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlmodel import Session
+
+from src.core.bulk import BULK_MAX_ITENS, inserir_em_lotes
 from src.core.db import get_session
-from src.models.produtos import ProdutoClienteTable, ProdutoCreate, ProdutoOut
+from src.core.listagem import (
+    cabecalhos_paginacao,
+    colunas_projetadas,
+    exportar_linhas,
+    pagina_keyset,
+)
+from src.models.produtos import ProdutosBulkOut, ProdutoClienteTable, ProdutoCreate, ProdutoOut
 
 router = APIRouter(prefix="/produtos", tags=["produtos"])
 
+# Campo de ProdutoOut -> coluna da tabela
+CAMPOS = {
+    "id": ProdutoClienteTable.id_produto,
+    "nome": ProdutoClienteTable.nome_produto,
+    "tipo": ProdutoClienteTable.tipo_produto,
+    "marca": ProdutoClienteTable.marca,
+    "imagem": ProdutoClienteTable.imagem_produto,
+    "descricao": ProdutoClienteTable.descricao,
+}
+
+
+def _filtros(tipo: str | None, prefixo: str | None) -> list:
+    filtros = []
+    if tipo:
+        filtros.append(ProdutoClienteTable.tipo_produto == tipo)
+    if prefixo:
+        filtros.append(ProdutoClienteTable.nome_produto.startswith(prefixo, autoescape=True))
+    return filtros
+
 
 @router.post("", response_model=ProdutoOut, status_code=status.HTTP_201_CREATED)
 def criar_produto(payload: ProdutoCreate, session: Session = Depends(get_session)):
@@ -23,20 +52,81 @@ def criar_produto(payload: ProdutoCreate, session: Session = Depends(get_session
     )
 
 
-@router.get("", response_model=list[ProdutoOut])
-def listar_produtos(session: Session = Depends(get_session)):
-    produtos = session.exec(select(ProdutoClienteTable)).all()
-    return [
-        ProdutoOut(
-            id=p.id_produto,
-            nome=p.nome_produto,
-            tipo=p.tipo_produto,
-            marca=p.marca,
-            imagem=p.imagem_produto,
-            descricao=p.descricao,
-        )
-        for p in produtos
-    ]
+@router.post("/bulk", response_model=ProdutosBulkOut, status_code=status.HTTP_201_CREATED)
+def criar_produtos_em_lote(
+    payload: Annotated[list[ProdutoCreate], Body(min_length=1, max_length=BULK_MAX_ITENS)],
+    session: Session = Depends(get_session),
+):
+    """
+    Cria vários produtos em uma transação, com INSERTs de várias linhas.
+    Os ids voltam na mesma ordem da lista enviada.
+    """
+    ids = inserir_em_lotes(
+        session,
+        ProdutoClienteTable,
+        ProdutoClienteTable.id_produto,
+        [p.model_dump(mode="json") for p in payload],
+    )
+    session.commit()
+    return ProdutosBulkOut(total=len(ids), ids=ids)
+
+
+@router.get(
+    "",
+    response_model=None,
+    responses={200: {"model": list[ProdutoOut], "description": "Produtos (só os campos de `fields`, se informado)"}},
+)
+def listar_produtos(
+    request: Request,
+    after: int | None = Query(None, description="Cursor: id do último produto da página anterior"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: str | None = Query(None, description="Campos separados por vírgula (ex.: id,nome)"),
+    tipo: str | None = Query(None, description="Filtra por tipo_produto"),
+    prefixo: str | None = Query(None, description="Filtra pelo início do nome"),
+    session: Session = Depends(get_session),
+):
+    """
+    Lista produtos em ordem de id, paginando por cursor: a próxima página vem
+    em X-Next-Cursor / Link (use ?after=<cursor>).
+    """
+    try:
+        colunas = colunas_projetadas(fields, CAMPOS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    itens, proximo = pagina_keyset(
+        session, ProdutoClienteTable.id_produto, colunas, _filtros(tipo, prefixo), after, limit
+    )
+    return JSONResponse(itens, headers=cabecalhos_paginacao(str(request.url), proximo))
+
+
+@router.get("/export")
+def exportar_produtos(
+    formato: Literal["ndjson", "csv"] = Query("ndjson"),
+    fields: str | None = Query(None, description="Campos separados por vírgula"),
+    tipo: str | None = Query(None),
+    prefixo: str | None = Query(None),
+    session: Session = Depends(get_session),
+):
+    """
+    Exporta a tabela inteira em streaming (NDJSON ou CSV), lendo do banco em
+    páginas keyset de 1000 linhas: a memória fica limitada a uma página.
+    """
+    try:
+        colunas = colunas_projetadas(fields, CAMPOS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    linhas = exportar_linhas(
+        session, ProdutoClienteTable.id_produto, colunas, _filtros(tipo, prefixo), formato
+    )
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    extensao = "csv" if formato == "csv" else "ndjson"
+    return StreamingResponse(
+        linhas,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="produtos.{extensao}"'},
+    )
 
 
 @router.get("/{produto_id}", response_model=ProdutoOut)
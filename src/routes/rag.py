@@ -23,9 +23,22 @@ class UrlInput(BaseModel):
     metadata: Optional[dict] = None
 
 
+class SearchFilters(BaseModel):
+    """Filtros de metadata aplicados pelo índice de payload do Qdrant."""
+    tipo: Optional[str] = None
+    source_file: Optional[str] = None
+    page: Optional[int] = None
+
+
 class SearchInput(BaseModel):
     query: str
     num_documents: int = 5
+    filters: Optional[SearchFilters] = None
+
+    def filters_dict(self) -> Optional[dict]:
+        if not self.filters:
+            return None
+        return self.filters.model_dump(exclude_none=True) or None
 
 
 class SearchResult(BaseModel):
@@ -57,6 +70,7 @@ def search_receitas(payload: SearchInput):
     results = rag_service.search_receitas(
         query=payload.query,
         num_documents=payload.num_documents,
+        filters=payload.filters_dict(),
     )
     return SearchResult(results=results or [])
 
@@ -86,5 +100,6 @@ def search_fotografia(payload: SearchInput):
     results = rag_service.search_fotografia(
         query=payload.query,
         num_documents=payload.num_documents,
+        filters=payload.filters_dict(),
     )
     return SearchResult(results=results or [])
@@ -5,12 +5,17 @@ from pathlib import Path
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, BackgroundTasks
 from fastapi.responses import HTMLResponse
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.core.db import get_session
+from src.core.db import get_async_session, get_session
 from src.core.settings import Settings
-from src.models.receitas import ReceitaCreate, ReceitaOut, ReceitaTable, ImagemPasso
+from src.models.receitas import ReceitaCreate, ReceitaOut, ReceitaResumoOut, ReceitaTable, ImagemPasso
 from src.models.produtos import ProdutoClienteTable
-from src.service.receitas_service import criar_receita as criar_receita_db, obter_receita as obter_receita_db
+from src.service.receitas_service import (
+    criar_receita as criar_receita_db,
+    obter_receita as obter_receita_db,
+    receitas_por_ingrediente,
+)
 from src.agents.orquestrador import Orquestrador
 
 router = APIRouter(prefix="/receitas", tags=["receitas"])
@@ -61,6 +66,26 @@ def criar_receita(
     )
 
 
+@router.get("/por-ingrediente", response_model=list[ReceitaResumoOut])
+def listar_por_ingrediente(
+    ingrediente_id: int | None = None,
+    nome: str | None = None,
+    session: Session = Depends(get_session),
+):
+    """Receitas que usam o ingrediente (id do cadastro ou nome)."""
+    if ingrediente_id is None and not (nome and nome.strip()):
+        raise HTTPException(status_code=422, detail="Informe ingrediente_id ou nome")
+    return [
+        ReceitaResumoOut(
+            id=receita.id_receita,
+            id_produto=receita.id_produto,
+            status=receita.status,
+            created_at=receita.created_at,
+        )
+        for receita in receitas_por_ingrediente(session, ingrediente_id, nome)
+    ]
+
+
 @router.get("/{receita_id}", response_model=ReceitaOut)
 def obter_receita(receita_id: int, session: Session = Depends(get_session)):
     receita = obter_receita_db(session, receita_id)
@@ -80,10 +105,10 @@ def obter_receita(receita_id: int, session: Session = Depends(get_session)):
 
 @router.websocket("/stream/{receita_id}")
 async def stream_receita(
-    websocket: WebSocket, receita_id: int, session: Session = Depends(get_session)
+    websocket: WebSocket, receita_id: int, session: AsyncSession = Depends(get_async_session)
 ):
     await websocket.accept()
-    receita = session.get(ReceitaTable, receita_id)
+    receita = await session.get(ReceitaTable, receita_id)
     if not receita:
         await websocket.send_json({"error": "Receita não encontrada"})
         await websocket.close()
@@ -2,14 +2,25 @@
 Rotas para integração com TheMealDB API.
 """
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Query
 
+from src.core.http_cache import get_http_cache
+from src.core.settings import Settings
+from src.service.rate_limiter import get_rate_limiter
+from src.service.themealdb_mirror import get_themealdb_mirror
 from src.service.themealdb_service import TheMealDBService, MealDBRecipe
 
 
 router = APIRouter(prefix="/themealdb", tags=["themealdb"])
 
-service = TheMealDBService()
+settings = Settings()
+service = TheMealDBService(
+    rate_limiter=get_rate_limiter(settings),
+    cache=get_http_cache(settings),
+    mirror=get_themealdb_mirror(settings),
+)
 
 
 @router.get("/search", response_model=list[MealDBRecipe])
@@ -60,6 +71,25 @@ async def filter_by_ingredient(ingredient: str):
     return await service.filter_by_ingredient(ingredient)
 
 
+@router.get("/mirror")
+async def mirror_status():
+    """Estado do espelho local do TheMealDB."""
+    if not service.mirror:
+        raise HTTPException(status_code=503, detail="Espelho local desabilitado")
+    return await asyncio.to_thread(service.mirror.stats)
+
+
+@router.post("/mirror/sync")
+async def sync_mirror(force: bool = Query(False, description="Ignora a idade máxima do espelho")):
+    """Sincroniza o espelho local com o TheMealDB (só grava receitas novas ou alteradas)."""
+    if not service.mirror:
+        raise HTTPException(status_code=503, detail="Espelho local desabilitado")
+    try:
+        return await service.sync_mirror(max_age=0 if force else settings.themealdb_mirror_max_age)
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
 @router.get("/recipe/{meal_id}/rag-content")
 async def get_recipe_rag_content(meal_id: str):
     """Obtém o conteúdo de uma receita formatado para RAG."""
@@ -6,9 +6,9 @@ from typing import Optional
 
 from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.core.db import get_session
+from src.core.db import get_async_session
 from src.core.settings import Settings
 from src.models.produtos import ProdutoClienteTable
 from src.service.rag_service import RAGService
@@ -37,7 +37,7 @@ class UploadResponse(BaseModel):
 async def upload_imagem_produto(
     produto_id: int,
     file: UploadFile = File(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     produto_dir = PRODUTOS_DIR / str(produto_id)
     produto_dir.mkdir(parents=True, exist_ok=True)
@@ -50,11 +50,11 @@ async def upload_imagem_produto(
         shutil.copyfileobj(file.file, buffer)
 
     # Atualizar o caminho da imagem no banco de dados
-    produto = session.get(ProdutoClienteTable, produto_id)
+    produto = await session.get(ProdutoClienteTable, produto_id)
     if produto:
         produto.imagem_produto = str(file_path)
         session.add(produto)
-        session.commit()
+        await session.commit()
 
     return UploadResponse(
         filename=filename,
@@ -0,0 +1,212 @@
+"""
+Jobs de enriquecimento persistidos no banco. Cada job roda em uma task
+própria, com sessão própria, grava checkpoints por item e pode ser
+acompanhado, cancelado e retomado (inclusive após reiniciar a aplicação).
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.db import new_async_session
+from src.models.jobs import (
+    EnriquecimentoJobItemTable,
+    EnriquecimentoJobOut,
+    EnriquecimentoJobTable,
+)
+from src.service.enriquecimento_service import EnriquecimentoPausado, EnriquecimentoService
+
+logger = logging.getLogger(__name__)
+
+TIPOS = ("enriquecer_todos", "tudo")
+ATIVOS = ("pending", "running")
+
+
+class EnriquecimentoJobs:
+    def __init__(
+        self,
+        service: EnriquecimentoService,
+        session_factory: Callable[[], AsyncSession] = new_async_session,
+    ):
+        self.service = service
+        self.session_factory = session_factory
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._cancelar: dict[str, asyncio.Event] = {}
+
+    async def criar(self, tipo: str) -> str:
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de job inválido: {tipo}")
+        async with self.session_factory() as session:
+            job = EnriquecimentoJobTable(tipo=tipo)
+            session.add(job)
+            await session.commit()
+            return job.id
+
+    def iniciar(self, job_id: str) -> None:
+        if job_id in self._tasks:
+            return
+        self._cancelar[job_id] = asyncio.Event()
+        task = asyncio.create_task(self._executar(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._finalizar_task(job_id))
+
+    def _finalizar_task(self, job_id: str) -> None:
+        self._tasks.pop(job_id, None)
+        self._cancelar.pop(job_id, None)
+
+    async def _executar(self, job_id: str) -> None:
+        cancelado = self._cancelar[job_id]
+        async with self.session_factory() as session:
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            job.status = "running"
+            job.erro = None
+            job.started_at = datetime.utcnow()
+            job.finished_at = None
+            job.processados_inicio = job.processados
+            session.add(job)
+            await session.commit()
+
+            try:
+                if job.tipo == "tudo":
+                    resultado = await self.service.enriquecer_tudo_automatico(
+                        session, job_id=job_id, cancelado=cancelado
+                    )
+                else:
+                    resultado = await self.service.enriquecer_todos_ingredientes(
+                        session, job_id=job_id, cancelado=cancelado
+                    )
+                status, erro = ("cancelled" if cancelado.is_set() else "done"), None
+            except EnriquecimentoPausado as e:
+                # API externa fora do ar: os itens restantes ficam para a retomada
+                logger.warning("Job de enriquecimento %s pausado: %s", job_id, e)
+                resultado, status, erro = None, "paused", str(e)
+            except Exception as e:
+                logger.exception("Job de enriquecimento %s falhou", job_id)
+                await session.rollback()
+                resultado, status, erro = None, "error", str(e)
+
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            job.status = status
+            job.erro = erro
+            if resultado is not None:
+                job.resultado = json.dumps(resultado)
+            job.finished_at = job.updated_at = datetime.utcnow()
+            session.add(job)
+            await session.commit()
+
+    async def cancelar(self, job_id: str) -> bool:
+        """Pede o cancelamento; jobs sem task em execução são cancelados direto."""
+        if job_id in self._cancelar:
+            self._cancelar[job_id].set()
+            return True
+        async with self.session_factory() as session:
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            if not job or job.status not in ATIVOS:
+                return False
+            job.status = "cancelled"
+            job.finished_at = job.updated_at = datetime.utcnow()
+            session.add(job)
+            await session.commit()
+        return True
+
+    async def retomar(self, job_id: str) -> bool:
+        """
+        Retoma um job interrompido, pausado, cancelado ou com erro a partir do
+        checkpoint. Um job "enriquecer_todos" concluído com itens com erro
+        também pode ser retomado: só esses itens são tentados de novo.
+        """
+        async with self.session_factory() as session:
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            if not job:
+                return False
+            if job.status == "done" and not (job.tipo == "enriquecer_todos" and job.erros):
+                return False
+        self.iniciar(job_id)
+        return True
+
+    async def retomar_interrompidos(self) -> list[str]:
+        """
+        Na inicialização, jobs ainda marcados como ativos pertenciam a um
+        processo que terminou no meio; continuam de onde pararam.
+        """
+        async with self.session_factory() as session:
+            ids = (
+                await session.exec(
+                    select(EnriquecimentoJobTable.id).where(EnriquecimentoJobTable.status.in_(ATIVOS))
+                )
+            ).all()
+        for job_id in ids:
+            logger.info("Retomando job de enriquecimento %s", job_id)
+            self.iniciar(job_id)
+        return list(ids)
+
+    async def obter(self, job_id: str) -> EnriquecimentoJobOut | None:
+        async with self.session_factory() as session:
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            if not job:
+                return None
+            ultimos_erros = (
+                await session.exec(
+                    select(EnriquecimentoJobItemTable)
+                    .where(
+                        EnriquecimentoJobItemTable.job_id == job_id,
+                        EnriquecimentoJobItemTable.status == "erro",
+                    )
+                    .limit(20)
+                )
+            ).all()
+            return self._to_out(job, ultimos_erros)
+
+    async def listar(self, limite: int = 20) -> list[EnriquecimentoJobOut]:
+        async with self.session_factory() as session:
+            jobs = (
+                await session.exec(
+                    select(EnriquecimentoJobTable)
+                    .order_by(EnriquecimentoJobTable.created_at.desc())
+                    .limit(limite)
+                )
+            ).all()
+            return [self._to_out(job) for job in jobs]
+
+    @staticmethod
+    def _to_out(
+        job: EnriquecimentoJobTable, ultimos_erros: list[EnriquecimentoJobItemTable] = ()
+    ) -> EnriquecimentoJobOut:
+        itens_por_segundo = eta = percentual = None
+        if job.total:
+            percentual = round(100 * job.processados / job.total, 1)
+        if job.started_at:
+            fim = job.finished_at or datetime.utcnow()
+            decorrido = (fim - job.started_at).total_seconds()
+            feitos = job.processados - job.processados_inicio
+            if decorrido > 0 and feitos > 0:
+                itens_por_segundo = round(feitos / decorrido, 3)
+                if job.status == "running":
+                    eta = round(max(job.total - job.processados, 0) / itens_por_segundo, 1)
+
+        return EnriquecimentoJobOut(
+            id=job.id,
+            tipo=job.tipo,
+            status=job.status,
+            etapa=job.etapa,
+            total=job.total,
+            processados=job.processados,
+            erros=job.erros,
+            percentual=percentual,
+            itens_por_segundo=itens_por_segundo,
+            eta_segundos=eta,
+            resultado=json.loads(job.resultado) if job.resultado else None,
+            erro=job.erro,
+            ultimos_erros=[
+                {"id_ingrediente": item.id_ingrediente, "erro": item.erro} for item in ultimos_erros
+            ],
+            created_at=job.created_at,
+            started_at=job.started_at,
+            updated_at=job.updated_at,
+            finished_at=job.finished_at,
+        )
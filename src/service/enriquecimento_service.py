@@ -7,44 +7,99 @@ Combina dados de USDA, Open Food Facts, TheMealDB para popular:
 """
 
 import asyncio
+import json
+from datetime import datetime
 from typing import Optional
 
-from sqlmodel import Session, select
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.core.http_cache import get_http_cache
 from src.core.settings import Settings
-from src.core.db import get_session
-from src.models.ingredientes import IngredienteTable
+from src.models.ingredientes import IngredienteTable, chave_nome
+from src.models.jobs import EnriquecimentoJobItemTable, EnriquecimentoJobTable
 from src.service.ingredientes_api import IngredientesAPIService
-from src.service.themealdb_service import TheMealDBService
+from src.service.themealdb_mirror import get_themealdb_mirror
+from src.service.themealdb_service import MealDBRecipe, TheMealDBService
 from src.service.rag_service import RAGService
 from src.service.image_downloader import ImageDownloader
+from src.service.image_index import get_image_index
+from src.service.image_normalizer import get_image_normalizer
+from src.service.rate_limiter import UpstreamError, get_rate_limiter
+
+# Marca o fim de uma fila do pipeline de ingestão
+_FIM = object()
+
+ETAPAS = (
+    "etapa_1_importar",
+    "etapa_2_enriquecer",
+    "etapa_3_rag_ingredientes",
+    "etapa_4_rag_receitas",
+)
+
+
+class EnriquecimentoPausado(Exception):
+    """
+    API externa indisponível (429, 5xx, rede ou circuito aberto): o enriquecimento para
+    sem registrar os itens restantes, que ficam para a retomada do job.
+    """
+
+    def __init__(self, causa: UpstreamError):
+        super().__init__(str(causa))
+        self.retry_in = getattr(causa, "retry_in", None)
 
 
 class EnriquecimentoService:
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.ingredientes_api = IngredientesAPIService(usda_api_key=settings.usda_api_key)
-        self.themealdb = TheMealDBService()
+        rate_limiter = get_rate_limiter(settings)
+        http_cache = get_http_cache(settings)
+        mirror = get_themealdb_mirror(settings)
+        self.ingredientes_api = IngredientesAPIService(
+            usda_api_key=settings.usda_api_key,
+            rate_limiter=rate_limiter,
+            cache=http_cache,
+            mirror=mirror,
+        )
+        self.themealdb = TheMealDBService(
+            rate_limiter=rate_limiter, cache=http_cache, mirror=mirror
+        )
         self.rag_service = RAGService(settings)
-        self.image_downloader = ImageDownloader(base_path="media")
-
-    async def enriquecer_ingrediente_por_nome(
-        self, session: Session, nome: str
-    ) -> IngredienteTable:
-        """
-        Busca ou cria um ingrediente e enriquece com dados das APIs externas.
-        """
-        stmt = select(IngredienteTable).where(IngredienteTable.nome_singular == nome)
-        ingrediente = session.exec(stmt).first()
+        self.image_downloader = ImageDownloader(
+            base_path="media",
+            rate_limiter=rate_limiter,
+            max_bytes=settings.image_max_bytes,
+            allowed_types=settings.image_allowed_types,
+            index=get_image_index(settings),
+            revalidate_after=settings.image_revalidate_after,
+            normalizer=get_image_normalizer(settings),
+        )
+
+    async def _buscar_dados_ingrediente(
+        self, ingrediente_id: int, nome: str
+    ) -> tuple[dict, Optional[str]]:
+        """Consulta as APIs externas e baixa a imagem, sem tocar no banco."""
+        dados = await self.ingredientes_api.enrich_ingredient(nome)
 
-        if not ingrediente:
-            ingrediente = IngredienteTable(nome_singular=nome)
-            session.add(ingrediente)
-            session.commit()
-            session.refresh(ingrediente)
+        imagem_url = dados.get("imagem_url")
+        imagem = None
+        if imagem_url:
+            local_path = await self.image_downloader.download_ingrediente_image(
+                url=imagem_url,
+                ingrediente_id=ingrediente_id,
+                nome=nome,
+            )
+            imagem = local_path or imagem_url
 
-        dados = await self.ingredientes_api.enrich_ingredient(nome)
+        return dados, imagem
 
+    def _aplicar_dados(
+        self, ingrediente: IngredienteTable, dados: dict, imagem: Optional[str]
+    ) -> None:
         ingrediente.usda_fdc_id = dados.get("usda_fdc_id")
         ingrediente.openfoodfacts_id = dados.get("openfoodfacts_id")
         ingrediente.calorias = dados.get("calorias")
@@ -53,136 +108,357 @@ class EnriquecimentoService:
         ingrediente.gorduras = dados.get("gorduras")
         ingrediente.fibras = dados.get("fibras")
         ingrediente.tipo_ingrediente = dados.get("categoria")
+        ingrediente.imagem_ingrediente = imagem
 
-        imagem_url = dados.get("imagem_url")
-        if imagem_url:
-            local_path = await self.image_downloader.download_ingrediente_image(
-                url=imagem_url,
-                ingrediente_id=ingrediente.id_ingrediente,
-                nome=nome,
-            )
-            ingrediente.imagem_ingrediente = local_path or imagem_url
-        else:
-            ingrediente.imagem_ingrediente = None
+    async def enriquecer_ingrediente_por_nome(
+        self, session: AsyncSession, nome: str
+    ) -> IngredienteTable:
+        """
+        Busca ou cria um ingrediente e enriquece com dados das APIs externas.
+        A busca usa a chave normalizada, então "Maçã" e "maca" são o mesmo ingrediente.
+        """
+        stmt = select(IngredienteTable).where(IngredienteTable.nome_chave == chave_nome(nome))
+        ingrediente = (await session.exec(stmt)).first()
+
+        if not ingrediente:
+            ingrediente = IngredienteTable(nome_singular=nome)
+            session.add(ingrediente)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Criado por outra requisição entre o SELECT e o INSERT
+                await session.rollback()
+                ingrediente = (await session.exec(stmt)).one()
+            else:
+                await session.refresh(ingrediente)
+
+        dados, imagem = await self._buscar_dados_ingrediente(ingrediente.id_ingrediente, nome)
+        self._aplicar_dados(ingrediente, dados, imagem)
 
         session.add(ingrediente)
-        session.commit()
-        session.refresh(ingrediente)
+        await session.commit()
+        await session.refresh(ingrediente)
 
         return ingrediente
 
-    async def importar_ingredientes_themealdb(self, session: Session) -> list[IngredienteTable]:
+    async def importar_ingredientes_themealdb(self, session: AsyncSession) -> list[IngredienteTable]:
         """
         Importa todos os ingredientes do TheMealDB para o banco de dados.
+        Os nomes existentes são lidos em uma consulta, os novos são inseridos
+        em lote e as imagens baixadas em paralelo, com uma única atualização
+        em lote no final.
         """
         ingredientes_mealdb = await self.ingredientes_api.list_themealdb_ingredients()
-        ingredientes_criados = []
+        existentes = set((await session.exec(select(IngredienteTable.nome_chave))).all())
 
+        novos = {}
         for ing in ingredientes_mealdb:
-            stmt = select(IngredienteTable).where(
-                IngredienteTable.nome_singular == ing.name
+            chave = chave_nome(ing.name) if ing.name else None
+            if chave and chave not in existentes and chave not in novos:
+                novos[chave] = ing
+
+        if not novos:
+            return []
+
+        # Nomes inseridos por outra importação concorrente batem no índice único
+        # em nome_chave e são pulados. Sem IGNORE, que no MySQL também
+        # esconderia truncamentos e NOT NULL: esses erros continuam aparecendo.
+        dialeto = session.get_bind().dialect.name
+        if dialeto == "mysql":
+            stmt = mysql_insert(IngredienteTable).on_duplicate_key_update(
+                id_ingrediente=IngredienteTable.id_ingrediente
             )
-            existente = session.exec(stmt).first()
-
-            if not existente:
-                novo = IngredienteTable(
-                    nome_singular=ing.name,
-                    descricao=ing.description,
-                )
-                session.add(novo)
-                session.commit()
-                session.refresh(novo)
-                
-                if ing.image_url:
-                    local_path = await self.image_downloader.download_ingrediente_image(
-                        url=ing.image_url,
-                        ingrediente_id=novo.id_ingrediente,
-                        nome=ing.name,
-                    )
-                    novo.imagem_ingrediente = local_path or ing.image_url
-                    session.add(novo)
-                    session.commit()
-                    session.refresh(novo)
-                
-                ingredientes_criados.append(novo)
-
-        if ingredientes_criados:
-            session.commit()
-            for ing in ingredientes_criados:
-                session.refresh(ing)
-
-        return ingredientes_criados
-
-    async def enriquecer_todos_ingredientes(self, session: Session) -> dict:
+        elif dialeto == "sqlite":
+            stmt = sqlite_insert(IngredienteTable).on_conflict_do_nothing(
+                index_elements=[IngredienteTable.nome_chave]
+            )
+        else:
+            stmt = insert(IngredienteTable)
+        await session.execute(
+            stmt,
+            [
+                {"nome_singular": ing.name, "nome_chave": chave, "descricao": ing.description}
+                for chave, ing in novos.items()
+            ],
+        )
+        await session.commit()
+
+        # Ids gerados pelo banco, em uma consulta (o MySQL não tem RETURNING)
+        stmt = select(
+            IngredienteTable.id_ingrediente,
+            IngredienteTable.nome_singular,
+            IngredienteTable.nome_chave,
+        ).where(IngredienteTable.nome_chave.in_(list(novos)))
+        criados = (await session.exec(stmt)).all()
+
+        com_imagem = [
+            (ingrediente_id, nome, novos[chave].image_url)
+            for ingrediente_id, nome, chave in criados
+            if novos[chave].image_url
+        ]
+        resultados = await self.image_downloader.download_many(
+            [
+                (url, "ingredientes", self.image_downloader.ingrediente_filename(ingrediente_id, nome))
+                for ingrediente_id, nome, url in com_imagem
+            ],
+            concurrency=self.settings.enriquecimento_workers,
+        )
+        # Sem imagem local, fica a URL original (como no download individual)
+        imagens = [
+            {"id_ingrediente": ingrediente_id, "imagem_ingrediente": resultado.path or url}
+            for (ingrediente_id, _, url), resultado in zip(com_imagem, resultados)
+        ]
+        if imagens:
+            await session.execute(update(IngredienteTable), imagens)
+            await session.commit()
+
+        ids = [criado[0] for criado in criados]
+        resultado = await session.exec(
+            select(IngredienteTable)
+            .where(IngredienteTable.id_ingrediente.in_(ids))
+            .order_by(IngredienteTable.id_ingrediente)
+        )
+        return list(resultado.all())
+
+    async def enriquecer_todos_ingredientes(
+        self,
+        session: AsyncSession,
+        job_id: str | None = None,
+        cancelado: asyncio.Event | None = None,
+    ) -> dict:
         """
         Enriquece todos os ingredientes do banco com dados das APIs externas.
+        As consultas rodam em paralelo (até `enriquecimento_workers` por vez,
+        respeitando o limite de cada host) e o banco é atualizado em lotes.
+
+        Com `job_id`, cada lote grava o checkpoint dos itens no mesmo commit
+        dos dados; na retomada, os itens já enriquecidos são pulados e os que
+        deram erro são tentados de novo. `cancelado` interrompe o processamento
+        após o item em andamento. Se uma API externa ficar indisponível (429,
+        5xx, erro de rede ou circuito aberto), grava o que já terminou e levanta
+        EnriquecimentoPausado: os itens restantes não são marcados como feitos.
+        Outros erros da API (ex.: 400 numa consulta) contam só para o item.
         """
-        ingredientes = session.exec(select(IngredienteTable)).all()
+        stmt = select(IngredienteTable)
+        if job_id:
+            feitos = select(EnriquecimentoJobItemTable.id_ingrediente).where(
+                EnriquecimentoJobItemTable.job_id == job_id,
+                EnriquecimentoJobItemTable.status == "ok",
+            )
+            stmt = stmt.where(IngredienteTable.id_ingrediente.not_in(feitos))
+        ingredientes = (await session.exec(stmt)).all()
+        # Captura id/nome antes dos commits, que expiram os objetos da sessão
+        itens = [(ing, ing.id_ingrediente, ing.nome_singular) for ing in ingredientes]
+        workers = asyncio.Semaphore(self.settings.enriquecimento_workers)
         enriquecidos = 0
         erros = []
-
-        for ing in ingredientes:
-            try:
-                await self.enriquecer_ingrediente_por_nome(session, ing.nome_singular)
-                enriquecidos += 1
-            except Exception as e:
-                erros.append({"ingrediente": ing.nome_singular, "erro": str(e)})
+        checkpoint: list[tuple[int, str | None]] = []
+
+        if job_id:
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            # Itens com erro voltam a ser pendentes
+            com_erro = EnriquecimentoJobItemTable.job_id == job_id, EnriquecimentoJobItemTable.status == "erro"
+            repetidos = (await session.exec(select(func.count()).where(*com_erro))).one()
+            if repetidos:
+                await session.exec(delete(EnriquecimentoJobItemTable).where(*com_erro))
+                job.processados -= repetidos
+                job.erros -= repetidos
+            job.total = job.processados + len(itens)
+            session.add(job)
+            await session.commit()
+
+        async def _commit_lote():
+            if job_id and checkpoint:
+                session.add_all(
+                    EnriquecimentoJobItemTable(
+                        job_id=job_id,
+                        id_ingrediente=ingrediente_id,
+                        status="erro" if erro else "ok",
+                        erro=erro,
+                    )
+                    for ingrediente_id, erro in checkpoint
+                )
+                job = await session.get(EnriquecimentoJobTable, job_id)
+                job.processados += len(checkpoint)
+                job.erros += sum(1 for _, erro in checkpoint if erro)
+                job.updated_at = datetime.utcnow()
+                session.add(job)
+            await session.commit()
+            checkpoint.clear()
+
+        async def _buscar(item):
+            ing, ingrediente_id, nome = item
+            async with workers:
+                try:
+                    return item, await self._buscar_dados_ingrediente(ingrediente_id, nome), None
+                except Exception as e:
+                    return item, None, e
+
+        tarefas = [asyncio.create_task(_buscar(item)) for item in itens]
+        interrompido = False
+        pausa: UpstreamError | None = None
+        try:
+            for tarefa in asyncio.as_completed(tarefas):
+                (ing, ingrediente_id, nome), resultado, erro = await tarefa
+                if isinstance(erro, UpstreamError) and erro.transitorio:
+                    pausa = erro
+                    break
+                if erro:
+                    erros.append({"ingrediente": nome, "erro": str(erro)})
+                    checkpoint.append((ingrediente_id, str(erro)))
+                else:
+                    self._aplicar_dados(ing, *resultado)
+                    session.add(ing)
+                    enriquecidos += 1
+                    checkpoint.append((ingrediente_id, None))
+
+                if len(checkpoint) >= self.settings.enriquecimento_batch_size:
+                    await _commit_lote()
+                if cancelado and cancelado.is_set():
+                    interrompido = True
+                    break
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+
+        if checkpoint:
+            await _commit_lote()
+        if pausa:
+            raise EnriquecimentoPausado(pausa) from pausa
 
         return {
             "total": len(ingredientes),
             "enriquecidos": enriquecidos,
             "erros": erros,
+            "cancelado": interrompido,
         }
 
+    async def _preparar_receita(self, receita: MealDBRecipe) -> dict:
+        """Baixa a imagem da receita e gera o conteúdo para o RAG."""
+        if receita.image_url:
+            local_path = await self.image_downloader.download_image(
+                url=receita.image_url,
+                subdir="receitas_themealdb",
+                prefix=f"rec_{receita.id}",
+            )
+            if local_path:
+                receita.image_url = local_path
+
+        return {
+            "name": receita.name,
+            "content": self.themealdb.recipe_to_rag_content(receita),
+        }
+
+    async def _pipeline_receitas(self, resumos: list[MealDBRecipe]) -> tuple[int, list[dict]]:
+        """
+        Ingestão de receitas no RAG em três etapas ligadas por filas limitadas:
+        busca da receita completa -> download da imagem e formatação -> indexação
+        em lotes. Cada etapa tem seus próprios workers, então o tempo total é
+        dado pela etapa mais lenta, e não pela soma delas.
+        """
+        s = self.settings
+        receitas: asyncio.Queue = asyncio.Queue(maxsize=s.rag_pipeline_queue_size)
+        conteudos: asyncio.Queue = asyncio.Queue(maxsize=s.rag_pipeline_queue_size)
+        pendentes = iter(resumos)
+        adicionadas = 0
+        erros = []
+
+        async def buscar():
+            for resumo in pendentes:
+                try:
+                    receita = await self.themealdb.get_recipe_by_id(resumo.id)
+                except Exception as e:
+                    erros.append({"receita": resumo.name, "erro": str(e)})
+                    continue
+                if receita:
+                    await receitas.put(receita)
+
+        async def preparar():
+            while (receita := await receitas.get()) is not _FIM:
+                try:
+                    await conteudos.put(await self._preparar_receita(receita))
+                except Exception as e:
+                    erros.append({"receita": receita.name, "erro": str(e)})
+
+        async def indexar():
+            nonlocal adicionadas
+            lote = []
+            while True:
+                item = await conteudos.get()
+                if item is not _FIM:
+                    lote.append(item)
+                if lote and (item is _FIM or len(lote) >= s.rag_pipeline_batch_size):
+                    falhas = await self.rag_service.add_receitas_content_async(lote)
+                    for conteudo, erro in zip(lote, falhas):
+                        if erro:
+                            erros.append({"receita": conteudo["name"], "erro": str(erro)})
+                        else:
+                            adicionadas += 1
+                    lote = []
+                if item is _FIM:
+                    return
+
+        def etapa(worker, n: int, saida: asyncio.Queue | None = None, n_saida: int = 0):
+            restantes = n
+
+            async def rodar():
+                nonlocal restantes
+                await worker()
+                restantes -= 1
+                # O último worker da etapa avisa a próxima que não vem mais nada
+                if restantes == 0:
+                    for _ in range(n_saida):
+                        await saida.put(_FIM)
+
+            return [rodar() for _ in range(n)]
+
+        # Se um worker falhar, o TaskGroup cancela os demais: nenhuma etapa fica
+        # esperando um _FIM que não vem nem presa numa fila cheia
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for worker in [
+                    *etapa(buscar, s.rag_pipeline_fetch_workers, receitas, s.rag_pipeline_download_workers),
+                    *etapa(preparar, s.rag_pipeline_download_workers, conteudos, s.rag_pipeline_embed_workers),
+                    *etapa(indexar, s.rag_pipeline_embed_workers),
+                ]:
+                    tg.create_task(worker)
+        except BaseExceptionGroup as grupo:
+            raise grupo.exceptions[0]
+        return adicionadas, erros
+
     async def popular_rag_com_receitas_themealdb(
         self, categorias: list[str] | None = None, limite_por_categoria: int = 10
     ) -> dict:
         """
         Popula a base de conhecimento RAG com receitas do TheMealDB.
+        As categorias são listadas em paralelo e as receitas passam pelo
+        pipeline de ingestão.
         """
         if not categorias:
             categorias = await self.themealdb.list_categories()
 
-        receitas_adicionadas = 0
+        workers = asyncio.Semaphore(self.settings.rag_pipeline_fetch_workers)
         erros = []
 
-        for categoria in categorias:
-            try:
-                receitas = await self.themealdb.filter_by_category(categoria)
-
-                for receita_resumo in receitas[:limite_por_categoria]:
-                    try:
-                        receita_completa = await self.themealdb.get_recipe_by_id(
-                            receita_resumo.id
-                        )
-                        if receita_completa:
-                            if receita_completa.image_url:
-                                local_path = await self.image_downloader.download_image(
-                                    url=receita_completa.image_url,
-                                    subdir="receitas_themealdb",
-                                    prefix=f"rec_{receita_completa.id}",
-                                )
-                                if local_path:
-                                    receita_completa.image_url = local_path
-                            
-                            conteudo = self.themealdb.recipe_to_rag_content(receita_completa)
-                            self.rag_service.add_receita_content(
-                                name=receita_completa.name,
-                                content=conteudo,
-                            )
-                            receitas_adicionadas += 1
-                    except Exception as e:
-                        erros.append({
-                            "receita": receita_resumo.name,
-                            "erro": str(e),
-                        })
-            except Exception as e:
-                erros.append({"categoria": categoria, "erro": str(e)})
+        async def _listar(categoria: str) -> list[MealDBRecipe]:
+            async with workers:
+                try:
+                    receitas = await self.themealdb.filter_by_category(categoria)
+                except Exception as e:
+                    erros.append({"categoria": categoria, "erro": str(e)})
+                    return []
+            return receitas[:limite_por_categoria]
+
+        listas = await asyncio.gather(*(_listar(c) for c in categorias))
+        resumos = [resumo for lista in listas for resumo in lista]
+
+        receitas_adicionadas, erros_pipeline = await self._pipeline_receitas(resumos)
 
         return {
             "categorias_processadas": len(categorias),
             "receitas_adicionadas": receitas_adicionadas,
-            "erros": erros,
+            "erros": erros + erros_pipeline,
         }
 
     async def popular_rag_com_receitas_por_ingrediente(
@@ -192,30 +468,7 @@ class EnriquecimentoService:
         Busca receitas que usam um ingrediente específico e adiciona ao RAG.
         """
         receitas = await self.themealdb.filter_by_ingredient(ingrediente)
-        adicionadas = 0
-        erros = []
-
-        for receita_resumo in receitas[:limite]:
-            try:
-                receita_completa = await self.themealdb.get_recipe_by_id(receita_resumo.id)
-                if receita_completa:
-                    if receita_completa.image_url:
-                        local_path = await self.image_downloader.download_image(
-                            url=receita_completa.image_url,
-                            subdir="receitas_themealdb",
-                            prefix=f"rec_{receita_completa.id}",
-                        )
-                        if local_path:
-                            receita_completa.image_url = local_path
-                    
-                    conteudo = self.themealdb.recipe_to_rag_content(receita_completa)
-                    self.rag_service.add_receita_content(
-                        name=receita_completa.name,
-                        content=conteudo,
-                    )
-                    adicionadas += 1
-            except Exception as e:
-                erros.append({"receita": receita_resumo.name, "erro": str(e)})
+        adicionadas, erros = await self._pipeline_receitas(receitas[:limite])
 
         return {
             "ingrediente": ingrediente,
@@ -263,11 +516,11 @@ class EnriquecimentoService:
 
         return "\n".join(lines)
 
-    async def popular_rag_com_ingredientes(self, session: Session) -> dict:
+    async def popular_rag_com_ingredientes(self, session: AsyncSession) -> dict:
         """
         Adiciona todos os ingredientes do banco ao RAG com informações nutricionais.
         """
-        ingredientes = session.exec(select(IngredienteTable)).all()
+        ingredientes = (await session.exec(select(IngredienteTable))).all()
         adicionados = 0
 
         for ing in ingredientes:
@@ -284,64 +537,71 @@ class EnriquecimentoService:
             "adicionados_ao_rag": adicionados,
         }
 
-    async def enriquecer_tudo_automatico(self, session: Session) -> dict:
+    async def _executar_etapa(
+        self, session: AsyncSession, etapa: int, job_id: str | None, cancelado: asyncio.Event | None
+    ) -> dict:
+        if etapa == 0:
+            importados = await self.importar_ingredientes_themealdb(session)
+            return {"ingredientes_importados": len(importados)}
+        if etapa == 1:
+            return await self.enriquecer_todos_ingredientes(session, job_id=job_id, cancelado=cancelado)
+        if etapa == 2:
+            return await self.popular_rag_com_ingredientes(session)
+        return await self.popular_rag_com_receitas_themealdb(
+            categorias=None,
+            limite_por_categoria=5,
+        )
+
+    async def enriquecer_tudo_automatico(
+        self,
+        session: AsyncSession,
+        job_id: str | None = None,
+        cancelado: asyncio.Event | None = None,
+    ) -> dict:
         """
         Executa o enriquecimento completo em um único comando:
         1. Importa todos os ingredientes do TheMealDB
         2. Enriquece com dados nutricionais (USDA, Open Food Facts)
         3. Adiciona ingredientes ao RAG
         4. Popula RAG com receitas do TheMealDB
-        """
-        resultado = {
-            "etapa_1_importar": {},
-            "etapa_2_enriquecer": {},
-            "etapa_3_rag_ingredientes": {},
-            "etapa_4_rag_receitas": {},
-            "erros": [],
-        }
 
-        try:
-            importados = await self.importar_ingredientes_themealdb(session)
-            resultado["etapa_1_importar"] = {
-                "status": "ok",
-                "ingredientes_importados": len(importados),
-            }
-        except Exception as e:
-            resultado["etapa_1_importar"] = {"status": "erro", "mensagem": str(e)}
-            resultado["erros"].append(f"Etapa 1: {str(e)}")
-
-        try:
-            enriquecidos = await self.enriquecer_todos_ingredientes(session)
-            resultado["etapa_2_enriquecer"] = {
-                "status": "ok",
-                **enriquecidos,
-            }
-        except Exception as e:
-            resultado["etapa_2_enriquecer"] = {"status": "erro", "mensagem": str(e)}
-            resultado["erros"].append(f"Etapa 2: {str(e)}")
-
-        try:
-            rag_ing = await self.popular_rag_com_ingredientes(session)
-            resultado["etapa_3_rag_ingredientes"] = {
-                "status": "ok",
-                **rag_ing,
-            }
-        except Exception as e:
-            resultado["etapa_3_rag_ingredientes"] = {"status": "erro", "mensagem": str(e)}
-            resultado["erros"].append(f"Etapa 3: {str(e)}")
-
-        try:
-            rag_rec = await self.popular_rag_com_receitas_themealdb(
-                categorias=None,
-                limite_por_categoria=5,
-            )
-            resultado["etapa_4_rag_receitas"] = {
-                "status": "ok",
-                **rag_rec,
-            }
-        except Exception as e:
-            resultado["etapa_4_rag_receitas"] = {"status": "erro", "mensagem": str(e)}
-            resultado["erros"].append(f"Etapa 4: {str(e)}")
+        Com `job_id`, o job guarda a etapa concluída e o resultado parcial,
+        e uma retomada continua da primeira etapa pendente.
+        """
+        resultado = {nome: {} for nome in ETAPAS}
+        resultado["erros"] = []
+        etapa_inicial = 0
+
+        if job_id:
+            job = await session.get(EnriquecimentoJobTable, job_id)
+            etapa_inicial = job.etapa
+            if job.resultado:
+                resultado.update(json.loads(job.resultado))
+
+        for etapa in range(etapa_inicial, len(ETAPAS)):
+            if cancelado and cancelado.is_set():
+                break
+            nome = ETAPAS[etapa]
+            try:
+                resultado[nome] = {
+                    "status": "ok",
+                    **await self._executar_etapa(session, etapa, job_id, cancelado),
+                }
+            except EnriquecimentoPausado:
+                raise
+            except Exception as e:
+                resultado[nome] = {"status": "erro", "mensagem": str(e)}
+                resultado["erros"].append(f"Etapa {etapa + 1}: {str(e)}")
+
+            if resultado[nome].get("cancelado"):
+                break
+            if job_id:
+                job = await session.get(EnriquecimentoJobTable, job_id)
+                job.etapa = etapa + 1
+                job.resultado = json.dumps(resultado)
+                job.updated_at = datetime.utcnow()
+                session.add(job)
+                await session.commit()
 
         resultado["sucesso"] = len(resultado["erros"]) == 0
         return resultado
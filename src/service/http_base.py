@@ -0,0 +1,80 @@
+"""
+Base dos serviços de APIs externas (USDA, Open Food Facts, TheMealDB):
+GET no cliente compartilhado com limite por host, cache persistente e
+coalescência de consultas idênticas simultâneas.
+"""
+
+import json
+from typing import Callable
+
+import httpx
+
+from src.core.http_cache import HTTPResponseCache
+from src.core.http_client import get_http_client
+from src.core.single_flight import SingleFlight, get_single_flight
+from src.service.rate_limiter import HostRateLimiter, verificar_resposta
+
+
+class APIExternaService:
+    def __init__(
+        self,
+        rate_limiter: HostRateLimiter | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        cache: HTTPResponseCache | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
+        self.rate_limiter = rate_limiter
+        self._http_client = http_client
+        self.cache = cache
+        self.single_flight = single_flight or get_single_flight()
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
+    async def _fetch(self, url: str, **kwargs) -> httpx.Response:
+        """
+        GET no cliente compartilhado, com limite, retry e circuit breaker por host.
+        Erros da API levantam UpstreamError; só 404 chega como "não encontrado".
+        """
+        if self.rate_limiter:
+            response = await self.rate_limiter.send(
+                url, lambda: self.http_client.get(url, **kwargs)
+            )
+        else:
+            response = await self.http_client.get(url, **kwargs)
+        return verificar_resposta(url, response)
+
+    async def _get(
+        self,
+        url: str,
+        endpoint: str | None = None,
+        vazio: Callable[[httpx.Response], bool] | None = None,
+        params: dict | None = None,
+    ) -> httpx.Response:
+        """
+        GET passando pelo cache persistente quando o endpoint tem TTL configurado.
+        Consultas idênticas simultâneas a um endpoint nomeado (determinístico)
+        compartilham uma única chamada à API.
+        """
+        if not endpoint:
+            return await self._get_sem_coalescer(url, endpoint, vazio, params)
+        chave = (url, json.dumps(params, sort_keys=True, default=str))
+        return await self.single_flight.do(
+            chave, lambda: self._get_sem_coalescer(url, endpoint, vazio, params)
+        )
+
+    async def _get_sem_coalescer(
+        self,
+        url: str,
+        endpoint: str | None,
+        vazio: Callable[[httpx.Response], bool] | None,
+        params: dict | None,
+    ) -> httpx.Response:
+        if self.cache and endpoint:
+            return await self.cache.get_or_fetch(
+                endpoint, url, self._fetch, params=params, vazio=vazio
+            )
+        if params is None:
+            return await self._fetch(url)
+        return await self._fetch(url, params=params)
@@ -1,20 +1,89 @@
 """
 Serviço para download e persistência de imagens.
 Salva imagens localmente em media/ que é montado como volume Docker.
+O corpo é gravado em streaming num arquivo temporário (escrita em threadpool)
+e renomeado atomicamente, com limite de tamanho e de content-type.
+Com um ImageIndex, URLs já baixadas não são baixadas de novo (ou são
+revalidadas com GET condicional) e conteúdo idêntico vira hardlink.
+Com um ImageNormalizer, a imagem é validada e regravada antes de ir para media/.
 """
 
+import asyncio
 import httpx
 import hashlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 from urllib.parse import urlparse, quote
 
+from src.core.http_client import get_http_client
+from src.service.image_index import ImageIndex, ImagemIndexada
+from src.service.image_normalizer import ImageNormalizer
+from src.service.rate_limiter import HostRateLimiter
+
+
+class ImageDownloadError(Exception):
+    pass
+
+
+@dataclass
+class ResultadoDownload:
+    url: str
+    path: str | None = None
+    erro: str | None = None
+    # Dimensões conhecidas quando a imagem passou pelo normalizador
+    width: int | None = None
+    height: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None
+
+
+@dataclass
+class ArquivoSalvo:
+    sha256: str  # do conteúdo baixado, antes da normalização
+    size: int
+    width: int | None = None
+    height: int | None = None
+
 
 class ImageDownloader:
-    def __init__(self, base_path: str = "media"):
+    CHUNK_SIZE = 64 * 1024
+    MAX_BYTES = 10 * 1024 * 1024
+    ALLOWED_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+    REVALIDATE_AFTER = 7 * 86400
+
+    def __init__(
+        self,
+        base_path: str = "media",
+        rate_limiter: HostRateLimiter | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        max_bytes: int | None = None,
+        allowed_types: tuple[str, ...] | list[str] | None = None,
+        index: ImageIndex | None = None,
+        revalidate_after: int | None = None,
+        normalizer: ImageNormalizer | None = None,
+    ):
         self.base_path = Path(base_path)
+        self.rate_limiter = rate_limiter
+        self._http_client = http_client
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.allowed_types = tuple(allowed_types or self.ALLOWED_TYPES)
+        self.index = index
+        self.revalidate_after = (
+            self.REVALIDATE_AFTER if revalidate_after is None else revalidate_after
+        )
+        self.normalizer = normalizer
         self.base_path.mkdir(parents=True, exist_ok=True)
 
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client()
+
     def _get_extension(self, url: str, content_type: str | None = None) -> str:
         """Determina a extensão do arquivo baseado na URL ou content-type."""
         parsed = urlparse(url)
@@ -69,39 +138,192 @@ class ImageDownloader:
             return None
 
         try:
-            parsed = urlparse(url)
-            encoded_path = quote(parsed.path, safe='/')
-            encoded_url = f"{parsed.scheme}://{parsed.netloc}{encoded_path}"
-            
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                response = await client.get(encoded_url)
-                
-                if response.status_code != 200:
-                    return None
-                
-                content_type = response.headers.get('content-type', '')
-                extension = self._get_extension(url, content_type)
-                
-                if not filename:
-                    filename = self._generate_filename(url, prefix)
-                
-                if not filename.endswith(extension):
-                    filename = f"{filename}{extension}"
-                
-                save_dir = self.base_path / subdir
-                save_dir.mkdir(parents=True, exist_ok=True)
-                
-                file_path = save_dir / filename
-                
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                
-                return f"media/{subdir}/{filename}"
-                
+            return (await self._download(url, subdir, filename, prefix)).path
         except Exception as e:
             print(f"Erro ao baixar imagem {url}: {e}")
             return None
 
+    async def download_many(
+        self,
+        items: Iterable[tuple[str, str, str | None]],
+        concurrency: int = 8,
+    ) -> list[ResultadoDownload]:
+        """
+        Baixa vários (url, subdir, filename) em paralelo, no máximo `concurrency`
+        por vez, pelo cliente HTTP compartilhado (e pelo rate limiter, se houver).
+        Os resultados vêm na ordem dos itens; falhas ficam em `erro` do item,
+        sem interromper os demais. Com normalizador, cada resultado traz também
+        largura e altura da imagem salva.
+        """
+        workers = asyncio.Semaphore(concurrency)
+
+        async def _um(url: str, subdir: str, filename: str | None) -> ResultadoDownload:
+            if not url:
+                return ResultadoDownload(url=url, erro="URL vazia")
+            async with workers:
+                try:
+                    return await self._download(url, subdir, filename, "")
+                except Exception as e:
+                    return ResultadoDownload(url=url, erro=str(e) or repr(e))
+
+        return await asyncio.gather(*(_um(*item) for item in items))
+
+    async def _download(
+        self, url: str, subdir: str, filename: str | None, prefix: str
+    ) -> ResultadoDownload:
+        parsed = urlparse(url)
+        encoded_path = quote(parsed.path, safe='/')
+        encoded_url = f"{parsed.scheme}://{parsed.netloc}{encoded_path}"
+
+        indexada = await asyncio.to_thread(self.index.get, url) if self.index else None
+        if indexada and not (self.base_path / indexada.path).exists():
+            indexada = None
+        if indexada and time.time() - indexada.checked_at < self.revalidate_after:
+            return self._resultado_indexado(indexada)
+
+        headers = {}
+        if indexada:
+            if indexada.etag:
+                headers["If-None-Match"] = indexada.etag
+            if indexada.last_modified:
+                headers["If-Modified-Since"] = indexada.last_modified
+
+        async def _abrir() -> httpx.Response:
+            request = self.http_client.build_request("GET", encoded_url, headers=headers or None)
+            return await self.http_client.send(request, stream=True, follow_redirects=True)
+
+        if self.rate_limiter:
+            response = await self.rate_limiter.send(encoded_url, _abrir)
+        else:
+            response = await _abrir()
+
+        try:
+            if response.status_code == 304 and indexada:
+                await asyncio.to_thread(self.index.touch, url)
+                return self._resultado_indexado(indexada)
+
+            if response.status_code != 200:
+                raise ImageDownloadError(f"HTTP {response.status_code}")
+
+            content_type = self._validar_cabecalhos(response)
+            if self.normalizer:
+                extension = self.normalizer.extension
+            else:
+                extension = self._get_extension(url, content_type)
+
+            if not filename:
+                filename = self._generate_filename(url, prefix)
+
+            if not filename.endswith(extension):
+                filename = f"{filename}{extension}"
+
+            save_dir = self.base_path / subdir
+            save_dir.mkdir(parents=True, exist_ok=True)
+
+            relativo = f"{subdir}/{filename}"
+            salvo = await self._salvar_stream(response, save_dir / filename, relativo)
+            if self.index:
+                await asyncio.to_thread(
+                    self.index.save,
+                    ImagemIndexada(
+                        url=url,
+                        path=relativo,
+                        etag=response.headers.get("etag"),
+                        last_modified=response.headers.get("last-modified"),
+                        sha256=salvo.sha256,
+                        size=salvo.size,
+                        checked_at=time.time(),
+                        width=salvo.width,
+                        height=salvo.height,
+                    ),
+                )
+            return ResultadoDownload(
+                url=url, path=f"media/{relativo}", width=salvo.width, height=salvo.height
+            )
+        finally:
+            await response.aclose()
+
+    @staticmethod
+    def _resultado_indexado(indexada: ImagemIndexada) -> ResultadoDownload:
+        return ResultadoDownload(
+            url=indexada.url,
+            path=f"media/{indexada.path}",
+            width=indexada.width,
+            height=indexada.height,
+        )
+
+    def _validar_cabecalhos(self, response: httpx.Response) -> str:
+        """Recusa páginas de erro e arquivos grandes antes de ler o corpo."""
+        content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+        if not content_type:
+            # Típico de páginas de erro de CDNs mal configuradas
+            raise ImageDownloadError("resposta sem content-type")
+        if content_type not in self.allowed_types:
+            raise ImageDownloadError(f"content-type não permitido: {content_type}")
+
+        content_length = response.headers.get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise ImageDownloadError(f"imagem maior que {self.max_bytes} bytes")
+        return content_type
+
+    async def _salvar_stream(
+        self, response: httpx.Response, file_path: Path, relativo: str
+    ) -> ArquivoSalvo:
+        """
+        Grava o corpo em um arquivo temporário no mesmo diretório, normaliza
+        (se configurado) e renomeia no fim: quem lê media/ nunca vê um arquivo
+        pela metade nem uma imagem que não decodifica.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=".", suffix=".part")
+        recebidos = 0
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                    recebidos += len(chunk)
+                    if recebidos > self.max_bytes:
+                        raise ImageDownloadError(f"imagem maior que {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+
+            salvo = ArquivoSalvo(sha256=digest.hexdigest(), size=recebidos)
+            duplicata = await asyncio.to_thread(self._vincular_duplicata, salvo.sha256, file_path, relativo)
+            if duplicata:
+                salvo.size, salvo.width, salvo.height = duplicata.size, duplicata.width, duplicata.height
+                return salvo
+
+            if self.normalizer:
+                salvo.width, salvo.height = await self.normalizer.normalizar(tmp_path)
+                salvo.size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, file_path)
+            return salvo
+        finally:
+            Path(tmp_path).unlink(missing_ok=True)
+
+    def _vincular_duplicata(
+        self, sha256: str, file_path: Path, relativo: str
+    ) -> ImagemIndexada | None:
+        """
+        Se outra URL já trouxe o mesmo conteúdo, cria um hardlink para o arquivo
+        existente em vez de gravar uma segunda cópia. Substituir um dos nomes
+        depois (os.replace) não afeta os outros.
+        """
+        if not self.index:
+            return None
+        for existente in self.index.por_hash(sha256):
+            origem = self.base_path / existente.path
+            if existente.path == relativo or not origem.exists():
+                continue
+            link_tmp = file_path.with_name(f".{file_path.name}.link")
+            try:
+                link_tmp.unlink(missing_ok=True)
+                os.link(origem, link_tmp)
+                os.replace(link_tmp, file_path)
+                return existente
+            except OSError:
+                link_tmp.unlink(missing_ok=True)
+        return None
+
     async def download_ingrediente_image(
         self,
         url: str,
@@ -109,10 +331,14 @@ class ImageDownloader:
         nome: str,
     ) -> Optional[str]:
         """Baixa imagem de um ingrediente."""
-        safe_nome = "".join(c if c.isalnum() else "_" for c in nome.lower())[:30]
-        filename = f"ing_{ingrediente_id}_{safe_nome}"
+        filename = self.ingrediente_filename(ingrediente_id, nome)
         return await self.download_image(url, "ingredientes", filename=filename)
 
+    @staticmethod
+    def ingrediente_filename(ingrediente_id: int, nome: str) -> str:
+        safe_nome = "".join(c if c.isalnum() else "_" for c in nome.lower())[:30]
+        return f"ing_{ingrediente_id}_{safe_nome}"
+
     async def download_receita_image(
         self,
         url: str,
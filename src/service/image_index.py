@@ -0,0 +1,122 @@
+"""
+Índice persistente (SQLite) das imagens baixadas: URL -> arquivo local,
+ETag/Last-Modified e hash do conteúdo. Permite pular downloads repetidos,
+revalidar com GET condicional e reaproveitar arquivos de conteúdo idêntico.
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.core.settings import Settings
+
+
+@dataclass
+class ImagemIndexada:
+    url: str
+    path: str  # relativo ao diretório base do ImageDownloader (ex.: ingredientes/a.png)
+    etag: str | None
+    last_modified: str | None
+    sha256: str
+    size: int
+    checked_at: float
+    width: int | None = None
+    height: int | None = None
+
+
+_COLUNAS = "url, path, etag, last_modified, sha256, size, checked_at, width, height"
+
+
+class ImageIndex:
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                width INTEGER,
+                height INTEGER
+            )
+            """
+        )
+        colunas = {row[1] for row in self._conn.execute("PRAGMA table_info(images)")}
+        for coluna in ("width", "height"):
+            if coluna not in colunas:
+                self._conn.execute(f"ALTER TABLE images ADD COLUMN {coluna} INTEGER")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_images_sha256 ON images (sha256)")
+        self._conn.commit()
+
+    def get(self, url: str) -> ImagemIndexada | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUNAS} FROM images WHERE url = ?", (url,)
+            ).fetchone()
+        return ImagemIndexada(*row) if row else None
+
+    def por_hash(self, sha256: str) -> list[ImagemIndexada]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUNAS} FROM images WHERE sha256 = ?", (sha256,)
+            ).fetchall()
+        return [ImagemIndexada(*row) for row in rows]
+
+    def save(self, imagem: ImagemIndexada) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO images ({_COLUNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    imagem.url,
+                    imagem.path,
+                    imagem.etag,
+                    imagem.last_modified,
+                    imagem.sha256,
+                    imagem.size,
+                    imagem.checked_at,
+                    imagem.width,
+                    imagem.height,
+                ),
+            )
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Marca a URL como revalidada agora (ex.: após um 304)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE images SET checked_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._conn.commit()
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM images WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            urls, arquivos, bytes_ = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT sha256), "
+                "COALESCE(SUM(size), 0) FROM images"
+            ).fetchone()
+        return {"urls": urls, "conteudos_distintos": arquivos, "bytes": bytes_}
+
+
+_image_index: ImageIndex | None = None
+
+
+def get_image_index(settings: Settings) -> ImageIndex | None:
+    global _image_index
+    if not settings.image_index_enabled:
+        return None
+    if _image_index is None:
+        _image_index = ImageIndex(settings.image_index_path)
+    return _image_index
@@ -0,0 +1,115 @@
+"""
+Normalização das imagens baixadas: valida se o arquivo decodifica, limita as
+dimensões e regrava em um formato eficiente (WebP por padrão). A decodificação
+é CPU-bound, então roda em um pool de processos fora do event loop.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from src.core.settings import Settings
+
+# Pillow recusa acima disso (DecompressionBombError) em vez de alocar gigabytes
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+_FORMATOS = {"webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+
+
+class ImagemInvalida(Exception):
+    pass
+
+
+def normalizar_arquivo(path: str, max_dimension: int, formato: str, qualidade: int) -> tuple[int, int]:
+    """
+    Regrava `path` no lugar (via arquivo temporário) e retorna (largura, altura).
+    Função de módulo para poder ser enviada ao pool de processos.
+    """
+    try:
+        with Image.open(path) as img:
+            img.verify()
+        with Image.open(path) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_dimension, max_dimension))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if img.has_transparency_data else "RGB")
+            if formato == "jpeg" and img.mode == "RGBA":
+                img = img.convert("RGB")
+            saida = f"{path}.norm"
+            img.save(saida, format=formato.upper(), quality=qualidade, optimize=True)
+            largura, altura = img.size
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImagemInvalida(f"imagem inválida: {e}") from None
+
+    os.replace(saida, path)
+    return largura, altura
+
+
+class ImageNormalizer:
+    def __init__(
+        self,
+        max_dimension: int = 1024,
+        formato: str = "webp",
+        qualidade: int = 82,
+        workers: int = 2,
+    ):
+        if formato not in _FORMATOS:
+            raise ValueError(f"Formato de imagem não suportado: {formato}")
+        self.max_dimension = max_dimension
+        self.formato = formato
+        self.qualidade = qualidade
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def extension(self) -> str:
+        return _FORMATOS[self.formato]
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def normalizar(self, path: str) -> tuple[int, int]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.pool,
+                normalizar_arquivo,
+                path,
+                self.max_dimension,
+                self.formato,
+                self.qualidade,
+            )
+        finally:
+            if os.path.exists(f"{path}.norm"):
+                os.unlink(f"{path}.norm")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_image_normalizer: ImageNormalizer | None = None
+
+
+def get_image_normalizer(settings: Settings) -> ImageNormalizer | None:
+    global _image_normalizer
+    if not settings.image_normalize:
+        return None
+    if _image_normalizer is None:
+        _image_normalizer = ImageNormalizer(
+            max_dimension=settings.image_max_dimension,
+            formato=settings.image_format,
+            qualidade=settings.image_quality,
+            workers=settings.image_normalize_workers,
+        )
+    return _image_normalizer
+
+
+def close_image_normalizer() -> None:
+    if _image_normalizer is not None:
+        _image_normalizer.shutdown()
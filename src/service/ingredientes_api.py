@@ -5,10 +5,17 @@ Serviço de integração com APIs externas de ingredientes:
 - TheMealDB (receitas e ingredientes)
 """
 
+import asyncio
+
 import httpx
-from typing import Optional
 from pydantic import BaseModel
 
+from src.core.http_cache import HTTPResponseCache
+from src.core.single_flight import SingleFlight
+from src.service.http_base import APIExternaService
+from src.service.rate_limiter import HostRateLimiter
+from src.service.themealdb_mirror import TheMealDBMirror
+
 
 class USDANutrient(BaseModel):
     nutrient_id: int
@@ -48,139 +55,133 @@ class TheMealDBIngredient(BaseModel):
     image_url: str | None = None
 
 
-class IngredientesAPIService:
+def _sem_foods(response: httpx.Response) -> bool:
+    return not response.json().get("foods")
+
+
+def _sem_products(response: httpx.Response) -> bool:
+    return not response.json().get("products")
+
+
+def _produto_inexistente(response: httpx.Response) -> bool:
+    return response.json().get("status") != 1
+
+
+def _sem_meals(response: httpx.Response) -> bool:
+    return not response.json().get("meals")
+
+
+class IngredientesAPIService(APIExternaService):
     USDA_BASE_URL = "https://api.nal.usda.gov/fdc/v1"
     OPENFOODFACTS_BASE_URL = "https://world.openfoodfacts.org/api/v2"
     THEMEALDB_BASE_URL = "https://www.themealdb.com/api/json/v1/1"
 
-    def __init__(self, usda_api_key: str | None = None):
+    def __init__(
+        self,
+        usda_api_key: str | None = None,
+        rate_limiter: HostRateLimiter | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        cache: HTTPResponseCache | None = None,
+        mirror: TheMealDBMirror | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
         self.usda_api_key = usda_api_key
-        self.client = httpx.Client(timeout=30.0)
+        super().__init__(rate_limiter, http_client, cache, single_flight)
+        self.mirror = mirror
 
     async def search_usda(self, query: str, page_size: int = 10) -> list[USDAFood]:
         """Busca ingredientes no USDA FoodData Central."""
         if not self.usda_api_key:
             return []
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.USDA_BASE_URL}/foods/search",
-                params={
-                    "api_key": self.usda_api_key,
-                    "query": query,
-                    "pageSize": page_size,
-                    "dataType": ["Foundation", "SR Legacy"],
-                },
-            )
-
-            if response.status_code != 200:
-                return []
+        response = await self._get(
+            f"{self.USDA_BASE_URL}/foods/search",
+            endpoint="usda_search",
+            vazio=_sem_foods,
+            params={
+                "api_key": self.usda_api_key,
+                "query": query,
+                "pageSize": page_size,
+                "dataType": ["Foundation", "SR Legacy"],
+            },
+        )
+
+        if response.status_code != 200:
+            return []
 
-            data = response.json()
-            foods = []
+        data = response.json()
+        foods = []
 
-            for food in data.get("foods", []):
-                nutrients = {n["nutrientId"]: n["value"] for n in food.get("foodNutrients", [])}
+        for food in data.get("foods", []):
+            nutrients = {n["nutrientId"]: n["value"] for n in food.get("foodNutrients", [])}
                 
-                foods.append(USDAFood(
-                    fdc_id=food["fdcId"],
-                    description=food["description"],
-                    food_category=food.get("foodCategory"),
-                    calories=nutrients.get(1008),
-                    protein=nutrients.get(1003),
-                    carbohydrates=nutrients.get(1005),
-                    fat=nutrients.get(1004),
-                    fiber=nutrients.get(1079),
-                ))
-
-            return foods
-
-    async def get_usda_food(self, fdc_id: int) -> USDAFood | None:
-        """Obtém detalhes de um alimento específico do USDA."""
-        if not self.usda_api_key:
-            return None
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.USDA_BASE_URL}/food/{fdc_id}",
-                params={"api_key": self.usda_api_key},
-            )
-
-            if response.status_code != 200:
-                return None
-
-            food = response.json()
-            nutrients = {}
-            for n in food.get("foodNutrients", []):
-                nutrient = n.get("nutrient", {})
-                nutrients[nutrient.get("id")] = n.get("amount", 0)
-
-            return USDAFood(
+            foods.append(USDAFood(
                 fdc_id=food["fdcId"],
                 description=food["description"],
-                food_category=food.get("foodCategory", {}).get("description"),
+                food_category=food.get("foodCategory"),
                 calories=nutrients.get(1008),
                 protein=nutrients.get(1003),
                 carbohydrates=nutrients.get(1005),
                 fat=nutrients.get(1004),
                 fiber=nutrients.get(1079),
-            )
+            ))
 
-    async def search_openfoodfacts(self, query: str, page_size: int = 10) -> list[OpenFoodFactsProduct]:
-        """Busca produtos no Open Food Facts."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.OPENFOODFACTS_BASE_URL}/search",
-                params={
-                    "search_terms": query,
-                    "page_size": page_size,
-                    "fields": "code,product_name,image_url,categories,nova_group,nutriments",
-                },
-            )
+        return foods
 
-            if response.status_code != 200:
-                return []
+    async def get_usda_food(self, fdc_id: int) -> USDAFood | None:
+        """Obtém detalhes de um alimento específico do USDA."""
+        if not self.usda_api_key:
+            return None
 
-            data = response.json()
-            products = []
-
-            for product in data.get("products", []):
-                nutriments = product.get("nutriments", {})
-                products.append(OpenFoodFactsProduct(
-                    code=product.get("code", ""),
-                    product_name=product.get("product_name"),
-                    image_url=product.get("image_url"),
-                    categories=product.get("categories"),
-                    nova_group=product.get("nova_group"),
-                    energy_kcal=nutriments.get("energy-kcal_100g"),
-                    proteins=nutriments.get("proteins_100g"),
-                    carbohydrates=nutriments.get("carbohydrates_100g"),
-                    fat=nutriments.get("fat_100g"),
-                    fiber=nutriments.get("fiber_100g"),
-                ))
-
-            return products
+        response = await self._get(
+            f"{self.USDA_BASE_URL}/food/{fdc_id}",
+            endpoint="usda_food",
+            params={"api_key": self.usda_api_key},
+        )
 
-    async def get_openfoodfacts_product(self, barcode: str) -> OpenFoodFactsProduct | None:
-        """Obtém detalhes de um produto específico do Open Food Facts."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.OPENFOODFACTS_BASE_URL}/product/{barcode}",
-                params={"fields": "code,product_name,image_url,categories,nova_group,nutriments"},
-            )
+        if response.status_code != 200:
+            return None
 
-            if response.status_code != 200:
-                return None
+        food = response.json()
+        nutrients = {}
+        for n in food.get("foodNutrients", []):
+            nutrient = n.get("nutrient", {})
+            nutrients[nutrient.get("id")] = n.get("amount", 0)
+
+        return USDAFood(
+            fdc_id=food["fdcId"],
+            description=food["description"],
+            food_category=food.get("foodCategory", {}).get("description"),
+            calories=nutrients.get(1008),
+            protein=nutrients.get(1003),
+            carbohydrates=nutrients.get(1005),
+            fat=nutrients.get(1004),
+            fiber=nutrients.get(1079),
+        )
 
-            data = response.json()
-            if data.get("status") != 1:
-                return None
+    async def search_openfoodfacts(self, query: str, page_size: int = 10) -> list[OpenFoodFactsProduct]:
+        """Busca produtos no Open Food Facts."""
+        response = await self._get(
+            f"{self.OPENFOODFACTS_BASE_URL}/search",
+            endpoint="openfoodfacts_search",
+            vazio=_sem_products,
+            params={
+                "search_terms": query,
+                "page_size": page_size,
+                "fields": "code,product_name,image_url,categories,nova_group,nutriments",
+            },
+        )
+
+        if response.status_code != 200:
+            return []
 
-            product = data.get("product", {})
-            nutriments = product.get("nutriments", {})
+        data = response.json()
+        products = []
 
-            return OpenFoodFactsProduct(
-                code=product.get("code", barcode),
+        for product in data.get("products", []):
+            nutriments = product.get("nutriments", {})
+            products.append(OpenFoodFactsProduct(
+                code=product.get("code", ""),
                 product_name=product.get("product_name"),
                 image_url=product.get("image_url"),
                 categories=product.get("categories"),
@@ -190,58 +191,125 @@ class IngredientesAPIService:
                 carbohydrates=nutriments.get("carbohydrates_100g"),
                 fat=nutriments.get("fat_100g"),
                 fiber=nutriments.get("fiber_100g"),
-            )
+            ))
+
+        return products
+
+    async def get_openfoodfacts_product(self, barcode: str) -> OpenFoodFactsProduct | None:
+        """Obtém detalhes de um produto específico do Open Food Facts."""
+        response = await self._get(
+            f"{self.OPENFOODFACTS_BASE_URL}/product/{barcode}",
+            endpoint="openfoodfacts_product",
+            vazio=_produto_inexistente,
+            params={"fields": "code,product_name,image_url,categories,nova_group,nutriments"},
+        )
+
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        if data.get("status") != 1:
+            return None
+
+        product = data.get("product", {})
+        nutriments = product.get("nutriments", {})
+
+        return OpenFoodFactsProduct(
+            code=product.get("code", barcode),
+            product_name=product.get("product_name"),
+            image_url=product.get("image_url"),
+            categories=product.get("categories"),
+            nova_group=product.get("nova_group"),
+            energy_kcal=nutriments.get("energy-kcal_100g"),
+            proteins=nutriments.get("proteins_100g"),
+            carbohydrates=nutriments.get("carbohydrates_100g"),
+            fat=nutriments.get("fat_100g"),
+            fiber=nutriments.get("fiber_100g"),
+        )
 
     async def list_themealdb_ingredients(self) -> list[TheMealDBIngredient]:
         """Lista todos os ingredientes do TheMealDB."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.THEMEALDB_BASE_URL}/list.php?i=list")
+        if self.mirror and await asyncio.to_thread(self.mirror.is_populated):
+            meals = await asyncio.to_thread(self.mirror.ingredients)
+        else:
+            response = await self._get(
+                f"{self.THEMEALDB_BASE_URL}/list.php?i=list", endpoint="themealdb_list"
+            )
 
             if response.status_code != 200:
                 return []
 
-            data = response.json()
-            ingredients = []
+            meals = response.json().get("meals", []) or []
 
-            for ing in data.get("meals", []) or []:
-                ing_id = ing.get("idIngredient", "")
-                ing_name = ing.get("strIngredient", "")
+        ingredients = []
+
+        for ing in meals:
+            ing_id = ing.get("idIngredient", "")
+            ing_name = ing.get("strIngredient", "")
                 
-                ingredients.append(TheMealDBIngredient(
-                    id=ing_id,
-                    name=ing_name,
-                    description=ing.get("strDescription"),
-                    image_url=f"https://www.themealdb.com/images/ingredients/{ing_name}.png" if ing_name else None,
-                ))
+            ingredients.append(TheMealDBIngredient(
+                id=ing_id,
+                name=ing_name,
+                description=ing.get("strDescription"),
+                image_url=f"https://www.themealdb.com/images/ingredients/{ing_name}.png" if ing_name else None,
+            ))
 
-            return ingredients
+        return ingredients
 
     async def search_themealdb_ingredient(self, name: str) -> TheMealDBIngredient | None:
         """Busca um ingrediente específico no TheMealDB."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.THEMEALDB_BASE_URL}/search.php",
-                params={"i": name},
+        if self.mirror and await asyncio.to_thread(self.mirror.is_populated):
+            ing = await asyncio.to_thread(self.mirror.ingredient, name)
+            if not ing:
+                return None
+            return TheMealDBIngredient(
+                id=ing.get("idIngredient", ""),
+                name=ing["strIngredient"],
+                description=ing.get("strDescription"),
+                image_url=f"https://www.themealdb.com/images/ingredients/{ing['strIngredient']}.png",
             )
 
-            if response.status_code != 200:
-                return None
+        response = await self._get(
+            f"{self.THEMEALDB_BASE_URL}/search.php",
+            endpoint="themealdb_search",
+            vazio=_sem_meals,
+            params={"i": name},
+        )
 
-            data = response.json()
-            ingredients = data.get("meals")
+        if response.status_code != 200:
+            return None
+
+        data = response.json()
+        ingredients = data.get("meals")
             
-            if not ingredients:
-                return None
+        if not ingredients:
+            return None
 
-            ing = ingredients[0]
-            ing_name = ing.get("strIngredient", name)
+        ing = ingredients[0]
+        ing_name = ing.get("strIngredient", name)
 
-            return TheMealDBIngredient(
-                id=ing.get("idIngredient", ""),
-                name=ing_name,
-                description=ing.get("strDescription"),
-                image_url=f"https://www.themealdb.com/images/ingredients/{ing_name}.png",
-            )
+        return TheMealDBIngredient(
+            id=ing.get("idIngredient", ""),
+            name=ing_name,
+            description=ing.get("strDescription"),
+            image_url=f"https://www.themealdb.com/images/ingredients/{ing_name}.png",
+        )
+
+    async def _buscar_usda(self, nome: str, usda_fdc_id: int | None) -> USDAFood | None:
+        if usda_fdc_id:
+            return await self.get_usda_food(usda_fdc_id)
+        if self.usda_api_key:
+            usda_foods = await self.search_usda(nome, page_size=1)
+            return usda_foods[0] if usda_foods else None
+        return None
+
+    async def _buscar_openfoodfacts(
+        self, nome: str, openfoodfacts_id: str | None
+    ) -> OpenFoodFactsProduct | None:
+        if openfoodfacts_id:
+            return await self.get_openfoodfacts_product(openfoodfacts_id)
+        off_products = await self.search_openfoodfacts(nome, page_size=1)
+        return off_products[0] if off_products else None
 
     async def enrich_ingredient(
         self,
@@ -251,6 +319,9 @@ class IngredientesAPIService:
     ) -> dict:
         """
         Enriquece dados de um ingrediente buscando em múltiplas fontes.
+        USDA e Open Food Facts são consultados em paralelo; a imagem do
+        TheMealDB é buscada especulativamente e cancelada se o Open Food
+        Facts já trouxer uma imagem.
         Retorna um dicionário com dados consolidados.
         """
         result = {
@@ -266,20 +337,18 @@ class IngredientesAPIService:
             "categoria": None,
         }
 
-        if usda_fdc_id:
-            usda_food = await self.get_usda_food(usda_fdc_id)
+        mealdb_task = asyncio.create_task(self.search_themealdb_ingredient(nome))
+        try:
+            # Se uma fonte falhar, o TaskGroup cancela a outra: uma busca no Open
+            # Food Facts cujo resultado seria descartado não gasta a cota do host
+            async with asyncio.TaskGroup() as tg:
+                usda_task = tg.create_task(self._buscar_usda(nome, usda_fdc_id))
+                off_task = tg.create_task(self._buscar_openfoodfacts(nome, openfoodfacts_id))
+            usda_food, off_product = usda_task.result(), off_task.result()
+
             if usda_food:
-                result["calorias"] = usda_food.calories
-                result["proteinas"] = usda_food.protein
-                result["carboidratos"] = usda_food.carbohydrates
-                result["gorduras"] = usda_food.fat
-                result["fibras"] = usda_food.fiber
-                result["categoria"] = usda_food.food_category
-        elif self.usda_api_key:
-            usda_foods = await self.search_usda(nome, page_size=1)
-            if usda_foods:
-                usda_food = usda_foods[0]
-                result["usda_fdc_id"] = usda_food.fdc_id
+                if not usda_fdc_id:
+                    result["usda_fdc_id"] = usda_food.fdc_id
                 result["calorias"] = usda_food.calories
                 result["proteinas"] = usda_food.protein
                 result["carboidratos"] = usda_food.carbohydrates
@@ -287,21 +356,9 @@ class IngredientesAPIService:
                 result["fibras"] = usda_food.fiber
                 result["categoria"] = usda_food.food_category
 
-        if openfoodfacts_id:
-            off_product = await self.get_openfoodfacts_product(openfoodfacts_id)
             if off_product:
-                result["imagem_url"] = off_product.image_url
-                if not result["calorias"]:
-                    result["calorias"] = off_product.energy_kcal
-                    result["proteinas"] = off_product.proteins
-                    result["carboidratos"] = off_product.carbohydrates
-                    result["gorduras"] = off_product.fat
-                    result["fibras"] = off_product.fiber
-        else:
-            off_products = await self.search_openfoodfacts(nome, page_size=1)
-            if off_products:
-                off_product = off_products[0]
-                result["openfoodfacts_id"] = off_product.code
+                if not openfoodfacts_id:
+                    result["openfoodfacts_id"] = off_product.code
                 result["imagem_url"] = off_product.image_url
                 if not result["calorias"]:
                     result["calorias"] = off_product.energy_kcal
@@ -310,9 +367,18 @@ class IngredientesAPIService:
                     result["gorduras"] = off_product.fat
                     result["fibras"] = off_product.fiber
 
-        if not result["imagem_url"]:
-            mealdb_ing = await self.search_themealdb_ingredient(nome)
-            if mealdb_ing:
-                result["imagem_url"] = mealdb_ing.image_url
+            if not result["imagem_url"]:
+                mealdb_ing = await mealdb_task
+                if mealdb_ing:
+                    result["imagem_url"] = mealdb_ing.image_url
+        except BaseExceptionGroup as grupo:
+            # Quem chama (jobs, rotas) trata a exceção da fonte, não o grupo
+            raise grupo.exceptions[0]
+        finally:
+            if not mealdb_task.done():
+                mealdb_task.cancel()
+            elif not mealdb_task.cancelled():
+                # Marca a exceção como lida quando o resultado não foi usado
+                mealdb_task.exception()
 
         return result
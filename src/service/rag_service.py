@@ -37,6 +37,27 @@ class RAGService:
             )
         )
 
+    async def add_receitas_content_async(
+        self, itens: list[dict]
+    ) -> list[Optional[BaseException]]:
+        """
+        Indexa um lote de receitas ({"name", "content", "metadata"}) de uma vez:
+        os embeddings e upserts do lote rodam em paralelo. Retorna, na ordem
+        dos itens, None ou a exceção de cada receita.
+        """
+        resultados = await asyncio.gather(
+            *(
+                self.receitas_kb.add_content_async(
+                    name=item["name"],
+                    text_content=item["content"],
+                    metadata=item.get("metadata") or {"tipo": "receita"},
+                )
+                for item in itens
+            ),
+            return_exceptions=True,
+        )
+        return [r if isinstance(r, BaseException) else None for r in resultados]
+
     def add_receita_from_url(self, name: str, url: str, metadata: Optional[dict] = None):
         self._run_async(
             self.receitas_kb.add_content_async(
@@ -64,11 +85,21 @@ class RAGService:
             )
         )
 
-    def search_receitas(self, query: str, num_documents: int = 5) -> list:
-        return self.receitas_kb.search(query=query, num_documents=num_documents)
+    def _search(
+        self, kb: Knowledge, query: str, num_documents: int, filters: Optional[dict]
+    ) -> list:
+        """O reranking (com busca de candidatos extras) acontece no RAGQdrant."""
+        return kb.search(query=query, max_results=num_documents, filters=filters)
+
+    def search_receitas(
+        self, query: str, num_documents: int = 5, filters: Optional[dict] = None
+    ) -> list:
+        return self._search(self.receitas_kb, query, num_documents, filters)
 
-    def search_fotografia(self, query: str, num_documents: int = 5) -> list:
-        return self.fotografia_kb.search(query=query, num_documents=num_documents)
+    def search_fotografia(
+        self, query: str, num_documents: int = 5, filters: Optional[dict] = None
+    ) -> list:
+        return self._search(self.fotografia_kb, query, num_documents, filters)
 
     def get_receitas_knowledge(self) -> Knowledge:
         return self.receitas_kb
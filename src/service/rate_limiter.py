@@ -0,0 +1,255 @@
+"""
+Limite de requisições por host para as APIs externas (USDA, Open Food Facts,
+TheMealDB). Um token bucket por host, compartilhado por todo o processo, com
+retry exponencial (respeitando Retry-After) e circuit breaker por host.
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+
+import httpx
+
+from src.core.settings import Settings
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(httpx.HTTPError):
+    """API externa indisponível ou recusando a requisição (não é "sem dados")."""
+
+    def __init__(self, message: str, host: str, status_code: int | None = None):
+        super().__init__(message)
+        self.host = host
+        self.status_code = status_code
+
+    @property
+    def transitorio(self) -> bool:
+        """
+        429, 5xx, erro de rede ou circuito aberto: a API está fora do ar ou
+        limitando e vale tentar de novo mais tarde. Os demais 4xx (consulta
+        inválida, chave recusada) se repetiriam em qualquer nova tentativa.
+        """
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuito aberto para {host}, nova tentativa em {retry_in:.0f}s", host)
+        self.retry_in = retry_in
+
+
+def verificar_resposta(url: str, response: httpx.Response) -> httpx.Response:
+    """404/410 significam "não encontrado"; os demais erros viram UpstreamError."""
+    if response.status_code >= 400 and response.status_code not in (404, 410):
+        host = urlparse(url).hostname or ""
+        raise UpstreamError(
+            f"{host} respondeu {response.status_code}", host, response.status_code
+        )
+    return response
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    valor = response.headers.get("retry-after")
+    if not valor:
+        return None
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max((data - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def pause(self, seconds: float) -> None:
+        """Segura todas as requisições do host (ex.: após um 429 com Retry-After)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            pausa = self.paused_until - time.monotonic()
+            if pausa > 0:
+                await asyncio.sleep(pausa)
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class CircuitBreaker:
+    """
+    Abre após `threshold` falhas seguidas e rejeita requisições por `cooldown`
+    segundos; depois deixa passar uma requisição de teste (meio-aberto).
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+
+    def allow(self) -> bool:
+        if self.failures < self.threshold:
+            return True
+        now = time.monotonic()
+        if now >= self.open_until:
+            # Reserva a janela para uma única requisição de teste
+            self.open_until = now + self.cooldown
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        return max(self.open_until - time.monotonic(), 0.0)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, open_for: float | None = None) -> None:
+        self.failures += 1
+        if open_for is not None:
+            self.failures = max(self.failures, self.threshold)
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + max(open_for or 0.0, self.cooldown)
+
+
+class HostRateLimiter:
+    """Token buckets por host; hosts sem limite configurado não esperam."""
+
+    def __init__(
+        self,
+        limits: dict[str, float],
+        burst: float = 1,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 60.0,
+    ):
+        self.limits = limits
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._buckets: dict[str, TokenBucket] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def _bucket(self, url: str) -> TokenBucket | None:
+        host = urlparse(url).hostname or ""
+        rate = self.limits.get(host)
+        if not rate:
+            return None
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(rate=rate, capacity=self.burst)
+        return self._buckets[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return self._breakers[host]
+
+    async def acquire(self, url: str) -> None:
+        bucket = self._bucket(url)
+        if bucket:
+            await bucket.acquire()
+
+    @asynccontextmanager
+    async def limit(self, url: str):
+        await self.acquire(url)
+        yield
+
+    def _backoff(self, tentativa: int) -> float:
+        # Backoff exponencial com "full jitter"
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**tentativa))
+
+    async def send(
+        self, url: str, request: Callable[[], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """
+        Executa `request` respeitando o limite do host. 429, 5xx e erros de
+        rede são repetidos com backoff (ou pelo Retry-After); esgotadas as
+        tentativas, levanta UpstreamError em vez de devolver a resposta de erro.
+        """
+        host = urlparse(url).hostname or ""
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(host, breaker.retry_in())
+
+        ultimo_erro = ""
+        status_code = None
+        for tentativa in range(self.max_retries + 1):
+            await self.acquire(url)
+            try:
+                response = await request()
+            except httpx.TransportError as e:
+                ultimo_erro, status_code = f"{host}: {e!r}", None
+                espera = self._backoff(tentativa)
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    breaker.record_success()
+                    return response
+
+                ultimo_erro = f"{host} respondeu {response.status_code}"
+                status_code = response.status_code
+                # Respostas em streaming precisam liberar a conexão antes do retry
+                await response.aclose()
+                retry_after = _retry_after(response)
+                if retry_after is not None and retry_after > self.backoff_max:
+                    # Ex.: cota horária da USDA esgotada; não adianta insistir agora
+                    breaker.record_failure(open_for=retry_after)
+                    raise UpstreamError(ultimo_erro, host, status_code)
+                espera = retry_after if retry_after is not None else self._backoff(tentativa)
+                bucket = self._bucket(url)
+                if response.status_code == 429 and bucket:
+                    # A pausa vale para todas as requisições do host; o acquire já espera
+                    bucket.pause(espera)
+                    espera = 0.0
+
+            if tentativa < self.max_retries:
+                await asyncio.sleep(espera)
+
+        breaker.record_failure()
+        raise UpstreamError(ultimo_erro, host, status_code)
+
+
+_rate_limiter: HostRateLimiter | None = None
+
+
+def get_rate_limiter(settings: Settings) -> HostRateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = HostRateLimiter(
+            settings.rate_limits,
+            burst=settings.rate_limit_burst,
+            max_retries=settings.rate_limit_max_retries,
+            backoff_base=settings.rate_limit_backoff_base,
+            backoff_max=settings.rate_limit_backoff_max,
+            breaker_threshold=settings.circuit_breaker_threshold,
+            breaker_cooldown=settings.circuit_breaker_cooldown,
+        )
+    return _rate_limiter
@@ -1,8 +1,9 @@
-from typing import Optional
+from typing import Any, Optional
 
-from sqlmodel import Session
+from sqlmodel import Session, delete, or_, select
 
-from src.models.receitas import ReceitaCreate, ReceitaTable
+from src.models.ingredientes import IngredienteTable, chave_nome
+from src.models.receitas import ReceitaCreate, ReceitaIngredienteTable, ReceitaTable
 
 
 def criar_receita(session: Session, payload: ReceitaCreate) -> ReceitaTable:
@@ -35,3 +36,78 @@ def atualizar_status(
     session.commit()
     session.refresh(receita)
     return receita
+
+
+def salvar_conteudo_receita(
+    session: Session, receita: ReceitaTable, ingredientes: list, modo_preparo: list
+) -> ReceitaTable:
+    receita.json_ingredientes = ingredientes
+    receita.json_modo_preparo = modo_preparo
+    indexar_ingredientes(session, receita.id_receita, ingredientes)
+    session.add(receita)
+    session.commit()
+    session.refresh(receita)
+    return receita
+
+
+def indexar_ingredientes(
+    session: Session, receita_id: int, ingredientes: list
+) -> list[ReceitaIngredienteTable]:
+    """
+    Regrava as linhas de receita_ingredientes da receita (sem commit). Os nomes
+    são ligados ao cadastro pela chave normalizada, numa única consulta.
+    """
+    session.exec(delete(ReceitaIngredienteTable).where(ReceitaIngredienteTable.id_receita == receita_id))
+
+    itens = [item for item in map(_item_ingrediente, ingredientes or []) if item]
+    chaves = {chave_nome(item["nome"]) for item in itens}
+    cadastrados = dict(
+        session.exec(
+            select(IngredienteTable.nome_chave, IngredienteTable.id_ingrediente)
+            .where(IngredienteTable.nome_chave.in_(chaves))
+        ).all()
+    ) if chaves else {}
+
+    linhas = [
+        ReceitaIngredienteTable(
+            id_receita=receita_id,
+            posicao=posicao,
+            id_ingrediente=cadastrados.get(chave_nome(item["nome"])),
+            nome_chave=chave_nome(item["nome"]),
+            **item,
+        )
+        for posicao, item in enumerate(itens)
+    ]
+    session.add_all(linhas)
+    return linhas
+
+
+def _item_ingrediente(item: Any) -> dict | None:
+    """Aceita {"nome", "quantidade", "unidade"} (formato do chef) ou só o nome."""
+    if isinstance(item, str):
+        item = {"nome": item}
+    if not isinstance(item, dict) or not str(item.get("nome") or "").strip():
+        return None
+    quantidade, unidade = item.get("quantidade"), item.get("unidade")
+    return {
+        "nome": str(item["nome"]).strip()[:255],
+        "quantidade": str(quantidade)[:255] if quantidade not in (None, "") else None,
+        "unidade": str(unidade)[:255] if unidade not in (None, "") else None,
+    }
+
+
+def receitas_por_ingrediente(
+    session: Session, ingrediente_id: int | None = None, nome: str | None = None
+) -> list[ReceitaTable]:
+    if ingrediente_id is not None:
+        filtro = ReceitaIngredienteTable.id_ingrediente == ingrediente_id
+        ingrediente = session.get(IngredienteTable, ingrediente_id)
+        if ingrediente and ingrediente.nome_chave:
+            # Receitas salvas antes do ingrediente ser cadastrado ficaram sem id
+            filtro = or_(filtro, ReceitaIngredienteTable.nome_chave == ingrediente.nome_chave)
+    else:
+        filtro = ReceitaIngredienteTable.nome_chave == chave_nome(nome or "")
+    ids = select(ReceitaIngredienteTable.id_receita).where(filtro)
+    return session.exec(
+        select(ReceitaTable).where(ReceitaTable.id_receita.in_(ids)).order_by(ReceitaTable.id_receita)
+    ).all()
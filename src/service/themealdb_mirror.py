@@ -0,0 +1,258 @@
+"""
+Espelho local (SQLite) do TheMealDB: categorias, áreas, ingredientes e
+receitas completas. Os dados do TheMealDB mudam pouco, então importações e
+rotas /themealdb podem ser atendidas do disco, inclusive sem rede.
+
+Sincronização:
+    python -m src.service.themealdb_mirror [--force]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from src.core.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def _normalizar_ingrediente(nome: str) -> str:
+    # filter.php?i= aceita "chicken_breast" para "Chicken Breast"
+    return nome.replace("_", " ").strip().lower()
+
+
+class TheMealDBMirror:
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._populated = False
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS areas (name TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS ingredients (
+                name_key TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meals (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                category TEXT,
+                area TEXT,
+                hash TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_meals_category ON meals (category);
+            CREATE TABLE IF NOT EXISTS meal_ingredients (
+                meal_id TEXT NOT NULL,
+                ingredient TEXT NOT NULL,
+                PRIMARY KEY (meal_id, ingredient)
+            );
+            CREATE INDEX IF NOT EXISTS ix_meal_ingredients ON meal_ingredients (ingredient);
+            """
+        )
+
+    def _query(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_meta(self, key: str) -> str | None:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+    def is_populated(self) -> bool:
+        if not self._populated:
+            self._populated = self.get_meta("synced_at") is not None
+        return self._populated
+
+    def synced_at(self) -> float | None:
+        value = self.get_meta("synced_at")
+        return float(value) if value else None
+
+    # --- escrita -------------------------------------------------------
+
+    def save_lists(self, categories: list[str], areas: list[str], ingredients: list[dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM categories")
+            self._conn.executemany("INSERT INTO categories VALUES (?)", [(c,) for c in categories])
+            self._conn.execute("DELETE FROM areas")
+            self._conn.executemany("INSERT INTO areas VALUES (?)", [(a,) for a in areas])
+            self._conn.execute("DELETE FROM ingredients")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ingredients VALUES (?, ?)",
+                [
+                    (_normalizar_ingrediente(i["strIngredient"]), json.dumps(i))
+                    for i in ingredients
+                    if i.get("strIngredient")
+                ],
+            )
+
+    def upsert_meals(self, meals: list[dict]) -> dict:
+        """Grava só as receitas novas ou alteradas (comparando o hash do JSON)."""
+        hashes = {r["id"]: r["hash"] for r in self._query("SELECT id, hash FROM meals")}
+        novas = atualizadas = 0
+        with self._lock, self._conn:
+            for meal in meals:
+                data = json.dumps(meal, sort_keys=True)
+                digest = hashlib.sha1(data.encode()).hexdigest()
+                meal_id = meal["idMeal"]
+                if hashes.get(meal_id) == digest:
+                    continue
+                if meal_id in hashes:
+                    atualizadas += 1
+                else:
+                    novas += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meals VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        meal_id,
+                        meal.get("strMeal") or "",
+                        meal.get("strCategory"),
+                        meal.get("strArea"),
+                        digest,
+                        data,
+                    ),
+                )
+                self._conn.execute("DELETE FROM meal_ingredients WHERE meal_id = ?", (meal_id,))
+                ingredientes = {
+                    _normalizar_ingrediente(meal[f"strIngredient{i}"])
+                    for i in range(1, 21)
+                    if (meal.get(f"strIngredient{i}") or "").strip()
+                }
+                self._conn.executemany(
+                    "INSERT INTO meal_ingredients VALUES (?, ?)",
+                    [(meal_id, ing) for ing in ingredientes],
+                )
+        return {"novas": novas, "atualizadas": atualizadas}
+
+    def remove_meals_except(self, ids: set[str]) -> int:
+        """Remove receitas que não existem mais na origem."""
+        existentes = {r["id"] for r in self._query("SELECT id FROM meals")}
+        removidas = existentes - ids
+        with self._lock, self._conn:
+            for meal_id in removidas:
+                self._conn.execute("DELETE FROM meals WHERE id = ?", (meal_id,))
+                self._conn.execute("DELETE FROM meal_ingredients WHERE meal_id = ?", (meal_id,))
+        return len(removidas)
+
+    def mark_synced(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('synced_at', ?)", (str(time.time()),)
+            )
+        self._populated = True
+
+    # --- leitura -------------------------------------------------------
+
+    def categories(self) -> list[str]:
+        return [r["name"] for r in self._query("SELECT name FROM categories ORDER BY name")]
+
+    def areas(self) -> list[str]:
+        return [r["name"] for r in self._query("SELECT name FROM areas ORDER BY name")]
+
+    def ingredients(self) -> list[dict]:
+        return [json.loads(r["data"]) for r in self._query("SELECT data FROM ingredients")]
+
+    def ingredient(self, name: str) -> dict | None:
+        rows = self._query(
+            "SELECT data FROM ingredients WHERE name_key = ?", (_normalizar_ingrediente(name),)
+        )
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def get_meal(self, meal_id: str) -> dict | None:
+        rows = self._query("SELECT data FROM meals WHERE id = ?", (meal_id,))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def search_meals(self, query: str) -> list[dict]:
+        termo = query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        rows = self._query(
+            "SELECT data FROM meals WHERE lower(name) LIKE ? ESCAPE '\\' ORDER BY name",
+            (f"%{termo}%",),
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    def meals_by_category(self, category: str) -> list[dict]:
+        rows = self._query(
+            "SELECT data FROM meals WHERE lower(category) = ? ORDER BY name", (category.lower(),)
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    def meals_by_ingredient(self, ingredient: str) -> list[dict]:
+        rows = self._query(
+            """
+            SELECT m.data FROM meals m
+            JOIN meal_ingredients mi ON mi.meal_id = m.id
+            WHERE mi.ingredient = ? ORDER BY m.name
+            """,
+            (_normalizar_ingrediente(ingredient),),
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    def random_meal(self) -> dict | None:
+        rows = self._query("SELECT data FROM meals ORDER BY random() LIMIT 1")
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def stats(self) -> dict:
+        def _count(table: str) -> int:
+            return self._query(f"SELECT count(*) AS n FROM {table}")[0]["n"]
+
+        return {
+            "categorias": _count("categories"),
+            "areas": _count("areas"),
+            "ingredientes": _count("ingredients"),
+            "receitas": _count("meals"),
+            "sincronizado_em": self.synced_at(),
+        }
+
+
+_mirror: TheMealDBMirror | None = None
+
+
+def get_themealdb_mirror(settings: Settings) -> TheMealDBMirror | None:
+    global _mirror
+    if not settings.themealdb_mirror_enabled:
+        return None
+    if _mirror is None:
+        _mirror = TheMealDBMirror(settings.themealdb_mirror_path)
+    return _mirror
+
+
+def main(argv: list[str] | None = None) -> int:
+    from src.core.http_client import close_http_client
+    from src.service.rate_limiter import get_rate_limiter
+    from src.service.themealdb_service import TheMealDBService
+
+    parser = argparse.ArgumentParser(description="Sincroniza o espelho local do TheMealDB")
+    parser.add_argument("--force", action="store_true", help="ignora a idade máxima do espelho")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    settings = Settings()
+    mirror = TheMealDBMirror(settings.themealdb_mirror_path)
+    service = TheMealDBService(rate_limiter=get_rate_limiter(settings), mirror=mirror)
+
+    async def _run() -> dict:
+        try:
+            return await service.sync_mirror(
+                max_age=0 if args.force else settings.themealdb_mirror_max_age
+            )
+        finally:
+            await close_http_client()
+
+    logger.info("Espelho TheMealDB: %s", asyncio.run(_run()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
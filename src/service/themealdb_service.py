@@ -1,11 +1,24 @@
 """
 Serviço para integração com TheMealDB API para receitas.
 Útil para alimentar o RAG com receitas de exemplo.
+Com um espelho local sincronizado, as consultas são respondidas do disco.
 """
 
+import asyncio
+import logging
+import string
+import time
+
 import httpx
 from pydantic import BaseModel
 
+from src.core.http_cache import HTTPResponseCache
+from src.core.single_flight import SingleFlight
+from src.service.http_base import APIExternaService
+from src.service.rate_limiter import HostRateLimiter
+from src.service.themealdb_mirror import TheMealDBMirror
+
+logger = logging.getLogger(__name__)
 
 class MealDBRecipe(BaseModel):
     id: str
@@ -19,131 +32,245 @@ class MealDBRecipe(BaseModel):
     tags: str | None = None
 
 
-class TheMealDBService:
+def _sem_meals(response: httpx.Response) -> bool:
+    return not response.json().get("meals")
+
+
+class TheMealDBService(APIExternaService):
     BASE_URL = "https://www.themealdb.com/api/json/v1/1"
 
+    def __init__(
+        self,
+        rate_limiter: HostRateLimiter | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        cache: HTTPResponseCache | None = None,
+        mirror: TheMealDBMirror | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
+        super().__init__(rate_limiter, http_client, cache, single_flight)
+        self.mirror = mirror
+
+    async def _local(self) -> TheMealDBMirror | None:
+        """Espelho local, quando já sincronizado. O SQLite é lido fora do event loop."""
+        if self.mirror and await asyncio.to_thread(self.mirror.is_populated):
+            return self.mirror
+        return None
+
+    async def sync_mirror(self, max_age: float = 0) -> dict:
+        """
+        Sincroniza o espelho local. As receitas completas vêm da busca por
+        letra inicial (uma requisição por letra/dígito), e só as receitas
+        novas ou alteradas são regravadas. Não faz nada se a última
+        sincronização for mais recente que `max_age` segundos.
+        """
+        if not self.mirror:
+            raise RuntimeError("TheMealDBService sem espelho configurado")
+
+        synced_at = await asyncio.to_thread(self.mirror.synced_at)
+        if max_age and synced_at and time.time() - synced_at < max_age:
+            return {"status": "atual", **await asyncio.to_thread(self.mirror.stats)}
+
+        # A sincronização sempre vai à origem, sem passar pelo cache HTTP
+        listas = await asyncio.gather(
+            self._fetch(f"{self.BASE_URL}/list.php?c=list"),
+            self._fetch(f"{self.BASE_URL}/list.php?a=list"),
+            self._fetch(f"{self.BASE_URL}/list.php?i=list"),
+        )
+        if any(r.status_code != 200 for r in listas):
+            raise RuntimeError("Falha ao obter as listas do TheMealDB")
+        categorias, areas, ingredientes = [r.json().get("meals") or [] for r in listas]
+
+        iniciais = string.ascii_lowercase + string.digits
+        # Uma letra com erro não descarta as demais: a sincronização fica parcial
+        respostas = await asyncio.gather(
+            *(self._fetch(f"{self.BASE_URL}/search.php", params={"f": c}) for c in iniciais),
+            return_exceptions=True,
+        )
+        meals = []
+        falhas = []
+        for inicial, response in zip(iniciais, respostas):
+            if isinstance(response, BaseException):
+                if not isinstance(response, Exception):
+                    raise response
+                logger.warning("TheMealDB: falha na letra %r: %s", inicial, response)
+                falhas.append(inicial)
+                continue
+            if response.status_code != 200:
+                falhas.append(inicial)
+                continue
+            meals.extend(response.json().get("meals") or [])
+        completo = not falhas
+
+        await asyncio.to_thread(
+            self.mirror.save_lists,
+            [c["strCategory"] for c in categorias if c.get("strCategory")],
+            [a["strArea"] for a in areas if a.get("strArea")],
+            ingredientes,
+        )
+        resultado = await asyncio.to_thread(self.mirror.upsert_meals, meals)
+        # Só remove receitas ausentes se todas as letras foram obtidas
+        resultado["removidas"] = (
+            await asyncio.to_thread(self.mirror.remove_meals_except, {m["idMeal"] for m in meals})
+            if completo
+            else 0
+        )
+        await asyncio.to_thread(self.mirror.mark_synced)
+
+        return {
+            "status": "ok" if completo else "parcial",
+            "falhas": falhas,
+            **resultado,
+            **await asyncio.to_thread(self.mirror.stats),
+        }
+
+    @staticmethod
+    def _resumo(meal: dict) -> MealDBRecipe:
+        return MealDBRecipe(
+            id=meal.get("idMeal", ""),
+            name=meal.get("strMeal", ""),
+            image_url=meal.get("strMealThumb"),
+        )
+
     async def search_recipes(self, query: str) -> list[MealDBRecipe]:
         """Busca receitas por nome."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.BASE_URL}/search.php",
-                params={"s": query},
-            )
+        if local := await self._local():
+            meals = await asyncio.to_thread(local.search_meals, query)
+            return [self._parse_meal(meal) for meal in meals]
 
-            if response.status_code != 200:
-                return []
+        response = await self._get(
+            f"{self.BASE_URL}/search.php",
+            endpoint="themealdb_search",
+            vazio=_sem_meals,
+            params={"s": query},
+        )
 
-            data = response.json()
-            meals = data.get("meals") or []
+        if response.status_code != 200:
+            return []
 
-            return [self._parse_meal(meal) for meal in meals]
+        data = response.json()
+        meals = data.get("meals") or []
+
+        return [self._parse_meal(meal) for meal in meals]
 
     async def get_recipe_by_id(self, meal_id: str) -> MealDBRecipe | None:
         """Obtém uma receita específica pelo ID."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.BASE_URL}/lookup.php",
-                params={"i": meal_id},
-            )
+        if local := await self._local():
+            meal = await asyncio.to_thread(local.get_meal, meal_id)
+            if meal:
+                return self._parse_meal(meal)
+
+        response = await self._get(
+            f"{self.BASE_URL}/lookup.php",
+            endpoint="themealdb_lookup",
+            vazio=_sem_meals,
+            params={"i": meal_id},
+        )
 
-            if response.status_code != 200:
-                return None
+        if response.status_code != 200:
+            return None
 
-            data = response.json()
-            meals = data.get("meals")
+        data = response.json()
+        meals = data.get("meals")
 
-            if not meals:
-                return None
+        if not meals:
+            return None
 
-            return self._parse_meal(meals[0])
+        if self.mirror:
+            # Receita nova na origem: entra no espelho sem esperar a próxima sincronização
+            await asyncio.to_thread(self.mirror.upsert_meals, meals[:1])
+
+        return self._parse_meal(meals[0])
 
     async def get_random_recipe(self) -> MealDBRecipe | None:
         """Obtém uma receita aleatória."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.BASE_URL}/random.php")
+        if local := await self._local():
+            meal = await asyncio.to_thread(local.random_meal)
+            return self._parse_meal(meal) if meal else None
 
-            if response.status_code != 200:
-                return None
+        response = await self._get(f"{self.BASE_URL}/random.php")
 
-            data = response.json()
-            meals = data.get("meals")
+        if response.status_code != 200:
+            return None
 
-            if not meals:
-                return None
+        data = response.json()
+        meals = data.get("meals")
 
-            return self._parse_meal(meals[0])
+        if not meals:
+            return None
+
+        return self._parse_meal(meals[0])
 
     async def list_categories(self) -> list[str]:
         """Lista todas as categorias de receitas."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.BASE_URL}/list.php?c=list")
+        if local := await self._local():
+            return await asyncio.to_thread(local.categories)
 
-            if response.status_code != 200:
-                return []
+        response = await self._get(f"{self.BASE_URL}/list.php?c=list", endpoint="themealdb_list")
 
-            data = response.json()
-            meals = data.get("meals") or []
+        if response.status_code != 200:
+            return []
 
-            return [m.get("strCategory") for m in meals if m.get("strCategory")]
+        data = response.json()
+        meals = data.get("meals") or []
+
+        return [m.get("strCategory") for m in meals if m.get("strCategory")]
 
     async def list_areas(self) -> list[str]:
         """Lista todas as áreas/cozinhas (ex: Italian, Mexican)."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{self.BASE_URL}/list.php?a=list")
+        if local := await self._local():
+            return await asyncio.to_thread(local.areas)
 
-            if response.status_code != 200:
-                return []
+        response = await self._get(f"{self.BASE_URL}/list.php?a=list", endpoint="themealdb_list")
+
+        if response.status_code != 200:
+            return []
 
-            data = response.json()
-            meals = data.get("meals") or []
+        data = response.json()
+        meals = data.get("meals") or []
 
-            return [m.get("strArea") for m in meals if m.get("strArea")]
+        return [m.get("strArea") for m in meals if m.get("strArea")]
 
     async def filter_by_category(self, category: str) -> list[MealDBRecipe]:
         """Filtra receitas por categoria."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.BASE_URL}/filter.php",
-                params={"c": category},
-            )
+        if local := await self._local():
+            meals = await asyncio.to_thread(local.meals_by_category, category)
+            return [self._resumo(m) for m in meals]
+
+        response = await self._get(
+            f"{self.BASE_URL}/filter.php",
+            endpoint="themealdb_search",
+            vazio=_sem_meals,
+            params={"c": category},
+        )
 
-            if response.status_code != 200:
-                return []
+        if response.status_code != 200:
+            return []
 
-            data = response.json()
-            meals = data.get("meals") or []
+        data = response.json()
+        meals = data.get("meals") or []
 
-            return [
-                MealDBRecipe(
-                    id=m.get("idMeal", ""),
-                    name=m.get("strMeal", ""),
-                    image_url=m.get("strMealThumb"),
-                )
-                for m in meals
-            ]
+        return [self._resumo(m) for m in meals]
 
     async def filter_by_ingredient(self, ingredient: str) -> list[MealDBRecipe]:
         """Filtra receitas por ingrediente principal."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{self.BASE_URL}/filter.php",
-                params={"i": ingredient},
-            )
+        if local := await self._local():
+            meals = await asyncio.to_thread(local.meals_by_ingredient, ingredient)
+            return [self._resumo(m) for m in meals]
+
+        response = await self._get(
+            f"{self.BASE_URL}/filter.php",
+            endpoint="themealdb_search",
+            vazio=_sem_meals,
+            params={"i": ingredient},
+        )
 
-            if response.status_code != 200:
-                return []
-
-            data = response.json()
-            meals = data.get("meals") or []
-
-            return [
-                MealDBRecipe(
-                    id=m.get("idMeal", ""),
-                    name=m.get("strMeal", ""),
-                    image_url=m.get("strMealThumb"),
-                )
-                for m in meals
-            ]
+        if response.status_code != 200:
+            return []
+
+        data = response.json()
+        meals = data.get("meals") or []
+
+        return [self._resumo(m) for m in meals]
 
     def _parse_meal(self, meal: dict) -> MealDBRecipe:
         """Converte resposta da API para MealDBRecipe."""
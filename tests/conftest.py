@@ -1,24 +1,34 @@
 import os
 import pytest
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from unittest.mock import MagicMock, patch
 
+import pytest_asyncio
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.pool import StaticPool
 
 os.environ["GEMINI_API_KEY"] = "test-api-key"
 os.environ["AGNO_TELEMETRY"] = "false"
+os.environ.setdefault("EMBEDDER_PROVIDER", "hash")
+os.environ.setdefault("QDRANT_LOCATION", ":memory:")
+os.environ.setdefault("HTTP_CACHE_ENABLED", "false")
+os.environ.setdefault("THEMEALDB_MIRROR_ENABLED", "false")
+os.environ.setdefault("IMAGE_INDEX_ENABLED", "false")
 
 from src.main import app
-from src.core.db import get_session
+from src.core.db import get_async_session, get_session
 from src.core.settings import Settings
 
 
 @pytest.fixture(scope="function")
-def test_engine():
+def test_engine(tmp_path):
+    # Arquivo (e não :memory:) para o engine assíncrono enxergar o mesmo banco
     engine = create_engine(
-        "sqlite:///:memory:",
+        f"sqlite:///{tmp_path / 'test.db'}",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
@@ -26,6 +36,20 @@ def test_engine():
     return engine
 
 
+@pytest.fixture(scope="function")
+def async_engine(test_engine):
+    # NullPool: cada sessão abre a conexão no event loop em que está rodando
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{test_engine.url.database}", poolclass=NullPool
+    )
+
+
+@pytest_asyncio.fixture(scope="function")
+async def async_session(async_engine) -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 @pytest.fixture(scope="function")
 def test_session(test_engine) -> Generator[Session, None, None]:
     with Session(test_engine) as session:
@@ -33,12 +57,17 @@ def test_session(test_engine) -> Generator[Session, None, None]:
 
 
 @pytest.fixture(scope="function")
-def client(test_engine) -> Generator[TestClient, None, None]:
+def client(test_engine, async_engine) -> Generator[TestClient, None, None]:
     def get_test_session():
         with Session(test_engine) as session:
             yield session
 
+    async def get_test_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
     app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_async_session] = get_test_async_session
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -50,6 +50,35 @@ class TestDatabase:
 
         db._engine = original_engine
 
+    def test_async_url_troca_o_driver(self):
+        from src.core.db import async_url
+
+        assert async_url("mysql+mysqlconnector://u:p@mysql:3306/receitas") == "mysql+aiomysql://u:p@mysql:3306/receitas"
+        assert async_url("sqlite:///data/test.db") == "sqlite+aiosqlite:///data/test.db"
+        assert async_url("mysql+asyncmy://u:p@h/db") == "mysql+asyncmy://u:p@h/db"
+
+    def test_pool_configuravel(self):
+        from src.core.db import _pool_kwargs
+
+        settings = Settings(db_pool_size=3, db_max_overflow=1, db_pool_recycle=60)
+
+        assert _pool_kwargs(settings, "sqlite:///x.db") == {}
+        kwargs = _pool_kwargs(settings, "mysql+aiomysql://u:p@h/db")
+        assert (kwargs["pool_size"], kwargs["max_overflow"], kwargs["pool_recycle"]) == (3, 1, 60)
+        assert kwargs["pool_pre_ping"] is True
+
+    @pytest.mark.asyncio
+    async def test_get_async_session_without_engine(self):
+        from src.core import db
+
+        original_engine = db._async_engine
+        db._async_engine = None
+        try:
+            with pytest.raises(RuntimeError, match="not initialized"):
+                await anext(db.get_async_session())
+        finally:
+            db._async_engine = original_engine
+
     def test_create_db_and_tables(self, test_engine):
         from src.core.db import _engine
         from sqlmodel import SQLModel
@@ -74,7 +103,7 @@ class TestQdrantClient:
 
 class TestKnowledge:
     def test_create_knowledge_base(self, mock_qdrant):
-        with patch("src.core.knowledge.GeminiEmbedder") as mock_embedder:
+        with patch("src.core.knowledge.create_embedder") as mock_embedder:
             mock_embedder.return_value = MagicMock()
 
             from src.core.knowledge import create_knowledge_base
@@ -85,7 +114,7 @@ class TestKnowledge:
             assert kb is not None
 
     def test_create_receitas_knowledge(self, mock_qdrant):
-        with patch("src.core.knowledge.GeminiEmbedder") as mock_embedder:
+        with patch("src.core.knowledge.create_embedder") as mock_embedder:
             mock_embedder.return_value = MagicMock()
 
             from src.core.knowledge import create_receitas_knowledge
@@ -96,7 +125,7 @@ class TestKnowledge:
             assert kb is not None
 
     def test_create_fotografia_knowledge(self, mock_qdrant):
-        with patch("src.core.knowledge.GeminiEmbedder") as mock_embedder:
+        with patch("src.core.knowledge.create_embedder") as mock_embedder:
             mock_embedder.return_value = MagicMock()
 
             from src.core.knowledge import create_fotografia_knowledge
@@ -105,3 +134,660 @@ class TestKnowledge:
             kb = create_fotografia_knowledge(settings)
 
             assert kb is not None
+
+    def test_create_receitas_knowledge_hybrid(self, mock_qdrant):
+        with patch("src.core.knowledge.create_embedder") as mock_embedder, \
+             patch("src.core.knowledge.RAGQdrant") as mock_qdrant_db:
+            mock_embedder.return_value = MagicMock()
+            mock_qdrant_db.return_value = MagicMock()
+
+            from src.core.knowledge import create_receitas_knowledge
+
+            settings = Settings()
+            settings.rag_hybrid_receitas = True
+            kb = create_receitas_knowledge(settings)
+
+            assert kb.vector_db is mock_qdrant_db.return_value
+            assert mock_qdrant_db.call_args.kwargs["hybrid"] is True
+            # Montar o Knowledge não consulta nem altera a coleção
+            mock_qdrant_db.return_value.ensure_payload_indexes.assert_not_called()
+            mock_qdrant_db.return_value.ajustar_a_colecao_existente.assert_not_called()
+
+    def _remoto(self, collection="receitas", hybrid=True):
+        from src.core.knowledge import RAGQdrant
+
+        vector_db = RAGQdrant(
+            collection=collection, url="http://qdrant:6333", embedder=MagicMock(dimensions=8), hybrid=hybrid
+        )
+        vector_db._client = MagicMock()
+        return vector_db
+
+    def test_colecao_criada_ja_tem_indices_de_payload(self):
+        vector_db = self._remoto()
+        vector_db.client.collection_exists.return_value = False
+
+        vector_db.create()
+
+        vector_db.client.create_collection.assert_called_once()
+        campos = [c.kwargs["field_name"] for c in vector_db.client.create_payload_index.call_args_list]
+        assert campos == ["meta_data.tipo", "meta_data.source_file", "meta_data.page"]
+
+    def test_formato_da_colecao_verificado_uma_vez_por_processo(self):
+        from src.core import knowledge
+
+        with patch.dict(knowledge._vetores_nomeados, clear=True):
+            primeiro, segundo = self._remoto(), self._remoto()
+            for vector_db in (primeiro, segundo):
+                vector_db.client.collection_exists.return_value = True
+                vector_db.client.get_collection.return_value.config.params.vectors = MagicMock()
+                vector_db.client.query_points.return_value.points = []
+
+            primeiro.search("frango")
+            primeiro.search("frango")
+            segundo.search("frango")
+
+        assert primeiro.client.get_collection.call_count == 1
+        segundo.client.get_collection.assert_not_called()
+        assert primeiro.hybrid is False and segundo.hybrid is False
+
+    def test_preparar_colecoes_so_indexa_as_existentes(self):
+        from src.core.knowledge import preparar_colecoes
+
+        with patch("src.core.knowledge.create_vector_db") as mock_create:
+            existentes = {"receitas": True, "fotografia": False}
+            bancos = {}
+
+            def criar(settings, collection_name, hybrid=False):
+                bancos[collection_name] = MagicMock()
+                bancos[collection_name].exists.return_value = existentes[collection_name]
+                return bancos[collection_name]
+
+            mock_create.side_effect = criar
+            preparar_colecoes(Settings())
+
+        bancos["receitas"].ensure_payload_indexes.assert_called_once()
+        bancos["fotografia"].ensure_payload_indexes.assert_not_called()
+
+
+class TestBM25SparseEncoder:
+    def test_tokenizar_remove_acentos_e_stopwords(self):
+        from src.core.sparse import tokenizar
+
+        assert tokenizar("Pão de Queijo com Requeijão") == ["pao", "queijo", "requeijao"]
+
+    def test_embed_termos_iguais_mesmo_indice(self):
+        from src.core.sparse import BM25SparseEncoder
+
+        encoder = BM25SparseEncoder()
+        doc = next(encoder.embed(["Leite condensado Moça"]))
+        query = next(encoder.embed(["moca"]))
+
+        assert len(doc.indices) == 3
+        assert query.indices[0] in doc.indices
+
+    def test_embed_saturacao_tf(self):
+        from src.core.sparse import BM25SparseEncoder
+
+        encoder = BM25SparseEncoder()
+        uma = next(encoder.embed(["alho"]))
+        muitas = next(encoder.embed(["alho " * 20]))
+
+        assert muitas.values[0] > uma.values[0]
+        assert muitas.values[0] < encoder.k1 + 1
+
+    def test_embed_texto_vazio(self):
+        from src.core.sparse import BM25SparseEncoder
+
+        vazio = next(BM25SparseEncoder().embed(["de a o"]))
+
+        assert vazio.as_object() == {"indices": [], "values": []}
+
+
+class TestQdrantStorageConfig:
+    def test_quantization_scalar(self):
+        from qdrant_client.http import models
+        from src.core.knowledge import _quantization_config
+
+        settings = Settings(rag_quantization="scalar")
+        config = _quantization_config(settings)
+
+        assert isinstance(config, models.ScalarQuantization)
+        assert config.scalar.type == models.ScalarType.INT8
+
+    def test_quantization_binary(self):
+        from qdrant_client.http import models
+        from src.core.knowledge import _quantization_config
+
+        config = _quantization_config(Settings(rag_quantization="binary"))
+
+        assert isinstance(config, models.BinaryQuantization)
+
+    def test_quantization_none_sem_rescore(self):
+        from src.core.knowledge import _quantization_config, _search_params
+
+        settings = Settings(rag_quantization="none")
+
+        assert _quantization_config(settings) is None
+        assert _search_params(settings).quantization is None
+
+    def test_quantization_invalida(self):
+        from src.core.knowledge import _quantization_config
+
+        with pytest.raises(ValueError, match="rag_quantization"):
+            _quantization_config(Settings(rag_quantization="pq"))
+
+    def test_search_params_rescore(self):
+        from src.core.knowledge import _search_params
+
+        params = _search_params(Settings(rag_quantization="scalar", rag_search_oversampling=3.0))
+
+        assert params.quantization.rescore is True
+        assert params.quantization.oversampling == 3.0
+
+    def test_collection_config_on_disk(self):
+        from src.core.knowledge import RAGQdrant
+
+        vector_db = RAGQdrant(
+            collection="teste",
+            location=":memory:",
+            embedder=MagicMock(dimensions=8),
+            on_disk=True,
+            hybrid=True,
+        )
+        config = vector_db._collection_config()
+
+        assert config["vectors_config"]["dense"].on_disk is True
+        assert config["vectors_config"]["dense"].size == 8
+        assert "sparse" in config["sparse_vectors_config"]
+
+    def test_colecao_antiga_sem_vetores_nomeados_desativa_hibrida(self):
+        from agno.vectordb.search import SearchType
+        from qdrant_client.http import models
+        from src.core.knowledge import RAGQdrant
+
+        vector_db = RAGQdrant(
+            collection="antiga",
+            location=":memory:",
+            embedder=MagicMock(dimensions=8),
+            hybrid=True,
+        )
+        vector_db.client.create_collection(
+            collection_name="antiga",
+            vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE),
+        )
+
+        vector_db.ajustar_a_colecao_existente()
+
+        assert vector_db.hybrid is False
+        assert vector_db.search_type == SearchType.vector
+        assert vector_db.use_named_vectors is False
+
+    def test_colecao_hibrida_existente_mantem_hibrida(self):
+        from src.core.knowledge import RAGQdrant
+
+        vector_db = RAGQdrant(
+            collection="nova",
+            location=":memory:",
+            embedder=MagicMock(dimensions=8),
+            hybrid=True,
+        )
+        vector_db.create()
+        vector_db.ajustar_a_colecao_existente()
+
+        assert vector_db.hybrid is True
+        assert vector_db.use_named_vectors is True
+
+    def test_storage_config_usa_vetor_nomeado_da_colecao_existente(self):
+        from src.core.knowledge import RAGQdrant
+
+        # Coleção híbrida com RAG_HYBRID_RECEITAS=false
+        vector_db = RAGQdrant(
+            collection="receitas", url="http://qdrant:6333", embedder=MagicMock(dimensions=8), hybrid=False
+        )
+        vector_db._client = MagicMock()
+        vector_db.client.get_collection.return_value.config.params.vectors = {"dense": MagicMock()}
+
+        vector_db.apply_storage_config()
+
+        vectors_config = vector_db.client.update_collection.call_args.kwargs["vectors_config"]
+        assert list(vectors_config) == [vector_db.dense_vector_name]
+
+    def test_migrar_colecao_inexistente(self):
+        from src.core.migrate_qdrant import migrar_colecao
+
+        with patch("src.core.migrate_qdrant.create_vector_db") as mock_create:
+            mock_create.return_value.exists.return_value = False
+
+            assert migrar_colecao(Settings(), "fotografia") is False
+            mock_create.return_value.apply_storage_config.assert_not_called()
+
+    def test_migrar_colecao_existente(self):
+        from src.core.migrate_qdrant import migrar_colecao
+
+        with patch("src.core.migrate_qdrant.create_vector_db") as mock_create:
+            vector_db = mock_create.return_value
+            vector_db.exists.return_value = True
+            vector_db.client.get_collection.return_value.config.params.vectors = {"dense": MagicMock()}
+
+            assert migrar_colecao(Settings(), "receitas") is True
+            vector_db.apply_storage_config.assert_called_once()
+            vector_db.ensure_payload_indexes.assert_called_once()
+
+
+class TestEmbedders:
+    def test_hashing_embedder_deterministico(self):
+        from src.core.embedders import HashingEmbedder
+
+        embedder = HashingEmbedder(dimensions=64)
+
+        assert embedder.get_embedding("Bolo de cenoura") == embedder.get_embedding("Bolo de cenoura")
+        assert len(embedder.get_embedding("Bolo de cenoura")) == 64
+
+    def test_hashing_embedder_normalizado(self):
+        import math
+        from src.core.embedders import HashingEmbedder
+
+        vector = HashingEmbedder(dimensions=128).get_embedding("Frango grelhado")
+
+        assert math.isclose(sum(v * v for v in vector), 1.0, rel_tol=1e-6)
+
+    def test_hashing_embedder_similaridade(self):
+        from src.core.embedders import HashingEmbedder
+
+        embedder = HashingEmbedder(dimensions=256)
+        base = embedder.get_embedding("bolo de chocolate")
+        parecido = embedder.get_embedding("bolo chocolate cremoso")
+        diferente = embedder.get_embedding("frango grelhado")
+
+        def cos(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        assert cos(base, parecido) > cos(base, diferente)
+
+    def test_create_embedder(self):
+        from agno.knowledge.embedder.google import GeminiEmbedder
+        from src.core.embedders import create_embedder, HashingEmbedder
+
+        assert isinstance(create_embedder(Settings(embedder_provider="gemini")), GeminiEmbedder)
+        embedder = create_embedder(Settings(embedder_provider="hash", embedder_dimensions=768))
+        assert isinstance(embedder, HashingEmbedder)
+        assert embedder.dimensions == 768
+        with pytest.raises(ValueError, match="embedder_provider"):
+            create_embedder(Settings(embedder_provider="openai"))
+
+
+class TestRAGOffline:
+    def test_ingestao_e_busca_offline(self):
+        from src.service.rag_service import RAGService
+
+        settings = Settings(
+            embedder_provider="hash",
+            embedder_dimensions=256,
+            qdrant_location=":memory:",
+        )
+        service = RAGService(settings)
+
+        service.add_receita_content("Bolo", "Bolo de chocolate com leite condensado Moça")
+        service.add_receita_content("Frango", "Frango grelhado com ervas finas")
+
+        results = service.search_receitas("leite condensado Moça", num_documents=1)
+
+        assert len(results) == 1
+        assert results[0].name == "Bolo"
+
+    @pytest.mark.asyncio
+    async def test_ingestao_em_lote_offline(self):
+        from src.service.rag_service import RAGService
+
+        settings = Settings(
+            embedder_provider="hash",
+            embedder_dimensions=256,
+            qdrant_location=":memory:",
+        )
+        service = RAGService(settings)
+
+        erros = await service.add_receitas_content_async([
+            {"name": "Bolo", "content": "Bolo de chocolate com leite condensado Moça"},
+            {"name": "Frango", "content": "Frango grelhado com ervas finas"},
+        ])
+
+        assert erros == [None, None]
+        results = service.search_receitas("frango grelhado", num_documents=1)
+        assert results[0].name == "Frango"
+
+
+class TestHttpClient:
+    @pytest.mark.asyncio
+    async def test_cliente_compartilhado(self):
+        from src.core.http_client import get_http_client, close_http_client
+
+        client = get_http_client()
+
+        assert get_http_client() is client
+        await close_http_client()
+        assert client.is_closed
+        assert get_http_client() is not client
+        await close_http_client()
+
+    def test_cliente_fechado_ao_encerrar_o_loop(self):
+        import asyncio
+
+        from src.core.http_client import get_http_client
+
+        async def usar():
+            client = get_http_client()
+            await asyncio.sleep(0)
+            return client
+
+        # Runner e não asyncio.run: o nest_asyncio reaproveita o loop no asyncio.run
+        with asyncio.Runner() as runner:
+            primeiro = runner.run(usar())
+        with asyncio.Runner() as runner:
+            segundo = runner.run(usar())
+
+        assert segundo is not primeiro
+        assert primeiro.is_closed
+        assert segundo.is_closed
+
+    def test_create_http_client_limites(self):
+        from src.core.http_client import create_http_client
+
+        settings = Settings(http_timeout=5.0, http_max_connections=10)
+        client = create_http_client(settings)
+
+        assert client.timeout.connect == 5.0
+        assert client._transport._pool._max_connections == 10
+
+
+class TestHttpCache:
+    def _cache(self, tmp_path, **kwargs):
+        from src.core.http_cache import HTTPResponseCache
+
+        ttls = kwargs.pop("ttls", {"teste": 60})
+        return HTTPResponseCache(str(tmp_path / "cache.db"), ttls=ttls, negative_ttl=10, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_resposta_servida_do_cache(self, tmp_path):
+        import httpx
+        from unittest.mock import AsyncMock
+
+        cache = self._cache(tmp_path)
+        fetch = AsyncMock(return_value=httpx.Response(200, json={"ok": True}))
+
+        r1 = await cache.get_or_fetch("teste", "https://api/x", fetch, params={"q": "a", "api_key": "k"})
+        r2 = await cache.get_or_fetch("teste", "https://api/x", fetch, params={"api_key": "outra", "q": "a"})
+
+        assert r1.json() == r2.json() == {"ok": True}
+        assert fetch.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_endpoint_sem_ttl_nao_cacheia(self, tmp_path):
+        import httpx
+        from unittest.mock import AsyncMock
+
+        cache = self._cache(tmp_path)
+        fetch = AsyncMock(return_value=httpx.Response(200, json={}))
+
+        await cache.get_or_fetch("random", "https://api/r", fetch)
+        await cache.get_or_fetch("random", "https://api/r", fetch)
+
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_revalidacao_condicional(self, tmp_path):
+        import time
+        import httpx
+        from unittest.mock import AsyncMock
+
+        cache = self._cache(tmp_path)
+        fetch = AsyncMock(return_value=httpx.Response(200, json={"v": 1}, headers={"ETag": '"abc"'}))
+        await cache.get_or_fetch("teste", "https://api/x", fetch)
+
+        with patch("src.core.http_cache.time.time", return_value=time.time() + 120):
+            fetch.return_value = httpx.Response(304)
+            response = await cache.get_or_fetch("teste", "https://api/x", fetch)
+
+        assert response.json() == {"v": 1}
+        assert fetch.await_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+
+    @pytest.mark.asyncio
+    async def test_cache_negativo(self, tmp_path):
+        import time
+        import httpx
+        from unittest.mock import AsyncMock
+
+        cache = self._cache(tmp_path)
+        fetch = AsyncMock(return_value=httpx.Response(200, json={"meals": None}))
+        vazio = lambda r: not r.json().get("meals")
+
+        await cache.get_or_fetch("teste", "https://api/x", fetch, vazio=vazio)
+        await cache.get_or_fetch("teste", "https://api/x", fetch, vazio=vazio)
+        assert fetch.await_count == 1
+
+        # O TTL negativo (10s) vence antes do TTL do endpoint (60s)
+        with patch("src.core.http_cache.time.time", return_value=time.time() + 30):
+            await cache.get_or_fetch("teste", "https://api/x", fetch, vazio=vazio)
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_erro_do_servidor_nao_e_cacheado(self, tmp_path):
+        import httpx
+        from unittest.mock import AsyncMock
+
+        cache = self._cache(tmp_path)
+        fetch = AsyncMock(return_value=httpx.Response(503))
+
+        await cache.get_or_fetch("teste", "https://api/x", fetch)
+        await cache.get_or_fetch("teste", "https://api/x", fetch)
+
+        assert fetch.await_count == 2
+
+
+class TestMigracaoNomeChave:
+    def test_adiciona_nome_chave_em_banco_existente(self):
+        from sqlalchemy import create_engine, inspect, text
+        from src.core import db
+
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE ingredientes (id_ingrediente INTEGER PRIMARY KEY, nome_singular VARCHAR)"
+            ))
+            conn.execute(text(
+                "INSERT INTO ingredientes VALUES (1, 'Maçã'), (2, 'maca'), (3, 'Sal')"
+            ))
+
+        with patch.object(db, "_engine", engine):
+            db._migrar_nome_chave_ingredientes()
+            db._migrar_nome_chave_ingredientes()
+
+        with engine.connect() as conn:
+            chaves = conn.execute(
+                text("SELECT id_ingrediente, nome_chave FROM ingredientes ORDER BY 1")
+            ).all()
+        indices = {i["name"]: i["unique"] for i in inspect(engine).get_indexes("ingredientes")}
+
+        assert chaves == [(1, "maca"), (2, "maca #2"), (3, "sal")]
+        assert indices["ix_ingredientes_nome_chave"]
+
+    def test_corrige_chaves_nulas_e_duplicado_continua_atualizavel(self, test_engine):
+        from sqlalchemy import text
+        from sqlmodel import Session
+        from src.core import db
+        from src.models.ingredientes import IngredienteTable
+
+        with test_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO ingredientes (id_ingrediente, nome_singular, nome_chave) "
+                "VALUES (1, 'Maçã', 'maca'), (2, 'maca', NULL)"
+            ))
+
+        with patch.object(db, "_engine", test_engine):
+            db._migrar_nome_chave_ingredientes()
+
+        with Session(test_engine) as session:
+            duplicado = session.get(IngredienteTable, 2)
+            duplicado.calorias = 52.0
+            session.add(duplicado)
+            session.commit()
+            session.refresh(duplicado)
+
+        assert duplicado.nome_chave == "maca #2"
+        assert duplicado.calorias == 52.0
+
+
+class TestMigracaoReceitasJson:
+    def test_indexa_ingredientes_de_receitas_antigas(self, test_engine):
+        from sqlalchemy import text
+        from sqlmodel import Session, select
+        from src.core import db
+        from src.models.receitas import ReceitaIngredienteTable, ReceitaTable
+
+        with test_engine.begin() as conn:
+            conn.execute(text("INSERT INTO produtos_cliente (nome_produto) VALUES ('Bolo')"))
+            conn.execute(text(
+                "INSERT INTO receitas (id_receita, id_produto, status, json_ingredientes, "
+                "created_at, updated_at) VALUES "
+                "(1, 1, 'done', '[{\"nome\": \"Farinha\"}, \"Ovo\"]', '2024-01-01', '2024-01-01')"
+            ))
+
+        with patch.object(db, "_engine", test_engine):
+            db._migrar_receitas_json()
+            db._migrar_receitas_json()
+
+        with Session(test_engine) as session:
+            nomes = session.exec(
+                select(ReceitaIngredienteTable.nome).order_by(ReceitaIngredienteTable.posicao)
+            ).all()
+            receita = session.get(ReceitaTable, 1)
+
+        assert nomes == ["Farinha", "Ovo"]
+        assert receita.json_ingredientes == [{"nome": "Farinha"}, "Ovo"]
+
+    def test_roda_so_em_banco_sem_receita_ingredientes(self, test_engine):
+        from src.core import db
+
+        with patch.object(db, "_engine", test_engine), \
+             patch.object(db, "_migrar_receitas_json") as migrar:
+            db.create_db_and_tables()
+        migrar.assert_not_called()
+
+        from src.models.receitas import ReceitaIngredienteTable
+        ReceitaIngredienteTable.__table__.drop(test_engine)
+
+        with patch.object(db, "_engine", test_engine), \
+             patch.object(db, "_migrar_receitas_json") as migrar:
+            db.create_db_and_tables()
+        migrar.assert_called_once()
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_chamadas_identicas_compartilham_resultado(self):
+        import asyncio
+        from src.core.single_flight import SingleFlight
+
+        sf = SingleFlight()
+        chamadas = 0
+
+        async def buscar():
+            nonlocal chamadas
+            chamadas += 1
+            numero = chamadas
+            await asyncio.sleep(0.01)
+            return {"ok": numero}
+
+        resultados = await asyncio.gather(*(sf.do("x", buscar) for _ in range(5)), sf.do("y", buscar))
+
+        assert chamadas == 2
+        assert resultados[:5] == [{"ok": 1}] * 5
+        assert sf.in_flight() == 0
+
+        # Terminada a chamada, a próxima vai de novo à origem
+        await sf.do("x", buscar)
+        assert chamadas == 3
+
+    @pytest.mark.asyncio
+    async def test_excecao_propagada_e_cancelamento(self):
+        import asyncio
+        from src.core.single_flight import SingleFlight
+
+        sf = SingleFlight()
+
+        async def falhar():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("timeout")
+
+        resultados = await asyncio.gather(sf.do("x", falhar), sf.do("x", falhar), return_exceptions=True)
+        assert [str(r) for r in resultados] == ["timeout", "timeout"]
+
+        cancelada = asyncio.Event()
+
+        async def lenta():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelada.set()
+                raise
+
+        primeiro = asyncio.create_task(sf.do("z", lenta))
+        segundo = asyncio.create_task(sf.do("z", lenta))
+        await asyncio.sleep(0)
+        primeiro.cancel()
+        await asyncio.sleep(0)
+        assert not cancelada.is_set()
+
+        segundo.cancel()
+        await asyncio.gather(primeiro, segundo, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelada.is_set()
+
+
+class TestInsercaoEmLote:
+    def test_ids_consecutivos_sem_returning(self):
+        from unittest.mock import MagicMock
+        from src.core.bulk import inserir_em_lotes
+        from src.models.produtos import ProdutoClienteTable
+
+        # Simula o MySQL: sem RETURNING, lastrowid é o id da primeira linha do INSERT
+        session = MagicMock()
+        session.get_bind.return_value.dialect.insert_returning = False
+        session.get_bind.return_value.dialect.name = "mysql"
+        session.execute.side_effect = [
+            MagicMock(**{"scalar_one.return_value": 1}),
+            MagicMock(lastrowid=10),
+            MagicMock(lastrowid=20),
+        ]
+
+        ids = inserir_em_lotes(
+            session,
+            ProdutoClienteTable,
+            ProdutoClienteTable.id_produto,
+            [{"nome_produto": str(i)} for i in range(5)],
+            lote=3,
+        )
+
+        assert ids == [10, 11, 12, 20, 21]
+        assert session.execute.call_count == 3
+
+    def test_ids_respeitam_auto_increment_increment(self):
+        from unittest.mock import MagicMock
+        from src.core.bulk import inserir_em_lotes
+        from src.models.produtos import ProdutoClienteTable
+
+        session = MagicMock()
+        session.get_bind.return_value.dialect.insert_returning = False
+        session.get_bind.return_value.dialect.name = "mysql"
+        session.execute.side_effect = [
+            MagicMock(**{"scalar_one.return_value": 2}),
+            MagicMock(lastrowid=11),
+        ]
+
+        ids = inserir_em_lotes(
+            session,
+            ProdutoClienteTable,
+            ProdutoClienteTable.id_produto,
+            [{"nome_produto": str(i)} for i in range(3)],
+        )
+
+        assert ids == [11, 13, 15]
@@ -46,9 +46,9 @@ class TestIngredientesAPIService:
             ]
         }
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("src.service.http_base.get_http_client") as mock_client:
             mock_instance = AsyncMock()
-            mock_client.return_value.__aenter__.return_value = mock_instance
+            mock_client.return_value = mock_instance
             mock_instance.get.return_value = MagicMock(
                 status_code=200, json=lambda: mock_response
             )
@@ -82,9 +82,9 @@ class TestIngredientesAPIService:
             ]
         }
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("src.service.http_base.get_http_client") as mock_client:
             mock_instance = AsyncMock()
-            mock_client.return_value.__aenter__.return_value = mock_instance
+            mock_client.return_value = mock_instance
             mock_instance.get.return_value = MagicMock(
                 status_code=200, json=lambda: mock_response
             )
@@ -105,9 +105,9 @@ class TestIngredientesAPIService:
             ]
         }
 
-        with patch("httpx.AsyncClient") as mock_client:
+        with patch("src.service.http_base.get_http_client") as mock_client:
             mock_instance = AsyncMock()
-            mock_client.return_value.__aenter__.return_value = mock_instance
+            mock_client.return_value = mock_instance
             mock_instance.get.return_value = MagicMock(
                 status_code=200, json=lambda: mock_response
             )
@@ -119,6 +119,17 @@ class TestIngredientesAPIService:
             assert result[1].name == "Salmon"
             assert "themealdb.com/images/ingredients/Chicken.png" in result[0].image_url
 
+    @pytest.mark.asyncio
+    async def test_usa_cliente_http_injetado(self):
+        mock_http = AsyncMock()
+        mock_http.get.return_value = MagicMock(status_code=200, json=lambda: {"meals": []})
+        service = IngredientesAPIService(http_client=mock_http)
+
+        result = await service.list_themealdb_ingredients()
+
+        assert result == []
+        mock_http.get.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_enrich_ingredient(self, service):
         with patch.object(service, "search_usda", new_callable=AsyncMock) as mock_usda, \
@@ -154,6 +165,130 @@ class TestIngredientesAPIService:
             assert result["proteinas"] == 22
             assert result["imagem_url"] == "https://example.com/chicken.jpg"
 
+    @pytest.mark.asyncio
+    async def test_enrich_ingredient_fallback_imagem_themealdb(self, service):
+        with patch.object(service, "search_usda", new_callable=AsyncMock) as mock_usda, \
+             patch.object(service, "search_openfoodfacts", new_callable=AsyncMock) as mock_off, \
+             patch.object(service, "search_themealdb_ingredient", new_callable=AsyncMock) as mock_mealdb:
+
+            mock_usda.return_value = []
+            mock_off.return_value = []
+            mock_mealdb.return_value = TheMealDBIngredient(
+                id="1",
+                name="Chicken",
+                image_url="https://www.themealdb.com/images/ingredients/Chicken.png",
+            )
+
+            result = await service.enrich_ingredient("chicken")
+
+            assert result["imagem_url"] == "https://www.themealdb.com/images/ingredients/Chicken.png"
+            assert result["usda_fdc_id"] is None
+
+    @pytest.mark.asyncio
+    async def test_enrich_ingredient_consultas_em_paralelo(self, service):
+        import asyncio
+
+        iniciadas = []
+        liberar = asyncio.Event()
+
+        async def fake_usda(nome, page_size=10):
+            iniciadas.append("usda")
+            await liberar.wait()
+            return []
+
+        async def fake_off(nome, page_size=10):
+            iniciadas.append("off")
+            liberar.set()
+            return [OpenFoodFactsProduct(code="1", image_url="https://example.com/off.jpg")]
+
+        mealdb_cancelado = asyncio.Event()
+
+        async def fake_mealdb(nome):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                mealdb_cancelado.set()
+                raise
+
+        with patch.object(service, "search_usda", side_effect=fake_usda), \
+             patch.object(service, "search_openfoodfacts", side_effect=fake_off), \
+             patch.object(service, "search_themealdb_ingredient", side_effect=fake_mealdb):
+
+            result = await asyncio.wait_for(service.enrich_ingredient("chicken"), timeout=2)
+            await asyncio.sleep(0)
+
+            assert sorted(iniciadas) == ["off", "usda"]
+            assert result["imagem_url"] == "https://example.com/off.jpg"
+            assert mealdb_cancelado.is_set()
+
+    @pytest.mark.asyncio
+    async def test_enrich_ingredient_falha_de_uma_fonte_cancela_a_outra(self, service):
+        import asyncio
+        from src.service.rate_limiter import UpstreamError
+
+        off_cancelado = asyncio.Event()
+
+        async def fake_usda(nome, page_size=10):
+            await asyncio.sleep(0)
+            raise UpstreamError("api.nal.usda.gov respondeu 503", "api.nal.usda.gov", 503)
+
+        async def fake_off(nome, page_size=10):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                off_cancelado.set()
+                raise
+
+        async def fake_mealdb(nome):
+            return None
+
+        with patch.object(service, "search_usda", side_effect=fake_usda), \
+             patch.object(service, "search_openfoodfacts", side_effect=fake_off), \
+             patch.object(service, "search_themealdb_ingredient", side_effect=fake_mealdb):
+
+            with pytest.raises(UpstreamError):
+                await asyncio.wait_for(service.enrich_ingredient("chicken"), timeout=2)
+
+            assert off_cancelado.is_set()
+
+    @pytest.mark.asyncio
+    async def test_buscas_simultaneas_coalescidas(self):
+        import asyncio
+        import httpx
+        from src.core.single_flight import SingleFlight
+
+        async def fake_get(url, **kwargs):
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"meals": [{"idIngredient": "1", "strIngredient": "Chicken"}]})
+
+        mock_instance = MagicMock()
+        mock_instance.get = AsyncMock(side_effect=fake_get)
+        service = IngredientesAPIService(http_client=mock_instance, single_flight=SingleFlight())
+
+        resultados = await asyncio.gather(*(service.search_themealdb_ingredient("chicken") for _ in range(4)))
+
+        assert mock_instance.get.await_count == 1
+        assert all(r.name == "Chicken" for r in resultados)
+
+    @pytest.mark.asyncio
+    async def test_search_usda_usa_cache_persistente(self, tmp_path):
+        import httpx
+        from src.core.http_cache import HTTPResponseCache
+
+        cache = HTTPResponseCache(str(tmp_path / "cache.db"), ttls={"usda_search": 60}, negative_ttl=10)
+        mock_instance = MagicMock()
+        mock_instance.get = AsyncMock(
+            return_value=httpx.Response(200, json={"foods": [{"fdcId": 1, "description": "Rice"}]})
+        )
+        service = IngredientesAPIService(usda_api_key="test_key", http_client=mock_instance, cache=cache)
+
+        primeiro = await service.search_usda("rice")
+        segundo = await service.search_usda("rice")
+
+        assert primeiro == segundo
+        assert segundo[0].description == "Rice"
+        assert mock_instance.get.await_count == 1
+
 
 class TestUSDAFood:
     def test_usda_food_model(self):
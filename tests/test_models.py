@@ -60,6 +60,20 @@ class TestIngredienteModels:
         assert ingrediente.nome_singular == "Ovo"
         assert ingrediente.nome_plural == "Ovos"
 
+    def test_ingrediente_nome_chave_unico(self, test_session):
+        from sqlalchemy.exc import IntegrityError
+
+        ingrediente = IngredienteTable(nome_singular="  Maçã Verde ")
+        test_session.add(ingrediente)
+        test_session.commit()
+        test_session.refresh(ingrediente)
+
+        assert ingrediente.nome_chave == "maca verde"
+
+        test_session.add(IngredienteTable(nome_singular="MACA  verde"))
+        with pytest.raises(IntegrityError):
+            test_session.commit()
+
     def test_ingrediente_create_schema(self):
         payload = IngredienteCreate(
             nome_singular="Açúcar",
@@ -98,6 +112,24 @@ class TestReceitaModels:
         assert receita.status == "pending"
         assert receita.id_produto == produto.id_produto
 
+    def test_receita_json_guarda_estrutura(self, test_session):
+        produto = ProdutoClienteTable(nome_produto="Teste")
+        test_session.add(produto)
+        test_session.commit()
+
+        receita = ReceitaTable(
+            id_produto=produto.id_produto,
+            json_ingredientes=[{"nome": "Leite", "quantidade": "1", "unidade": "lata"}],
+            json_modo_preparo=["Passo 1"],
+        )
+        test_session.add(receita)
+        test_session.commit()
+        test_session.expire_all()
+
+        salva = test_session.get(ReceitaTable, receita.id_receita)
+        assert salva.json_ingredientes == [{"nome": "Leite", "quantidade": "1", "unidade": "lata"}]
+        assert salva.json_modo_preparo == ["Passo 1"]
+
     def test_receita_create_schema(self):
         payload = ReceitaCreate(
             id_produto=1,
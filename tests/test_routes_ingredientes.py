@@ -1,6 +1,3 @@
-import pytest
-
-
 class TestIngredientesRoutes:
     def test_criar_ingrediente(self, client):
         response = client.post(
@@ -18,6 +15,13 @@ class TestIngredientesRoutes:
         assert data["nome_singular"] == "Ovo"
         assert data["nome_plural"] == "Ovos"
 
+    def test_criar_ingrediente_duplicado(self, client):
+        assert client.post("/ingredientes", json={"nome_singular": "Açúcar"}).status_code == 201
+
+        response = client.post("/ingredientes", json={"nome_singular": "acucar"})
+
+        assert response.status_code == 409
+
     def test_listar_ingredientes_vazio(self, client):
         response = client.get("/ingredientes")
         assert response.status_code == 200
@@ -72,3 +76,74 @@ class TestIngredientesRoutes:
         data = response.json()
         assert data["nome_singular"] == "Leite"
         assert data["nome_plural"] is None
+
+    def test_listar_ingredientes_por_prefixo_normalizado(self, client):
+        for nome, tipo in [("Maçã", "fruta"), ("Macarrão", "massa"), ("Manga", "fruta"), ("Sal", None)]:
+            client.post("/ingredientes", json={"nome_singular": nome, "tipo_ingrediente": tipo})
+
+        response = client.get("/ingredientes", params={"prefixo": "MAC", "fields": "nome_singular"})
+        assert response.json() == [{"nome_singular": "Maçã"}, {"nome_singular": "Macarrão"}]
+
+        response = client.get("/ingredientes", params={"tipo": "fruta", "limit": 1, "fields": "id,tipo"})
+        assert response.json()[0]["tipo"] == "fruta"
+        cursor = response.headers["x-next-cursor"]
+
+        response = client.get("/ingredientes", params={"tipo": "fruta", "limit": 1, "after": cursor})
+        assert [i["nome_singular"] for i in response.json()] == ["Manga"]
+        assert "x-next-cursor" not in response.headers
+
+    def test_listar_ingredientes_prefixo_escapa_curinga(self, client):
+        client.post("/ingredientes", json={"nome_singular": "Sal"})
+
+        assert client.get("/ingredientes", params={"prefixo": "%"}).json() == []
+
+    def test_exportar_ingredientes_em_lotes(self, client, test_session, test_engine):
+        import json
+        from sqlalchemy import event
+        from src.core.listagem import exportar_linhas
+        from src.models.ingredientes import IngredienteTable
+        from src.routes.ingredientes import CAMPOS
+
+        for i in range(5):
+            client.post("/ingredientes", json={"nome_singular": f"Ingrediente {i}", "calorias": i})
+
+        consultas = []
+
+        def registrar(conn, cursor, sql, *args):
+            consultas.append(sql)
+
+        event.listen(test_engine, "before_cursor_execute", registrar)
+        try:
+            blocos = list(exportar_linhas(
+                test_session, IngredienteTable.id_ingrediente, {"nome": CAMPOS["nome_singular"]}, [], "ndjson", lote=2
+            ))
+        finally:
+            event.remove(test_engine, "before_cursor_execute", registrar)
+        assert len(blocos) == 3
+        assert len(consultas) == 3
+        assert all("LIMIT" in sql for sql in consultas)
+
+        response = client.get("/ingredientes/export", params={"prefixo": "ingrediente 4"})
+        assert [json.loads(l)["calorias"] for l in response.text.splitlines()] == [4.0]
+
+    def test_criar_ingredientes_em_lote(self, client):
+        response = client.post(
+            "/ingredientes/bulk",
+            json=[{"nome_singular": "Maçã", "calorias": 52}, {"nome_singular": "Sal"}],
+        )
+
+        assert response.status_code == 201
+        ids = response.json()["ids"]
+        assert client.get(f"/ingredientes/{ids[0]}").json()["nome_singular"] == "Maçã"
+        # A chave normalizada é preenchida mesmo sem os eventos do ORM
+        assert client.get("/ingredientes", params={"prefixo": "maca"}).json()[0]["id"] == ids[0]
+
+    def test_criar_ingredientes_em_lote_tudo_ou_nada(self, client):
+        client.post("/ingredientes", json={"nome_singular": "Sal"})
+
+        response = client.post(
+            "/ingredientes/bulk", json=[{"nome_singular": "Pimenta"}, {"nome_singular": "SAL"}]
+        )
+
+        assert response.status_code == 409
+        assert [i["nome_singular"] for i in client.get("/ingredientes").json()] == ["Sal"]
@@ -1,6 +1,3 @@
-import pytest
-
-
 class TestProdutosRoutes:
     def test_criar_produto(self, client):
         response = client.post(
@@ -71,3 +68,98 @@ class TestProdutosRoutes:
         data = response.json()
         assert data["nome"] == "Produto Simples"
         assert data["tipo"] is None
+
+    def test_listar_produtos_paginado_por_cursor(self, client):
+        for i in range(5):
+            client.post("/produtos", json={"nome_produto": f"Produto {i}"})
+
+        response = client.get("/produtos", params={"limit": 2})
+        assert [p["nome"] for p in response.json()] == ["Produto 0", "Produto 1"]
+        cursor = response.headers["x-next-cursor"]
+        assert f"after={cursor}" in response.headers["link"]
+
+        response = client.get("/produtos", params={"limit": 2, "after": cursor})
+        assert [p["nome"] for p in response.json()] == ["Produto 2", "Produto 3"]
+
+        response = client.get("/produtos", params={"limit": 2, "after": response.headers["x-next-cursor"]})
+        assert [p["nome"] for p in response.json()] == ["Produto 4"]
+        assert "x-next-cursor" not in response.headers
+
+    def test_listar_produtos_filtros_e_campos(self, client):
+        client.post("/produtos", json={"nome_produto": "Leite Condensado", "tipo_produto": "Laticínio"})
+        client.post("/produtos", json={"nome_produto": "Leite em Pó", "tipo_produto": "Pó"})
+        client.post("/produtos", json={"nome_produto": "Creme de Leite", "tipo_produto": "Laticínio"})
+
+        response = client.get("/produtos", params={"prefixo": "Leite", "fields": "id,nome"})
+        data = response.json()
+        assert [p["nome"] for p in data] == ["Leite Condensado", "Leite em Pó"]
+        assert set(data[0]) == {"id", "nome"}
+
+        response = client.get("/produtos", params={"tipo": "Laticínio", "fields": "nome"})
+        assert response.json() == [{"nome": "Leite Condensado"}, {"nome": "Creme de Leite"}]
+
+    def test_listar_produtos_campo_invalido(self, client):
+        response = client.get("/produtos", params={"fields": "id,senha"})
+        assert response.status_code == 422
+        assert "senha" in response.json()["detail"]
+
+    def test_listar_produtos_cursor_visivel_via_cors(self, client):
+        client.post("/produtos", json={"nome_produto": "A"})
+        client.post("/produtos", json={"nome_produto": "B"})
+
+        response = client.get(
+            "/produtos", params={"limit": 1}, headers={"Origin": "http://frontend.local"}
+        )
+
+        expostos = response.headers["access-control-expose-headers"]
+        assert "X-Next-Cursor" in expostos
+        assert "Link" in expostos
+
+    def test_listar_produtos_openapi(self, client):
+        operacao = client.get("/openapi.json").json()["paths"]["/produtos"]["get"]
+        schema = operacao["responses"]["200"]["content"]["application/json"]["schema"]
+
+        assert schema["type"] == "array"
+        assert schema["items"]["$ref"].endswith("/ProdutoOut")
+
+    def test_exportar_produtos_ndjson(self, client):
+        import json
+
+        client.post("/produtos", json={"nome_produto": "Leite", "tipo_produto": "Laticínio"})
+        client.post("/produtos", json={"nome_produto": "Arroz"})
+
+        response = client.get("/produtos/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        linhas = [json.loads(l) for l in response.text.splitlines()]
+        assert [l["nome"] for l in linhas] == ["Leite", "Arroz"]
+        assert linhas[0]["tipo"] == "Laticínio"
+
+    def test_exportar_produtos_csv_com_campos(self, client):
+        client.post("/produtos", json={"nome_produto": "Leite, integral", "tipo_produto": "Laticínio"})
+
+        response = client.get("/produtos/export", params={"formato": "csv", "fields": "nome,tipo"})
+
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="produtos.csv"' in response.headers["content-disposition"]
+        assert response.text.splitlines() == ["nome,tipo", '"Leite, integral",Laticínio']
+
+    def test_criar_produtos_em_lote(self, client):
+        payload = [{"nome_produto": f"Produto {i}", "tipo_produto": "Lote"} for i in range(1200)]
+
+        response = client.post("/produtos/bulk", json=payload)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["total"] == 1200
+        assert len(set(data["ids"])) == 1200
+        primeiro = client.get(f"/produtos/{data['ids'][0]}").json()
+        ultimo = client.get(f"/produtos/{data['ids'][-1]}").json()
+        assert (primeiro["nome"], ultimo["nome"]) == ("Produto 0", "Produto 1199")
+
+    def test_criar_produtos_em_lote_valida_a_lista(self, client):
+        assert client.post("/produtos/bulk", json=[]).status_code == 422
+        response = client.post("/produtos/bulk", json=[{"nome_produto": "Ok"}, {"tipo_produto": "sem nome"}])
+        assert response.status_code == 422
+        assert client.get("/produtos").json() == []
@@ -52,6 +52,30 @@ class TestRAGRoutes:
         assert "results" in data
         assert isinstance(data["results"], list)
 
+    def test_search_receitas_com_filtros(self, client, mock_rag_service):
+        response = client.post(
+            "/rag/receitas/search",
+            json={
+                "query": "bolo",
+                "num_documents": 3,
+                "filters": {"source_file": "livro.pdf", "page": 12},
+            },
+        )
+        assert response.status_code == 200
+        mock_rag_service.search_receitas.assert_called_once_with(
+            query="bolo",
+            num_documents=3,
+            filters={"source_file": "livro.pdf", "page": 12},
+        )
+
+    def test_search_receitas_sem_filtros(self, client, mock_rag_service):
+        response = client.post(
+            "/rag/receitas/search",
+            json={"query": "bolo", "filters": {}},
+        )
+        assert response.status_code == 200
+        assert mock_rag_service.search_receitas.call_args.kwargs["filters"] is None
+
     def test_add_fotografia_content(self, client, mock_rag_service):
         response = client.post(
             "/rag/fotografia/content",
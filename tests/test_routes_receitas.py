@@ -1,5 +1,4 @@
-import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
 
 class TestReceitasRoutes:
@@ -81,3 +80,81 @@ class TestReceitasRoutes:
             json={"descricao_cliente": "Sem produto"},
         )
         assert response.status_code == 422
+
+
+class TestReceitasIngredientes:
+    def _receita_com_ingredientes(self, test_session, ingredientes):
+        from src.models.produtos import ProdutoClienteTable
+        from src.models.receitas import ReceitaTable
+        from src.service.receitas_service import salvar_conteudo_receita
+
+        produto = ProdutoClienteTable(nome_produto="Leite Condensado")
+        test_session.add(produto)
+        test_session.commit()
+        receita = ReceitaTable(id_produto=produto.id_produto, status="done")
+        test_session.add(receita)
+        test_session.commit()
+        return salvar_conteudo_receita(test_session, receita, ingredientes, ["Misture", "Asse"])
+
+    def test_obter_receita_devolve_estrutura(self, client, test_session):
+        receita = self._receita_com_ingredientes(
+            test_session, [{"nome": "Leite", "quantidade": 1, "unidade": "lata"}]
+        )
+
+        data = client.get(f"/receitas/{receita.id_receita}").json()
+
+        assert data["json_ingredientes"] == [{"nome": "Leite", "quantidade": 1, "unidade": "lata"}]
+        assert data["json_modo_preparo"] == ["Misture", "Asse"]
+
+    def test_ingredientes_ligados_ao_cadastro(self, test_session):
+        from sqlmodel import select
+        from src.models.ingredientes import IngredienteTable
+        from src.models.receitas import ReceitaIngredienteTable
+
+        acucar = IngredienteTable(nome_singular="Açúcar", nome_plural="Açúcares")
+        test_session.add(acucar)
+        test_session.commit()
+
+        receita = self._receita_com_ingredientes(
+            test_session,
+            [{"nome": "acucar", "quantidade": 2, "unidade": "xícaras"}, "Canela", {"nome": ""}],
+        )
+        linhas = test_session.exec(
+            select(ReceitaIngredienteTable)
+            .where(ReceitaIngredienteTable.id_receita == receita.id_receita)
+            .order_by(ReceitaIngredienteTable.posicao)
+        ).all()
+
+        assert [(l.nome, l.id_ingrediente, l.quantidade) for l in linhas] == [
+            ("acucar", acucar.id_ingrediente, "2"),
+            ("Canela", None, None),
+        ]
+
+    def test_receitas_por_ingrediente(self, client, test_session):
+        from src.models.ingredientes import IngredienteTable
+
+        leite = IngredienteTable(nome_singular="Leite", nome_plural="Leites")
+        test_session.add(leite)
+        test_session.commit()
+        com_leite = self._receita_com_ingredientes(test_session, [{"nome": "Leite"}, "Ovo"])
+        self._receita_com_ingredientes(test_session, ["Ovo"])
+
+        por_id = client.get(
+            "/receitas/por-ingrediente", params={"ingrediente_id": leite.id_ingrediente}
+        ).json()
+        por_nome = client.get("/receitas/por-ingrediente", params={"nome": "OVO"}).json()
+
+        assert [r["id"] for r in por_id] == [com_leite.id_receita]
+        assert len(por_nome) == 2
+
+    def test_receitas_por_ingrediente_cadastrado_depois(self, client, test_session):
+        receita = self._receita_com_ingredientes(test_session, ["Canela"])
+
+        canela = client.post("/ingredientes/bulk", json=[{"nome_singular": "Canela"}]).json()["ids"][0]
+        response = client.get("/receitas/por-ingrediente", params={"ingrediente_id": canela})
+
+        assert [r["id"] for r in response.json()] == [receita.id_receita]
+
+    def test_receitas_por_ingrediente_sem_filtro(self, client):
+        response = client.get("/receitas/por-ingrediente")
+        assert response.status_code == 422
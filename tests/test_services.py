@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 
 from src.models.produtos import ProdutoClienteTable
-from src.models.receitas import ReceitaTable, ReceitaCreate
+from src.models.receitas import ReceitaCreate
 
 
 class TestReceitasService:
@@ -136,3 +136,930 @@ class TestRAGService:
             kb = service.get_fotografia_knowledge()
 
             assert kb == mock_kb
+
+    def test_busca_do_knowledge_passa_pelo_reranker(self):
+        from types import SimpleNamespace
+        from src.core.knowledge import RAGQdrant, create_vector_db
+        from src.core.settings import Settings
+
+        conteudos = ["Arroz branco soltinho", "Frango grelhado com ervas", "Bolo de leite condensado Moça"]
+        pontos = [
+            SimpleNamespace(payload={"name": c, "meta_data": {}, "content": c}, vector=None)
+            for c in conteudos
+        ]
+        settings = Settings(rag_reranker="lexical", rag_rerank_candidates=20)
+
+        with patch.object(RAGQdrant, "_run_vector_search_sync", return_value=pontos) as busca:
+            vector_db = create_vector_db(settings, "receitas")
+            results = vector_db.search("leite condensado", limit=1)
+
+        assert busca.call_args.args[1] == 20
+        assert len(results) == 1
+        assert "Moça" in results[0].content
+
+    def test_search_receitas_sem_reranking(self, mock_knowledge, mock_qdrant):
+        with patch("src.service.rag_service.create_receitas_knowledge") as mock_rec, \
+             patch("src.service.rag_service.create_fotografia_knowledge") as mock_foto:
+            mock_kb = MagicMock()
+            mock_kb.search.return_value = []
+            mock_rec.return_value = mock_kb
+            mock_foto.return_value = MagicMock()
+
+            from src.service.rag_service import RAGService
+            from src.core.settings import Settings
+
+            service = RAGService(Settings(rag_reranker="none"))
+            service.search_receitas("bolo", num_documents=3, filters={"tipo": "receitas"})
+
+            mock_kb.search.assert_called_once_with(
+                query="bolo", max_results=3, filters={"tipo": "receitas"}
+            )
+
+
+class TestRerankers:
+    def test_lexical_reranker_mantem_ordem_sem_termos(self):
+        from agno.knowledge.document import Document
+        from src.core.reranker import LexicalReranker
+
+        docs = [Document(content="primeiro"), Document(content="segundo")]
+        result = LexicalReranker().rerank("chocolate", docs)
+
+        assert [d.content for d in result] == ["primeiro", "segundo"]
+
+    def test_lexical_reranker_vazio(self):
+        from src.core.reranker import LexicalReranker
+
+        assert LexicalReranker().rerank("bolo", []) == []
+
+    def test_create_reranker(self):
+        from src.core.reranker import create_reranker, LexicalReranker, CrossEncoderReranker
+        from src.core.settings import Settings
+
+        assert create_reranker(Settings(rag_reranker="none")) is None
+        assert isinstance(create_reranker(Settings(rag_reranker="lexical")), LexicalReranker)
+        assert isinstance(create_reranker(Settings(rag_reranker="cross-encoder")), CrossEncoderReranker)
+        with pytest.raises(ValueError):
+            create_reranker(Settings(rag_reranker="cohere"))
+
+
+class TestEnriquecimentoService:
+    @pytest.fixture
+    def service(self):
+        from src.core.settings import Settings
+        from src.service.enriquecimento_service import EnriquecimentoService
+
+        settings = Settings(enriquecimento_workers=2, enriquecimento_batch_size=2)
+        return EnriquecimentoService(settings)
+
+    @pytest.mark.asyncio
+    async def test_enriquecer_todos_ingredientes(self, service, test_session, async_session):
+        from unittest.mock import AsyncMock
+        from src.models.ingredientes import IngredienteTable
+
+        for nome in ["Milk", "Egg", "Sugar"]:
+            test_session.add(IngredienteTable(nome_singular=nome))
+        test_session.commit()
+
+        async def fake_enrich(nome):
+            if nome == "Egg":
+                raise RuntimeError("timeout")
+            return {"calorias": 100.0, "usda_fdc_id": 1, "imagem_url": None}
+
+        service.ingredientes_api.enrich_ingredient = AsyncMock(side_effect=fake_enrich)
+
+        resultado = await service.enriquecer_todos_ingredientes(async_session)
+
+        assert resultado["total"] == 3
+        assert resultado["enriquecidos"] == 2
+        assert resultado["erros"] == [{"ingrediente": "Egg", "erro": "timeout"}]
+
+        from sqlmodel import select
+        calorias = {
+            i.nome_singular: i.calorias
+            for i in test_session.exec(select(IngredienteTable)).all()
+        }
+        assert calorias == {"Milk": 100.0, "Egg": None, "Sugar": 100.0}
+
+    @pytest.mark.asyncio
+    async def test_enriquecer_ingrediente_por_nome_com_imagem(self, service, async_session):
+        from unittest.mock import AsyncMock
+
+        service.ingredientes_api.enrich_ingredient = AsyncMock(
+            return_value={"calorias": 42.0, "imagem_url": "https://example.com/milk.png"}
+        )
+        service.image_downloader.download_ingrediente_image = AsyncMock(
+            return_value="media/ingredientes/ing_1_milk.png"
+        )
+
+        ingrediente = await service.enriquecer_ingrediente_por_nome(async_session, "Milk")
+
+        assert ingrediente.calorias == 42.0
+        assert ingrediente.imagem_ingrediente == "media/ingredientes/ing_1_milk.png"
+
+
+    @pytest.mark.asyncio
+    async def test_importar_ingredientes_em_lote(self, service, test_session, async_session):
+        from unittest.mock import AsyncMock
+        from sqlmodel import select
+        from src.models.ingredientes import IngredienteTable
+        from src.service.ingredientes_api import TheMealDBIngredient
+
+        test_session.add(IngredienteTable(nome_singular="Milk"))
+        test_session.commit()
+
+        service.ingredientes_api.list_themealdb_ingredients = AsyncMock(return_value=[
+            TheMealDBIngredient(id="1", name="Milk", image_url="https://example.com/Milk.png"),
+            TheMealDBIngredient(id="2", name="Egg", description="Ovo", image_url="https://example.com/Egg.png"),
+            TheMealDBIngredient(id="3", name="Salt"),
+            TheMealDBIngredient(id="4", name="Egg", image_url="https://example.com/Egg.png"),
+        ])
+
+        from src.service.image_downloader import ResultadoDownload
+
+        async def fake_download_many(items, concurrency):
+            return [
+                ResultadoDownload(url=url, path=f"media/{subdir}/{filename}.png")
+                for url, subdir, filename in items
+            ]
+
+        service.image_downloader.download_many = AsyncMock(side_effect=fake_download_many)
+
+        criados = await service.importar_ingredientes_themealdb(async_session)
+
+        assert [i.nome_singular for i in criados] == ["Egg", "Salt"]
+        egg = criados[0]
+        assert egg.descricao == "Ovo"
+        assert egg.imagem_ingrediente == f"media/ingredientes/ing_{egg.id_ingrediente}_egg.png"
+        assert criados[1].imagem_ingrediente is None
+        assert service.image_downloader.download_many.await_count == 1
+        items = service.image_downloader.download_many.await_args.args[0]
+        assert [url for url, _, _ in items] == ["https://example.com/Egg.png"]
+        assert len(test_session.exec(select(IngredienteTable)).all()) == 3
+
+        assert await service.importar_ingredientes_themealdb(async_session) == []
+
+    @pytest.mark.asyncio
+    async def test_importar_ingredientes_pula_nome_inserido_em_paralelo(
+        self, service, test_session, async_session
+    ):
+        from unittest.mock import AsyncMock
+        from sqlmodel import select
+        from src.models.ingredientes import IngredienteTable
+        from src.service.ingredientes_api import TheMealDBIngredient
+
+        service.ingredientes_api.list_themealdb_ingredients = AsyncMock(return_value=[
+            TheMealDBIngredient(id="1", name="Egg"),
+            TheMealDBIngredient(id="2", name="Salt"),
+        ])
+        service.image_downloader.download_many = AsyncMock(return_value=[])
+        ler = async_session.exec
+
+        async def ler_e_inserir_concorrente(stmt, *args, **kwargs):
+            # Outra importação grava "egg" entre a leitura dos nomes e o INSERT
+            async_session.exec = ler
+            resultado = await ler(stmt, *args, **kwargs)
+            test_session.add(IngredienteTable(nome_singular="EGG"))
+            test_session.commit()
+            return resultado
+
+        async_session.exec = ler_e_inserir_concorrente
+
+        await service.importar_ingredientes_themealdb(async_session)
+
+        nomes = sorted(i.nome_singular for i in test_session.exec(select(IngredienteTable)).all())
+        assert nomes == ["EGG", "Salt"]
+
+    def test_rota_status_com_sessao_assincrona(self, client):
+        client.post("/ingredientes", json={"nome_singular": "Milk", "calorias": 42.0})
+        client.post("/ingredientes", json={"nome_singular": "Egg"})
+
+        response = client.get("/enriquecimento/status")
+
+        assert response.status_code == 200
+        assert response.json()["ingredientes"] == {
+            "total": 2,
+            "com_usda": 0,
+            "com_openfoodfacts": 0,
+            "com_dados_nutricionais": 1,
+        }
+
+    @pytest.mark.asyncio
+    async def test_popular_rag_pipeline_em_lotes(self, service):
+        import asyncio
+        from unittest.mock import AsyncMock
+        from src.service.themealdb_service import MealDBRecipe
+
+        service.settings.rag_pipeline_fetch_workers = 3
+        service.settings.rag_pipeline_batch_size = 4
+        service.settings.rag_pipeline_embed_workers = 1
+
+        async def fake_filter(categoria):
+            return [MealDBRecipe(id=f"{categoria}{i}", name=f"{categoria} {i}") for i in range(5)]
+
+        em_voo = 0
+        pico = 0
+
+        async def fake_lookup(meal_id):
+            nonlocal em_voo, pico
+            em_voo += 1
+            pico = max(pico, em_voo)
+            await asyncio.sleep(0.01)
+            em_voo -= 1
+            if meal_id == "B3":
+                raise RuntimeError("timeout")
+            return MealDBRecipe(id=meal_id, name=f"Receita {meal_id}")
+
+        lotes = []
+
+        async def fake_add(itens):
+            lotes.append(len(itens))
+            return [None] * len(itens)
+
+        service.themealdb.filter_by_category = AsyncMock(side_effect=fake_filter)
+        service.themealdb.get_recipe_by_id = AsyncMock(side_effect=fake_lookup)
+        service.rag_service.add_receitas_content_async = AsyncMock(side_effect=fake_add)
+
+        resultado = await service.popular_rag_com_receitas_themealdb(
+            categorias=["A", "B"], limite_por_categoria=4
+        )
+
+        assert resultado["categorias_processadas"] == 2
+        assert resultado["receitas_adicionadas"] == 7
+        assert resultado["erros"] == [{"receita": "B 3", "erro": "timeout"}]
+        assert pico == 3
+        assert sum(lotes) == 7
+        assert max(lotes) <= 4
+
+    def _pipeline_com_falha(self, service):
+        from unittest.mock import AsyncMock
+        from src.service.themealdb_service import MealDBRecipe
+
+        service.settings.rag_pipeline_queue_size = 1
+        service.settings.rag_pipeline_batch_size = 2
+        service.themealdb.get_recipe_by_id = AsyncMock(
+            side_effect=lambda meal_id: MealDBRecipe(id=meal_id, name=f"Receita {meal_id}")
+        )
+        service.rag_service.add_receitas_content_async = AsyncMock(side_effect=lambda itens: [None] * len(itens))
+        return [MealDBRecipe(id=str(i), name=f"Receita {i}") for i in range(20)]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_falha_na_etapa_do_meio_cancela_as_demais(self, service):
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        class Abortado(BaseException):
+            """Escapa do tratamento por receita, que só pega Exception."""
+
+        resumos = self._pipeline_com_falha(service)
+        service._preparar_receita = AsyncMock(side_effect=Abortado())
+        antes = asyncio.all_tasks()
+
+        with pytest.raises(Abortado):
+            await asyncio.wait_for(service._pipeline_receitas(resumos), timeout=5)
+
+        assert asyncio.all_tasks() <= antes
+        service.rag_service.add_receitas_content_async.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_pipeline_falha_na_indexacao_cancela_as_demais(self, service):
+        import asyncio
+
+        resumos = self._pipeline_com_falha(service)
+        service.rag_service.add_receitas_content_async.side_effect = RuntimeError("qdrant fora do ar")
+        antes = asyncio.all_tasks()
+
+        with pytest.raises(RuntimeError, match="qdrant fora do ar"):
+            await asyncio.wait_for(service._pipeline_receitas(resumos), timeout=5)
+
+        assert asyncio.all_tasks() <= antes
+        assert service.themealdb.get_recipe_by_id.await_count < len(resumos)
+
+
+class TestEnriquecimentoJobs:
+    @pytest.fixture
+    def jobs(self, async_engine, test_session):
+        from unittest.mock import AsyncMock
+        from sqlmodel.ext.asyncio.session import AsyncSession
+        from src.core.settings import Settings
+        from src.models.ingredientes import IngredienteTable
+        from src.service.enriquecimento_jobs import EnriquecimentoJobs
+        from src.service.enriquecimento_service import EnriquecimentoService
+
+        for nome in ["Milk", "Egg", "Sugar", "Salt"]:
+            test_session.add(IngredienteTable(nome_singular=nome))
+        test_session.commit()
+
+        service = EnriquecimentoService(
+            Settings(enriquecimento_workers=1, enriquecimento_batch_size=1)
+        )
+
+        async def fake_enrich(nome):
+            if nome == "Egg":
+                raise RuntimeError("timeout")
+            return {"calorias": 10.0}
+
+        service.ingredientes_api.enrich_ingredient = AsyncMock(side_effect=fake_enrich)
+        return EnriquecimentoJobs(
+            service, session_factory=lambda: AsyncSession(async_engine, expire_on_commit=False)
+        )
+
+    async def _rodar(self, jobs, job_id):
+        jobs.iniciar(job_id)
+        await jobs._tasks[job_id]
+
+    @pytest.mark.asyncio
+    async def test_job_com_checkpoints(self, jobs):
+        job_id = await jobs.criar("enriquecer_todos")
+        await self._rodar(jobs, job_id)
+
+        job = await jobs.obter(job_id)
+        assert job.status == "done"
+        assert (job.total, job.processados, job.erros) == (4, 4, 1)
+        assert job.percentual == 100.0
+        assert job.itens_por_segundo > 0
+        assert job.ultimos_erros[0]["erro"] == "timeout"
+        assert job.resultado["enriquecidos"] == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelar_e_retomar(self, jobs):
+        enrich = jobs.service.ingredientes_api.enrich_ingredient
+        job_id = await jobs.criar("enriquecer_todos")
+
+        async def cancelar_no_primeiro(nome):
+            await jobs.cancelar(job_id)
+            return {"calorias": 10.0}
+
+        enrich.side_effect = cancelar_no_primeiro
+        await self._rodar(jobs, job_id)
+
+        job = await jobs.obter(job_id)
+        assert job.status == "cancelled"
+        assert job.processados == 1
+
+        enrich.side_effect = None
+        enrich.return_value = {"calorias": 20.0}
+        enrich.reset_mock()
+        assert await jobs.retomar(job_id)
+        await jobs._tasks[job_id]
+
+        job = await jobs.obter(job_id)
+        assert job.status == "done"
+        assert (job.total, job.processados) == (4, 4)
+        assert enrich.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_api_fora_do_ar_pausa_e_retomada_enriquece(self, jobs, test_session):
+        from sqlmodel import select
+        from src.models.ingredientes import IngredienteTable
+        from src.service.rate_limiter import CircuitOpenError
+
+        enrich = jobs.service.ingredientes_api.enrich_ingredient
+        job_id = await jobs.criar("enriquecer_todos")
+
+        async def circuito_aberto_no_sugar(nome):
+            if nome == "Egg":
+                raise RuntimeError("timeout")
+            if nome == "Sugar":
+                raise CircuitOpenError("api.nal.usda.gov", 30)
+            return {"calorias": 10.0}
+
+        enrich.side_effect = circuito_aberto_no_sugar
+        await self._rodar(jobs, job_id)
+
+        job = await jobs.obter(job_id)
+        assert job.status == "paused"
+        assert "Circuito aberto" in job.erro
+        assert (job.processados, job.erros) == (2, 1)
+
+        enrich.side_effect = None
+        enrich.return_value = {"calorias": 20.0}
+        enrich.reset_mock()
+        assert await jobs.retomar(job_id)
+        await jobs._tasks[job_id]
+
+        job = await jobs.obter(job_id)
+        assert job.status == "done"
+        assert (job.total, job.processados, job.erros) == (4, 4, 0)
+        assert {c.args[0] for c in enrich.await_args_list} == {"Egg", "Sugar", "Salt"}
+        test_session.expire_all()
+        calorias = {
+            i.nome_singular: i.calorias for i in test_session.exec(select(IngredienteTable)).all()
+        }
+        assert calorias == {"Milk": 10.0, "Egg": 20.0, "Sugar": 20.0, "Salt": 20.0}
+
+    @pytest.mark.asyncio
+    async def test_requisicao_recusada_conta_so_para_o_item(self, jobs):
+        from src.service.rate_limiter import UpstreamError
+
+        enrich = jobs.service.ingredientes_api.enrich_ingredient
+        job_id = await jobs.criar("enriquecer_todos")
+
+        async def consulta_invalida_no_sugar(nome):
+            if nome == "Sugar":
+                raise UpstreamError("api.nal.usda.gov respondeu 400", "api.nal.usda.gov", 400)
+            return {"calorias": 10.0}
+
+        enrich.side_effect = consulta_invalida_no_sugar
+        await self._rodar(jobs, job_id)
+
+        job = await jobs.obter(job_id)
+        assert job.status == "done"
+        assert (job.total, job.processados, job.erros) == (4, 4, 1)
+        assert "400" in job.ultimos_erros[0]["erro"]
+        assert job.resultado["enriquecidos"] == 3
+
+    @pytest.mark.asyncio
+    async def test_retomar_job_concluido_repete_so_os_erros(self, jobs):
+        enrich = jobs.service.ingredientes_api.enrich_ingredient
+        job_id = await jobs.criar("enriquecer_todos")
+        await self._rodar(jobs, job_id)
+
+        enrich.side_effect = None
+        enrich.return_value = {"calorias": 20.0}
+        enrich.reset_mock()
+        assert await jobs.retomar(job_id)
+        await jobs._tasks[job_id]
+
+        job = await jobs.obter(job_id)
+        assert (job.status, job.processados, job.erros) == ("done", 4, 0)
+        assert [c.args[0] for c in enrich.await_args_list] == ["Egg"]
+        assert not await jobs.retomar(job_id)
+
+    @pytest.mark.asyncio
+    async def test_retomar_interrompidos_apos_reinicio(self, jobs, test_session):
+        from src.models.jobs import EnriquecimentoJobItemTable, EnriquecimentoJobTable
+
+        # Estado deixado por um processo que caiu no meio do job
+        test_session.add(EnriquecimentoJobTable(
+            id="abc", tipo="enriquecer_todos", status="running", total=4, processados=2
+        ))
+        test_session.add(EnriquecimentoJobItemTable(job_id="abc", id_ingrediente=1, status="ok"))
+        test_session.add(EnriquecimentoJobItemTable(job_id="abc", id_ingrediente=2, status="ok"))
+        test_session.commit()
+
+        assert await jobs.retomar_interrompidos() == ["abc"]
+        await jobs._tasks["abc"]
+
+        job = await jobs.obter("abc")
+        assert job.status == "done"
+        assert (job.total, job.processados) == (4, 4)
+        nomes = {c.args[0] for c in jobs.service.ingredientes_api.enrich_ingredient.await_args_list}
+        assert nomes == {"Sugar", "Salt"}
+
+
+class TestHostRateLimiter:
+    @pytest.mark.asyncio
+    async def test_host_sem_limite_nao_espera(self):
+        from src.service.rate_limiter import HostRateLimiter
+
+        limiter = HostRateLimiter({"api.nal.usda.gov": 0.001}, burst=1)
+
+        await limiter.acquire("https://www.themealdb.com/api/json/v1/1/list.php")
+        assert limiter._buckets == {}
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_espera_apos_burst(self):
+        import time
+        from src.service.rate_limiter import TokenBucket
+
+        bucket = TokenBucket(rate=20.0, capacity=2)
+        inicio = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+
+        assert time.monotonic() - inicio >= 0.09
+
+
+class TestTheMealDBMirror:
+    MEALS = {
+        "a": [
+            {
+                "idMeal": "1",
+                "strMeal": "Apple Pie",
+                "strCategory": "Dessert",
+                "strArea": "British",
+                "strIngredient1": "Apple",
+                "strMeasure1": "3",
+                "strIngredient2": "Sugar",
+                "strMeasure2": "100g",
+            }
+        ],
+        "c": [
+            {
+                "idMeal": "2",
+                "strMeal": "Chicken Curry",
+                "strCategory": "Chicken",
+                "strArea": "Indian",
+                "strIngredient1": "Chicken Breast",
+                "strMeasure1": "500g",
+            }
+        ],
+    }
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        import httpx
+        from unittest.mock import AsyncMock
+        from src.service.themealdb_mirror import TheMealDBMirror
+        from src.service.themealdb_service import TheMealDBService
+
+        listas = {
+            "c=list": [{"strCategory": "Dessert"}, {"strCategory": "Chicken"}],
+            "a=list": [{"strArea": "British"}, {"strArea": "Indian"}],
+            "i=list": [{"idIngredient": "1", "strIngredient": "Chicken Breast"}],
+        }
+
+        async def fake_fetch(url, params=None, headers=None):
+            if "list.php" in url:
+                return httpx.Response(200, json={"meals": listas[url.split("?")[1]]})
+            return httpx.Response(200, json={"meals": self.MEALS.get(params["f"])})
+
+        service = TheMealDBService(mirror=TheMealDBMirror(str(tmp_path / "mealdb.db")))
+        service._fetch = AsyncMock(side_effect=fake_fetch)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_sync_e_consultas_locais(self, service):
+        resultado = await service.sync_mirror()
+        chamadas = service._fetch.await_count
+
+        assert resultado["novas"] == 2
+        assert resultado["receitas"] == 2
+        assert await service.list_categories() == ["Chicken", "Dessert"]
+        assert [r.name for r in await service.search_recipes("pie")] == ["Apple Pie"]
+        assert [r.id for r in await service.filter_by_category("dessert")] == ["1"]
+        assert [r.id for r in await service.filter_by_ingredient("chicken_breast")] == ["2"]
+        receita = await service.get_recipe_by_id("2")
+        assert receita.ingredients == [{"ingredient": "Chicken Breast", "measure": "500g"}]
+        assert service._fetch.await_count == chamadas
+
+    @pytest.mark.asyncio
+    async def test_sync_incremental(self, service):
+        await service.sync_mirror()
+
+        self.MEALS["c"][0]["strArea"] = "Thai"
+        try:
+            resultado = await service.sync_mirror()
+        finally:
+            self.MEALS["c"][0]["strArea"] = "Indian"
+
+        assert resultado["novas"] == 0
+        assert resultado["atualizadas"] == 1
+        assert (await service.get_recipe_by_id("2")).area == "Thai"
+
+    @pytest.mark.asyncio
+    async def test_sync_respeita_idade_maxima(self, service):
+        await service.sync_mirror()
+        chamadas = service._fetch.await_count
+
+        resultado = await service.sync_mirror(max_age=3600)
+
+        assert resultado["status"] == "atual"
+        assert service._fetch.await_count == chamadas
+
+    @pytest.mark.asyncio
+    async def test_sync_parcial_quando_uma_letra_falha(self, service):
+        from src.service.rate_limiter import UpstreamError
+
+        await service.sync_mirror()
+        fetch_original = service._fetch.side_effect
+
+        async def falha_na_letra_a(url, params=None, headers=None):
+            if params and params.get("f") == "a":
+                raise UpstreamError("www.themealdb.com respondeu 503", "www.themealdb.com", 503)
+            return await fetch_original(url, params=params, headers=headers)
+
+        service._fetch.side_effect = falha_na_letra_a
+        resultado = await service.sync_mirror()
+
+        assert resultado["status"] == "parcial"
+        assert resultado["falhas"] == ["a"]
+        assert resultado["removidas"] == 0
+        assert resultado["receitas"] == 2
+
+    @pytest.mark.asyncio
+    async def test_busca_local_escapa_curingas(self, service):
+        await service.sync_mirror()
+
+        assert await service.search_recipes("%") == []
+        assert await service.search_recipes("_") == []
+        assert [r.name for r in await service.search_recipes("e p")] == ["Apple Pie"]
+
+
+class TestUpstreamResiliencia:
+    def _limiter(self, **kwargs):
+        from src.service.rate_limiter import HostRateLimiter
+
+        params = dict(max_retries=2, backoff_base=0.001, backoff_max=1.0, breaker_threshold=2, breaker_cooldown=60)
+        params.update(kwargs)
+        return HostRateLimiter({}, **params)
+
+    @pytest.mark.asyncio
+    async def test_retry_com_backoff_ate_sucesso(self):
+        import httpx
+        from unittest.mock import AsyncMock
+
+        request = AsyncMock(side_effect=[
+            httpx.Response(503),
+            httpx.ConnectError("falhou"),
+            httpx.Response(200, json={"ok": True}),
+        ])
+
+        response = await self._limiter().send("https://api.nal.usda.gov/x", request)
+
+        assert response.status_code == 200
+        assert request.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_respeita_retry_after(self):
+        import httpx
+        from unittest.mock import AsyncMock, patch
+
+        request = AsyncMock(side_effect=[
+            httpx.Response(429, headers={"Retry-After": "0.5"}),
+            httpx.Response(200),
+        ])
+
+        with patch("src.service.rate_limiter.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            await self._limiter().send("https://api.nal.usda.gov/x", request)
+
+        sleep.assert_awaited_once_with(0.5)
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_abre_apos_falhas(self):
+        import httpx
+        from unittest.mock import AsyncMock
+        from src.service.rate_limiter import CircuitOpenError, UpstreamError
+
+        limiter = self._limiter(max_retries=0)
+        request = AsyncMock(return_value=httpx.Response(500))
+
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await limiter.send("https://world.openfoodfacts.org/x", request)
+
+        with pytest.raises(CircuitOpenError):
+            await limiter.send("https://world.openfoodfacts.org/x", request)
+        assert request.await_count == 2
+
+        # Outros hosts não são afetados
+        request.return_value = httpx.Response(200)
+        await limiter.send("https://www.themealdb.com/x", request)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_longo_abre_circuito(self):
+        import httpx
+        from unittest.mock import AsyncMock
+        from src.service.rate_limiter import CircuitOpenError, UpstreamError
+
+        limiter = self._limiter()
+        request = AsyncMock(return_value=httpx.Response(429, headers={"Retry-After": "3600"}))
+
+        with pytest.raises(UpstreamError):
+            await limiter.send("https://api.nal.usda.gov/x", request)
+        with pytest.raises(CircuitOpenError) as exc:
+            await limiter.send("https://api.nal.usda.gov/x", request)
+
+        assert request.await_count == 1
+        assert exc.value.retry_in > 3000
+
+    @pytest.mark.asyncio
+    async def test_erro_da_api_nao_vira_lista_vazia(self):
+        import httpx
+        from unittest.mock import AsyncMock, MagicMock
+        from src.service.ingredientes_api import IngredientesAPIService
+        from src.service.rate_limiter import UpstreamError
+
+        client = MagicMock()
+        client.get = AsyncMock(return_value=httpx.Response(401))
+        service = IngredientesAPIService(usda_api_key="k", http_client=client)
+
+        with pytest.raises(UpstreamError):
+            await service.search_usda("rice")
+
+        client.get.return_value = httpx.Response(404)
+        assert await service.get_usda_food(1) is None
+
+    def test_rota_responde_503(self, client):
+        from unittest.mock import AsyncMock, patch
+        from src.service.rate_limiter import CircuitOpenError
+
+        with patch(
+            "src.routes.themealdb.service.list_categories",
+            new_callable=AsyncMock,
+            side_effect=CircuitOpenError("www.themealdb.com", 30),
+        ):
+            response = client.get("/themealdb/categories")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "31"
+
+
+class TestImageDownloader:
+    def _downloader(self, tmp_path, handler, **kwargs):
+        import httpx
+        from src.service.image_downloader import ImageDownloader
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return ImageDownloader(base_path=str(tmp_path), http_client=client, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_download_em_streaming(self, tmp_path):
+        import httpx
+
+        corpo = b"\x89PNG" + b"x" * 200_000
+        downloader = self._downloader(
+            tmp_path, lambda request: httpx.Response(200, headers={"content-type": "image/png"}, content=corpo)
+        )
+
+        caminho = await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a")
+
+        assert caminho == "media/ingredientes/a.png"
+        assert (tmp_path / "ingredientes" / "a.png").read_bytes() == corpo
+        assert [p.name for p in (tmp_path / "ingredientes").iterdir()] == ["a.png"]
+
+    @pytest.mark.asyncio
+    async def test_recusa_content_type_que_nao_e_imagem(self, tmp_path):
+        import httpx
+
+        downloader = self._downloader(
+            tmp_path, lambda request: httpx.Response(200, headers={"content-type": "text/html"}, content=b"<html>")
+        )
+
+        assert await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a") is None
+        assert list((tmp_path).rglob("*.png")) == []
+
+    @pytest.mark.asyncio
+    async def test_recusa_resposta_sem_content_type(self, tmp_path):
+        import httpx
+
+        downloader = self._downloader(
+            tmp_path, lambda request: httpx.Response(200, content=b"<html>erro</html>")
+        )
+
+        assert await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a") is None
+        assert list((tmp_path).rglob("*.png")) == []
+
+    @pytest.mark.asyncio
+    async def test_limite_de_tamanho_sem_content_length(self, tmp_path):
+        import httpx
+
+        async def corpo():
+            for _ in range(10):
+                yield b"x" * 1000
+
+        downloader = self._downloader(
+            tmp_path,
+            lambda request: httpx.Response(200, headers={"content-type": "image/jpeg"}, content=corpo()),
+            max_bytes=5000,
+        )
+
+        assert await downloader.download_image("https://img.test/a.jpg", "ingredientes", filename="a") is None
+        # Nem a imagem nem o temporário ficam em disco
+        assert list((tmp_path / "ingredientes").iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_limite_de_tamanho_pelo_content_length(self, tmp_path):
+        import httpx
+
+        downloader = self._downloader(
+            tmp_path,
+            lambda request: httpx.Response(200, headers={"content-type": "image/jpeg"}, content=b"x" * 6000),
+            max_bytes=5000,
+        )
+
+        assert await downloader.download_image("https://img.test/a.jpg", "ingredientes", filename="a") is None
+
+    @pytest.mark.asyncio
+    async def test_indice_evita_download_repetido(self, tmp_path):
+        import httpx
+        from src.service.image_index import ImageIndex
+
+        requisicoes = []
+
+        def handler(request):
+            requisicoes.append(request)
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"content-type": "image/png", "etag": '"v1"'}, content=b"png")
+
+        index = ImageIndex(str(tmp_path / "index.db"))
+        downloader = self._downloader(tmp_path, handler, index=index)
+
+        caminho = await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a")
+        # Dentro da janela de revalidação nem consulta o servidor
+        assert await downloader.download_image("https://img.test/a.png", "ingredientes", filename="b") == caminho
+        assert len(requisicoes) == 1
+
+        downloader.revalidate_after = 0
+        assert await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a") == caminho
+        assert len(requisicoes) == 2
+        assert requisicoes[1].headers["if-none-match"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_conteudo_identico_vira_hardlink(self, tmp_path):
+        import httpx
+        from src.service.image_index import ImageIndex
+
+        downloader = self._downloader(
+            tmp_path,
+            lambda request: httpx.Response(200, headers={"content-type": "image/png"}, content=b"mesma imagem"),
+            index=ImageIndex(str(tmp_path / "index.db")),
+        )
+
+        await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a")
+        await downloader.download_image("https://cdn.test/b.png", "ingredientes", filename="b")
+
+        a = tmp_path / "ingredientes" / "a.png"
+        b = tmp_path / "ingredientes" / "b.png"
+        assert b.read_bytes() == b"mesma imagem"
+        assert a.stat().st_ino == b.stat().st_ino
+        assert downloader.index.stats() == {"urls": 2, "conteudos_distintos": 1, "bytes": 24}
+
+    @pytest.mark.asyncio
+    async def test_download_many_preserva_ordem_e_erros(self, tmp_path):
+        import asyncio
+        import httpx
+
+        em_andamento = maximo = 0
+
+        async def handler(request):
+            nonlocal em_andamento, maximo
+            em_andamento += 1
+            maximo = max(maximo, em_andamento)
+            await asyncio.sleep(0.01)
+            em_andamento -= 1
+            if "quebrada" in request.url.path:
+                return httpx.Response(500)
+            return httpx.Response(200, headers={"content-type": "image/png"}, content=request.url.path.encode())
+
+        downloader = self._downloader(tmp_path, handler)
+        items = [(f"https://img.test/{i}.png", "ingredientes", f"img_{i}") for i in range(6)]
+        items.insert(2, ("https://img.test/quebrada.png", "ingredientes", None))
+
+        resultados = await downloader.download_many(items, concurrency=3)
+
+        assert [r.url for r in resultados] == [url for url, _, _ in items]
+        assert [r.ok for r in resultados] == [True, True, False, True, True, True, True]
+        assert "500" in resultados[2].erro
+        assert resultados[6].path == "media/ingredientes/img_5.png"
+        assert maximo == 3
+
+    @pytest.mark.asyncio
+    async def test_normalizacao_redimensiona_e_regrava(self, tmp_path):
+        import io
+        import httpx
+        from PIL import Image
+        from src.service.image_index import ImageIndex
+        from src.service.image_normalizer import ImageNormalizer
+
+        original = io.BytesIO()
+        Image.new("RGB", (400, 200), "red").save(original, format="PNG")
+
+        def handler(request):
+            if "quebrada" in request.url.path:
+                return httpx.Response(200, headers={"content-type": "image/png"}, content=b"<html>erro</html>")
+            return httpx.Response(200, headers={"content-type": "image/png"}, content=original.getvalue())
+
+        normalizer = ImageNormalizer(max_dimension=100, formato="webp", workers=1)
+        downloader = self._downloader(
+            tmp_path, handler, index=ImageIndex(str(tmp_path / "index.db")), normalizer=normalizer
+        )
+        try:
+            caminho = await downloader.download_image("https://img.test/a.png", "ingredientes", filename="a")
+            quebrada = await downloader.download_image("https://img.test/quebrada.png", "ingredientes", filename="q")
+        finally:
+            normalizer.shutdown()
+
+        assert caminho == "media/ingredientes/a.webp"
+        with Image.open(tmp_path / "ingredientes" / "a.webp") as img:
+            assert img.format == "WEBP"
+            assert img.size == (100, 50)
+        indexada = downloader.index.get("https://img.test/a.png")
+        assert (indexada.width, indexada.height) == (100, 50)
+
+        assert quebrada is None
+        assert sorted(p.name for p in (tmp_path / "ingredientes").iterdir()) == ["a.webp"]
+
+    @pytest.mark.asyncio
+    async def test_download_many_retorna_dimensoes_sem_indice(self, tmp_path):
+        import io
+        import httpx
+        from PIL import Image
+        from src.service.image_normalizer import ImageNormalizer
+
+        original = io.BytesIO()
+        Image.new("RGB", (400, 200), "red").save(original, format="PNG")
+        normalizer = ImageNormalizer(max_dimension=100, formato="webp", workers=1)
+        downloader = self._downloader(
+            tmp_path,
+            lambda request: httpx.Response(200, headers={"content-type": "image/png"}, content=original.getvalue()),
+            normalizer=normalizer,
+        )
+        try:
+            [resultado] = await downloader.download_many([("https://img.test/a.png", "ingredientes", "a")])
+        finally:
+            normalizer.shutdown()
+
+        assert resultado.path == "media/ingredientes/a.webp"
+        assert (resultado.width, resultado.height) == (100, 50)